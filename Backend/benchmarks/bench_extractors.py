@@ -0,0 +1,65 @@
+"""
+PDF Extraction Backend Benchmark
+
+Measures pages/second for every installed extraction backend and checks
+that each one parses into the same records as the reference backend.
+
+Usage (from the Backend directory):
+    python -m benchmarks.bench_extractors <pdf_file> [...] [--repeat N]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+from typing import List
+
+from parsers.shift_parser import PDFParser
+from utils.pdf_utils import REFERENCE_EXTRACTOR, available_extractors, get_extractor
+
+
+def bench_file(pdf_path: str, repeat: int) -> List[dict]:
+    """Time every available backend on one file."""
+    parser = PDFParser(pdf_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        reference = [line for page in get_extractor(REFERENCE_EXTRACTOR).extract_pages(pdf_path) for line in page]
+
+    results = []
+    for extractor in available_extractors():
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            pages = extractor.extract_pages(pdf_path)
+            best = min(best, time.perf_counter() - start)
+
+        lines = [line for page in pages for line in page]
+        results.append({
+            'backend': extractor.name,
+            'pages': len(pages),
+            'seconds': best,
+            'pages_per_sec': len(pages) / best if best else float('inf'),
+            'valid': parser.records_match(lines, reference),
+        })
+    return results
+
+
+def main():
+    """Main entry point."""
+    arg_parser = argparse.ArgumentParser(description="Benchmark PDF extraction backends.")
+    arg_parser.add_argument("paths", nargs="+", help="PDF files to benchmark")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Runs per backend (best is reported)")
+    args = arg_parser.parse_args()
+
+    for pdf_path in args.paths:
+        results = bench_file(pdf_path, args.repeat)
+        baseline = next(r['seconds'] for r in results if r['backend'] == REFERENCE_EXTRACTOR)
+
+        print(f"\n{'='*60}\n{pdf_path}\n{'='*60}")
+        print(f"{'Backend':<12}{'Pages':>6}{'Seconds':>10}{'Pages/s':>10}{'Speedup':>9}  Valid")
+        for r in sorted(results, key=lambda r: r['seconds']):
+            print(f"{r['backend']:<12}{r['pages']:>6}{r['seconds']:>10.4f}{r['pages_per_sec']:>10.1f}"
+                  f"{baseline / r['seconds']:>8.1f}x  {'yes' if r['valid'] else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Parsed Record Memory & Throughput Benchmark
+
+Builds a large synthetic "Scheduled vs Actual Hours" report in memory and
+measures clean → group → parse throughput and the memory retained per
+parsed ShiftRecord (including its punches).
+
+Usage (from the Backend directory):
+    python -m benchmarks.bench_records [--employees N] [--days N]
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import string
+import time
+import tracemalloc
+from datetime import date, timedelta
+from typing import List
+
+from parsers.shift_parser import PDFParser
+
+
+def _clock(minutes: int) -> str:
+    """Format minutes after midnight the way the report does (e.g. 1:05p)."""
+    hour, minute = divmod(minutes % 1440, 60)
+    suffix = 'a' if hour < 12 else 'p'
+    return f"{hour % 12 or 12}:{minute:02d}{suffix}"
+
+
+def synthetic_report_lines(employees: int, days: int, seed: int = 0) -> List[str]:
+    """Text lines shaped like an extracted report page stream."""
+    rnd = random.Random(seed)
+    names = [
+        (''.join(rnd.choices(string.ascii_letters, k=6)), ''.join(rnd.choices(string.ascii_letters, k=8)))
+        for _ in range(employees)
+    ]
+    start = date(2025, 1, 1)
+    lines = ["Scheduled vs Actual Hours", "JS Foods - BURGER KING #1234",
+             "Employee Business Date Labor Type Break Hours Worked Hours"]
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        for first, last in names:
+            begin = rnd.choice([360, 420, 600, 660, 900, 1020])
+            end = begin + 480
+            actual_begin = begin + rnd.randint(-5, 12)
+            actual_end = end + rnd.randint(-20, 20)
+            hours = (actual_end - actual_begin - 30) / 60
+            lines.append(f"{last}, {first} {day.month}/{day.day}/{day.year}")
+            lines.append(f"Scheduled 0.50 7.50 {_clock(begin)} - {_clock(begin + 240)} "
+                         f"{_clock(begin + 270)} - {_clock(end)}")
+            lines.append(f"Actual 0.50 {hours:.2f} {_clock(actual_begin)} - {_clock(begin + 240)} "
+                         f"{_clock(begin + 270)} - {_clock(actual_end)}")
+    return lines
+
+
+def main():
+    """Main entry point."""
+    arg_parser = argparse.ArgumentParser(description="Benchmark parsed record memory and throughput.")
+    arg_parser.add_argument("--employees", type=int, default=200)
+    arg_parser.add_argument("--days", type=int, default=90)
+    args = arg_parser.parse_args()
+
+    lines = synthetic_report_lines(args.employees, args.days)
+    parser = PDFParser("synthetic.pdf")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        groups = parser.group_into_records(parser.clean_lines(lines))
+        records = [parser.parse_record(group) for group in groups]
+        elapsed = time.perf_counter() - start
+    del records
+
+    # Measure what the parsed records keep alive, separately from parse speed
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        baseline = tracemalloc.get_traced_memory()[0]
+        records = [parser.parse_record(group) for group in groups]
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    count = len(records)
+    print(f"Records parsed:      {count:,}")
+    print(f"Parse throughput:    {count / elapsed:,.0f} records/s ({elapsed:.2f}s total)")
+    print(f"Retained memory:     {retained / 1024 / 1024:,.1f} MiB")
+    print(f"Per record:          {retained / count:,.0f} bytes")
+
+
+if __name__ == "__main__":
+    main()
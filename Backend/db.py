@@ -1,7 +1,18 @@
+from fastapi import Request, Response
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
 from sqlmodel import SQLModel, create_engine, Session
-from typing import Generator
+from typing import Generator, List, Optional
 from dotenv import load_dotenv
+import hashlib
 import os
+import threading
+import time
+import warnings
+
+# Local imports
+from utils.query_stats import untracked
 
 # Load environment variables from .env file
 load_dotenv()
@@ -11,26 +22,224 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL not found in environment variables or .env file")
 
-# Create engine
+# Log every statement unless SQL_ECHO is turned off
+SQL_ECHO = os.getenv("SQL_ECHO", "true").lower() in ("1", "true", "yes")
+
+# Comma-separated read replica URLs; reads fall back to the primary without them
+READ_REPLICA_URLS = [url.strip() for url in os.getenv("READ_REPLICA_URLS", "").split(",") if url.strip()]
+
+# How often a replica is probed, and how long a failed one is skipped
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", 10))
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", 30))
+
+# Reads within this many seconds of a client's last write go to the primary,
+# so an upload is visible straight away even while replicas lag behind
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+LAST_WRITE_COOKIE = "shifttrack_last_write"
+
+# Create engine (primary; all writes go here)
 engine = create_engine(
     DATABASE_URL,
-    echo=True,
+    echo=SQL_ECHO,
 )
 
 
+class ReplicaRouter:
+    """
+    Round-robin over read replica engines.
+    A replica is probed with SELECT 1 at most every REPLICA_HEALTH_INTERVAL
+    seconds; one that fails is skipped for REPLICA_RETRY_SECONDS. When no
+    replica is healthy, reads go to the primary.
+    """
+
+    def __init__(self, primary: Engine, urls: List[str]):
+        self.primary = primary
+        self.replicas = [create_engine(url, echo=SQL_ECHO, pool_pre_ping=True) for url in urls]
+        self._next = 0
+        self._checked_at = [0.0] * len(self.replicas)
+        self._down_until = [0.0] * len(self.replicas)
+        self._lock = threading.Lock()
+
+    def _healthy(self, index: int) -> bool:
+        now = time.monotonic()
+        if now < self._down_until[index]:
+            return False
+        if now - self._checked_at[index] < REPLICA_HEALTH_INTERVAL:
+            return True
+        self._checked_at[index] = now
+        try:
+            # Infrastructure, not the route's work: keep it out of query budgets
+            with untracked(), self.replicas[index].connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return True
+        except Exception as e:
+            self.mark_down(index, e)
+            return False
+
+    def mark_down(self, index: int, error: Exception = None):
+        """Take a replica out of rotation for REPLICA_RETRY_SECONDS."""
+        self._down_until[index] = time.monotonic() + REPLICA_RETRY_SECONDS
+        print(f"⚠️  Read replica {index} unavailable, retrying in {REPLICA_RETRY_SECONDS:.0f}s: {error}")
+
+    def pick(self) -> Engine:
+        """Next healthy replica, or the primary if there is none."""
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % max(1, len(self.replicas))
+        for offset in range(len(self.replicas)):
+            index = (start + offset) % len(self.replicas)
+            if self._healthy(index):
+                return self.replicas[index]
+        return self.primary
+
+    def status(self) -> List[dict]:
+        now = time.monotonic()
+        return [
+            {"replica": index, "url": replica.url.render_as_string(hide_password=True),
+             "healthy": now >= self._down_until[index]}
+            for index, replica in enumerate(self.replicas)
+        ]
+
+
+replica_router = ReplicaRouter(engine, READ_REPLICA_URLS)
+
+# Postgres-only objects that SQLModel metadata cannot express.
+# punch_range mirrors each punch's [start, end) interval so "on shift at T"
+# and overlap checks can use a GiST index instead of two B-tree range scans.
+POSTGRES_DDL = [
+    """
+    ALTER TABLE shift_punches ADD COLUMN IF NOT EXISTS punch_range tsrange
+        GENERATED ALWAYS AS (tsrange(start_datetime, GREATEST(end_datetime, start_datetime), '[)')) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_shift_punches_punch_range ON shift_punches USING gist (punch_range)",
+]
+
+
+def add_missing_columns(conn):
+    """
+    Add model columns (and their indexes) that existing tables predate.
+    create_all only creates missing tables, and there is no migration tool,
+    so new nullable columns are added in place here.
+    """
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    for table in SQLModel.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            print(f"➕ Added column {table.name}.{column.name}")
+        # Indexes on the new columns. Expression indexes cannot be reflected,
+        # which SQLAlchemy warns about on every check.
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", "Skipped unsupported reflection")
+            for index in table.indexes:
+                if not index.unique:
+                    index.create(conn, checkfirst=True)
+                    continue
+                # Rows stored before the constraint existed may violate it
+                try:
+                    with conn.begin_nested():
+                        conn.execute(CreateIndex(index, if_not_exists=True))
+                except Exception as e:
+                    print(f"⚠️  Could not create unique index {index.name}; ingest is not safe to run "
+                          f"concurrently until `python manage.py dedupe-shifts` removes the duplicates: {e}")
+
+
 def init_db():
     """
     Initialize database tables.
     Creates all tables defined in models.
     """
-    from models import ShiftSummary, ShiftPunch, AttendanceRecord
+    from models import (
+        ShiftSummary, ShiftPunch, AttendanceRecord, IngestedFile, PayPeriodTotal, CacheVersion, ChangeEvent
+    )
+    from services.partition_service import (
+        PARTITIONING_ENABLED, create_partitioned_tables, ensure_future_partitions
+    )
+    partitioned = PARTITIONING_ENABLED and engine.dialect.name == "postgresql"
+    if partitioned:
+        with engine.begin() as conn:
+            create_partitioned_tables(conn)
     SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        add_missing_columns(conn)
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for statement in POSTGRES_DDL:
+                conn.execute(text(statement))
+    if partitioned:
+        ensure_future_partitions(engine)
     print("Database tables created successfully!")
 
 
+def _lock_key(name: str) -> int:
+    """Stable signed 64-bit advisory lock key for a name."""
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def advisory_xact_lock(session_or_conn, names, shared: bool = False):
+    """
+    Take PostgreSQL transaction-level advisory locks on the given names,
+    released at commit or rollback. Keys are locked in sorted order so two
+    transactions asking for overlapping sets cannot deadlock. No-op on
+    other databases, which serialize writers anyway.
+    """
+    bind = session_or_conn.get_bind() if isinstance(session_or_conn, Session) else session_or_conn
+    if bind.dialect.name != "postgresql":
+        return
+    function = "pg_advisory_xact_lock_shared" if shared else "pg_advisory_xact_lock"
+    for key in sorted({_lock_key(name) for name in names}):
+        session_or_conn.execute(text(f"SELECT {function}(:key)"), {"key": key})
+
+
 def get_session() -> Generator[Session, None, None]:
     """
     Dependency for getting database sessions.
     """
     with Session(engine) as session:
         yield session
+
+
+# Writes always use the primary
+get_write_session = get_session
+
+
+def _last_write(request: Request) -> Optional[float]:
+    """When this client last wrote, from the cookie or the X-Last-Write header."""
+    value = request.cookies.get(LAST_WRITE_COOKIE) or request.headers.get("X-Last-Write")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def read_engine(request: Request) -> Engine:
+    """
+    Engine for a request's reads: a healthy read replica when one is
+    configured, or the primary for clients that wrote within
+    READ_YOUR_WRITES_SECONDS so they see their own changes.
+    """
+    last_write = _last_write(request)
+    if last_write and time.time() - last_write < READ_YOUR_WRITES_SECONDS:
+        return engine
+    return replica_router.pick()
+
+
+def get_read_session(request: Request) -> Generator[Session, None, None]:
+    """
+    Dependency for read-only sessions (see read_engine).
+    """
+    with Session(read_engine(request)) as session:
+        yield session
+
+
+def mark_write(response: Response):
+    """Record a write on the response so the client's next reads go to the primary."""
+    now = f"{time.time():.3f}"
+    response.set_cookie(LAST_WRITE_COOKIE, now, max_age=int(READ_YOUR_WRITES_SECONDS) + 1, samesite="lax")
+    response.headers["X-Last-Write"] = now
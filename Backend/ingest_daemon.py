@@ -0,0 +1,238 @@
+"""
+Watch-Folder Ingest Daemon
+
+Watches a drop directory for "Scheduled vs Actual Hours" PDFs and ingests
+them as they arrive. Files are only picked up once their size and mtime
+have been stable for the settle period, parsed in a bounded process pool
+and then moved to done/ or failed/. Progress is kept in the ingested_files
+ledger, so a restart never re-parses a finished file.
+
+Usage:
+    python ingest_daemon.py <watch_dir> [--workers N] [--settle SECONDS]
+
+Example:
+    python ingest_daemon.py /srv/shift_reports --workers 4
+"""
+
+import argparse
+import shutil
+import signal
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from watchfiles import Change, watch
+
+from db import init_db
+from parse_shifts import parse_file
+from services.shift_service import ShiftDataService
+from utils.file_utils import file_sha256
+from utils.pdf_utils import EXTRACTORS
+
+
+class IngestDaemon:
+    """Long-running ingest loop over a watched directory."""
+
+    def __init__(self, watch_dir: str, done_dir: Optional[str] = None,
+                 failed_dir: Optional[str] = None, workers: int = 2,
+                 settle_seconds: float = 5.0, upsert: bool = False,
+                 backend: Optional[str] = None):
+        self.watch_dir = Path(watch_dir).resolve()
+        self.done_dir = Path(done_dir or self.watch_dir / "done").resolve()
+        self.failed_dir = Path(failed_dir or self.watch_dir / "failed").resolve()
+        self.workers = max(1, workers)
+        self.settle_seconds = settle_seconds
+        self.upsert = upsert
+        self.backend = backend
+
+        # path -> (size, mtime, first time this signature was seen)
+        self.pending: Dict[Path, Tuple[int, float, float]] = {}
+        # path -> (content hash, parse future)
+        self.in_flight: Dict[Path, Tuple[str, Future]] = {}
+        self.stop_event = threading.Event()
+
+    # -------------------------------------------------------------------------
+    # Discovery & Debounce
+    # -------------------------------------------------------------------------
+    def is_candidate(self, path: Path) -> bool:
+        """Only top-level, non-hidden PDFs in the watch directory are ingested."""
+        return (
+            path.parent == self.watch_dir
+            and path.suffix.lower() == ".pdf"
+            and not path.name.startswith(".")
+        )
+
+    def track(self, path: Path):
+        """Register a new or modified file; its settle timer restarts on every change."""
+        if path in self.in_flight or not self.is_candidate(path):
+            return
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            self.pending.pop(path, None)
+            return
+        self.pending[path] = (st.st_size, st.st_mtime, time.monotonic())
+
+    def ready_files(self):
+        """Yield pending files whose size and mtime have not changed for the settle period."""
+        now = time.monotonic()
+        for path, (size, mtime, since) in list(self.pending.items()):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                del self.pending[path]
+                continue
+            if (st.st_size, st.st_mtime) != (size, mtime):
+                # Still being written
+                self.pending[path] = (st.st_size, st.st_mtime, now)
+            elif st.st_size > 0 and now - since >= self.settle_seconds:
+                yield path
+
+    # -------------------------------------------------------------------------
+    # Processing
+    # -------------------------------------------------------------------------
+    def move(self, path: Path, target_dir: Path) -> Path:
+        """Move a processed file aside without clobbering an earlier file of the same name."""
+        target_dir.mkdir(parents=True, exist_ok=True)
+        target = target_dir / path.name
+        counter = 1
+        while target.exists():
+            target = target_dir / f"{path.stem}_{counter}{path.suffix}"
+            counter += 1
+        shutil.move(str(path), str(target))
+        return target
+
+    def submit_ready(self, pool: ProcessPoolExecutor):
+        """Hand settled files to the pool, keeping at most `workers` parses in flight."""
+        for path in list(self.ready_files()):
+            if len(self.in_flight) >= self.workers:
+                # Pool is full; the rest stay pending until the next tick
+                break
+            del self.pending[path]
+
+            content_hash = file_sha256(str(path))
+            with ShiftDataService() as service:
+                already_done = service.get_ingested_hashes([content_hash])
+            if already_done:
+                print(f"⏭️  Already ingested, moving to done: {path.name}")
+                self.move(path, self.done_dir)
+                continue
+
+            print(f"📥 Queued for ingest: {path.name}")
+            future = pool.submit(parse_file, str(path), self.backend)
+            self.in_flight[path] = (content_hash, future)
+
+    def collect_finished(self):
+        """Store parsed records for completed futures and file the sources away."""
+        for path, (content_hash, future) in list(self.in_flight.items()):
+            if not future.done():
+                continue
+            del self.in_flight[path]
+
+            try:
+                _, records, error = future.result()
+            except Exception as e:
+                records, error = [], str(e)
+
+            with ShiftDataService() as service:
+                if error:
+                    print(f"❌ {path.name}: {error}")
+                    service.record_ingested_file(content_hash, path.name, status="failed", error=error)
+                    self.move(path, self.failed_dir)
+                    continue
+
+                try:
+                    stats = service.insert_shift_records(records, upsert=self.upsert)
+                except Exception as e:
+                    print(f"❌ {path.name}: failed to store records: {e}")
+                    service.session.rollback()
+                    service.record_ingested_file(content_hash, path.name, status="failed", error=str(e))
+                    self.move(path, self.failed_dir)
+                    continue
+
+                entry = service.record_ingested_file(content_hash, path.name, stats)
+
+            # Files with record errors go to failed/ as well, to be dropped in again
+            self.move(path, self.done_dir if entry.status == "done" else self.failed_dir)
+            print(f"✅ {path.name}: {stats['summaries_inserted']} inserted, "
+                  f"{stats['summaries_updated']} updated, {stats['errors']} errors ({stats['total_records']} parsed)")
+
+    # -------------------------------------------------------------------------
+    # Main Loop
+    # -------------------------------------------------------------------------
+    def run(self):
+        """Watch the directory until interrupted."""
+        self.watch_dir.mkdir(parents=True, exist_ok=True)
+        init_db()
+
+        # Files dropped while the daemon was down
+        for path in self.watch_dir.iterdir():
+            self.track(path.resolve())
+
+        print(f"👀 Watching {self.watch_dir} ({self.workers} workers, "
+              f"{self.settle_seconds}s settle)")
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for changes in watch(
+                self.watch_dir,
+                recursive=False,
+                stop_event=self.stop_event,
+                rust_timeout=1000,
+                yield_on_timeout=True,
+            ):
+                for change, raw_path in changes:
+                    path = Path(raw_path).resolve()
+                    if change == Change.deleted:
+                        self.pending.pop(path, None)
+                    else:
+                        self.track(path)
+
+                self.collect_finished()
+                self.submit_ready(pool)
+
+            # Let in-flight parses finish so their files are not left half-done
+            while self.in_flight:
+                time.sleep(0.2)
+                self.collect_finished()
+
+        print("👋 Ingest daemon stopped")
+
+    def stop(self, *_):
+        """Signal handler: finish in-flight work and exit."""
+        self.stop_event.set()
+
+
+def main():
+    """Main entry point."""
+    arg_parser = argparse.ArgumentParser(description="Watch a directory and ingest shift report PDFs.")
+    arg_parser.add_argument("watch_dir", help="Directory where stores drop their PDFs")
+    arg_parser.add_argument("--done-dir", help="Where ingested files go (default: <watch_dir>/done)")
+    arg_parser.add_argument("--failed-dir", help="Where failed files go (default: <watch_dir>/failed)")
+    arg_parser.add_argument("-w", "--workers", type=int, default=2,
+                            help="Maximum number of files parsed concurrently")
+    arg_parser.add_argument("--settle", type=float, default=5.0,
+                            help="Seconds a file must stay unchanged before it is ingested")
+    arg_parser.add_argument("--upsert", action="store_true",
+                            help="Update shifts whose contents changed (corrected re-exports)")
+    arg_parser.add_argument("--backend", choices=["auto", *EXTRACTORS],
+                            help="PDF extraction backend (default: auto-select)")
+    args = arg_parser.parse_args()
+
+    daemon = IngestDaemon(
+        args.watch_dir,
+        done_dir=args.done_dir,
+        failed_dir=args.failed_dir,
+        workers=args.workers,
+        settle_seconds=args.settle,
+        upsert=args.upsert,
+        backend=args.backend,
+    )
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.run()
+
+
+if __name__ == "__main__":
+    main()
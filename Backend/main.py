@@ -1,9 +1,18 @@
+import os
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.formparsers import MultiPartParser
 
 # Local imports
-from db import init_db
-from routes import shifts, employees, alerts, attendance
+from db import engine, init_db, replica_router
+from routes import shifts, employees, alerts, attendance, stores, dashboard, debug, events
+from routes.alerts import calculate_alerts
+from services.employee_index import employee_index
+from services.event_broker import ChangeRelay
+from utils.compression import CompressionMiddleware
+from utils.profiler import ProfilingMiddleware
+from utils.query_stats import QueryStatsMiddleware
 
 # -----------------------------------------------------------------------------
 # 🚀 App Initialization
@@ -19,15 +28,53 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the frontend echo the write timestamp back for read-your-writes
+    expose_headers=["X-Last-Write", "Server-Timing", "X-Profile-Id"],
 )
 
+# -----------------------------------------------------------------------------
+# ⏱️ Query Instrumentation
+# -----------------------------------------------------------------------------
+# Statement count and DB time per request, sent as Server-Timing and
+# aggregated per route under /debug/perf
+app.add_middleware(QueryStatsMiddleware)
+
+# Sampling profiler, off unless PROFILING is set; folded stacks are served
+# under /debug/profiles
+app.add_middleware(ProfilingMiddleware)
+
+# -----------------------------------------------------------------------------
+# 🗜️ Response Compression
+# -----------------------------------------------------------------------------
+# zstd, br or gzip, whichever the client accepts and is installed, for
+# responses of at least COMPRESSION_MIN_BYTES (see utils/compression.py)
+app.add_middleware(CompressionMiddleware)
+
+# -----------------------------------------------------------------------------
+# 📤 Upload Spooling
+# -----------------------------------------------------------------------------
+# Uploads up to this size stay in memory and are parsed in place; larger ones
+# spill to an anonymous, uniquely named temp file.
+MultiPartParser.spool_max_size = int(os.getenv("UPLOAD_SPOOL_MAX_BYTES", 16 * 1024 * 1024))
+
 # -----------------------------------------------------------------------------
 # 🗄️ Database Initialization
 # -----------------------------------------------------------------------------
+# Relays data changes from every process (uploads, the ingest daemon, CLI
+# runs) to this worker's /events subscribers
+change_relay = ChangeRelay(alerts_for=calculate_alerts)
+
 @app.on_event("startup")
 def on_startup():
     """Initialize database tables when the FastAPI app starts."""
     init_db()
+    # Employee names for /employees/search; kept current on ingest
+    employee_index.load(engine)
+    change_relay.start(engine)
+
+@app.on_event("shutdown")
+def on_shutdown():
+    change_relay.stop()
 
 # -----------------------------------------------------------------------------
 # 🏠 Core Root & Health Endpoints
@@ -40,7 +87,10 @@ def root():
 @app.get("/health")
 def health():
     """Health check endpoint."""
-    return {"message": "ShiftTrack FastAPI backend is running 🚀"}
+    return {
+        "message": "ShiftTrack FastAPI backend is running 🚀",
+        "read_replicas": replica_router.status(),
+    }
 
 # -----------------------------------------------------------------------------
 # �️ Include Routers
@@ -49,3 +99,10 @@ app.include_router(shifts.router)
 app.include_router(employees.router)
 app.include_router(alerts.router)
 app.include_router(attendance.router)
+app.include_router(stores.router)
+app.include_router(dashboard.router)
+# SQL text and profiles; opt-in with DEBUG_ENDPOINTS=1
+if debug.DEBUG_ENDPOINTS_ENABLED:
+    app.include_router(debug.router)
+# Live updates (SSE at /events/stream, WebSocket at /events/ws)
+app.include_router(events.router)
@@ -0,0 +1,279 @@
+"""
+Database Maintenance Commands
+
+Usage:
+    python manage.py partitions ensure [--from YYYY-MM] [--to YYYY-MM]
+    python manage.py partitions list
+    python manage.py partitions detach YYYY-MM [--drop]
+    python manage.py partitions check-pruning --from YYYY-MM [--to YYYY-MM]
+    python manage.py archive --before YYYY-MM [--dry-run]
+    python manage.py backfill-punch-stats [--all]
+    python manage.py refresh-fingerprints
+    python manage.py dedupe-shifts
+    python manage.py assign-store STORE_ID [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+    python manage.py recompute-overtime [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+    python manage.py recompute-attendance [--from YYYY-MM-DD] [--to YYYY-MM-DD] [--store STORE_ID]
+    python manage.py classify-attendance-sources
+
+Example:
+    DB_PARTITIONING=monthly python manage.py partitions ensure --from 2023-01
+    DB_PARTITIONING=monthly python manage.py partitions detach 2023-01
+    python manage.py archive --before 2024-01
+"""
+
+import argparse
+import sys
+from datetime import date, datetime
+
+from sqlmodel import Session, func, select
+
+from db import engine, init_db
+from models import AttendanceRecord
+from services.archive_service import ARCHIVE_DIR, archive_before
+from services.attendance_rules import RULES, classify_legacy_sources, recompute_attendance
+from services.event_broker import record_change
+from services.overtime_service import recompute_all
+from services.shift_service import ShiftDataService
+from services.partition_service import (
+    PARTITIONED_TABLES,
+    PARTITIONING_ENABLED,
+    check_pruning,
+    detach_month,
+    ensure_future_partitions,
+    ensure_month_partitions,
+    list_partitions,
+)
+
+
+def parse_month(value: str) -> date:
+    """argparse type for YYYY-MM."""
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected YYYY-MM, got '{value}'")
+
+
+def parse_date(value: str) -> date:
+    """argparse type for YYYY-MM-DD."""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected YYYY-MM-DD, got '{value}'")
+
+
+# -----------------------------------------------------------------------------
+# Partition Commands
+# -----------------------------------------------------------------------------
+def partitions_ensure(args) -> int:
+    init_db()
+    if args.start:
+        ensure_month_partitions(engine, args.start, args.end or args.start)
+    else:
+        ensure_future_partitions(engine)
+    return partitions_list(args)
+
+
+def partitions_list(args) -> int:
+    with engine.connect() as conn:
+        for table in PARTITIONED_TABLES:
+            partitions = list_partitions(conn, table)
+            print(f"📦 {table}: {len(partitions)} partition(s)")
+            for name, bound in partitions:
+                print(f"   {name:40} {bound}")
+    return 0
+
+
+def partitions_detach(args) -> int:
+    detached = detach_month(engine, args.month, drop=args.drop)
+    if not detached:
+        print(f"No partitions attached for {args.month:%Y-%m}")
+        return 1
+    action = "Dropped" if args.drop else "Detached"
+    for name in detached:
+        print(f"🗃️  {action} {name}")
+    return 0
+
+
+def partitions_check_pruning(args) -> int:
+    results = check_pruning(engine, args.start, args.end or args.start)
+    failed = False
+    for table, result in results.items():
+        marker = "✅" if result['pruned'] else "❌"
+        failed = failed or not result['pruned']
+        print(f"{marker} {table}: scans {', '.join(result['scanned']) or 'nothing'}")
+    return 1 if failed else 0
+
+
+# -----------------------------------------------------------------------------
+# Archive Commands
+# -----------------------------------------------------------------------------
+def archive(args) -> int:
+    with Session(engine) as session:
+        results = archive_before(session, args.before, dry_run=args.dry_run)
+    if not results:
+        print(f"Nothing to archive before {args.before:%Y-%m}")
+        return 0
+    prefix = "Would archive" if args.dry_run else "Archived"
+    for month, counts in results.items():
+        print(f"{prefix} {month}: " + ", ".join(f"{table} {count}" for table, count in counts.items()))
+    if not args.dry_run:
+        print(f"📁 Archive files are under {ARCHIVE_DIR}/")
+    return 0
+
+
+# -----------------------------------------------------------------------------
+# Backfills
+# -----------------------------------------------------------------------------
+def backfill_punch_stats(args) -> int:
+    init_db()
+    with ShiftDataService() as service:
+        updated = service.backfill_punch_stats(only_missing=not args.all)
+    print(f"✅ Punch stats filled for {updated} shift summaries")
+    return 0
+
+
+def refresh_fingerprints(args) -> int:
+    init_db()
+    with ShiftDataService() as service:
+        updated = service.refresh_fingerprints()
+    print(f"✅ Fingerprints refreshed for {updated} shift summaries")
+    return 0
+
+
+def dedupe_shifts(args) -> int:
+    init_db()
+    with ShiftDataService() as service:
+        counts = service.remove_duplicate_summaries()
+    if not counts["shift_summary"]:
+        print("No duplicate shift summaries")
+        return 0
+    print("🧹 Removed duplicates: " + ", ".join(f"{table} {count}" for table, count in counts.items()))
+    # Now the unique natural key can be created
+    init_db()
+    return 0
+
+
+def assign_store(args) -> int:
+    init_db()
+    with ShiftDataService() as service:
+        counts = service.assign_store(args.store_id, args.start, args.end)
+    print(f"🏪 Assigned store {args.store_id}: " + ", ".join(f"{table} {count}" for table, count in counts.items()))
+    return 0
+
+
+def recompute_overtime(args) -> int:
+    init_db()
+    with Session(engine) as session:
+        written = recompute_all(session, args.start, args.end)
+    print(f"⏱️  Pay-period totals rebuilt: {written} rows")
+    return 0
+
+
+def recompute_attendance_statuses(args) -> int:
+    init_db()
+    with Session(engine) as session:
+        first_day, last_day = session.exec(
+            select(func.min(AttendanceRecord.business_date), func.max(AttendanceRecord.business_date))
+        ).one()
+        if first_day is None:
+            print("No attendance records")
+            return 0
+        start = args.start or first_day
+        end = args.end or last_day
+        print("📋 Rules: " + ", ".join(f"{key}={value}" for key, value in RULES.as_dict().items()))
+        counts = recompute_attendance(session, start, end, args.store_id)
+        record_change(session, "attendance", start, end, store_id=args.store_id, tags=["Attendance"])
+        session.commit()
+    print(f"✅ Attendance recomputed {start} to {end}: {counts['updated']} rows "
+          f"({counts['manual_kept']} manual statuses kept)")
+    return 0
+
+
+def classify_attendance_sources(args) -> int:
+    init_db()
+    with Session(engine) as session:
+        counts = classify_legacy_sources(session)
+    print(f"✅ Attendance sources filled: {counts['derived']} derived, {counts['manual']} manual")
+    return 0
+
+
+def main():
+    """Main entry point."""
+    arg_parser = argparse.ArgumentParser(description="ShiftTrack database maintenance.")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    partitions = commands.add_parser("partitions", help="Monthly partition management (PostgreSQL)")
+    actions = partitions.add_subparsers(dest="action", required=True)
+
+    ensure = actions.add_parser("ensure", help="Create missing monthly partitions")
+    ensure.add_argument("--from", dest="start", type=parse_month,
+                        help="First month (default: current month plus the look-ahead)")
+    ensure.add_argument("--to", dest="end", type=parse_month, help="Last month (default: --from)")
+    ensure.set_defaults(handler=partitions_ensure)
+
+    listing = actions.add_parser("list", help="Show attached partitions")
+    listing.set_defaults(handler=partitions_list)
+
+    detach = actions.add_parser("detach", help="Detach one month from every partitioned table")
+    detach.add_argument("month", type=parse_month, help="Month to detach (YYYY-MM)")
+    detach.add_argument("--drop", action="store_true", help="Drop the detached tables instead of keeping them")
+    detach.set_defaults(handler=partitions_detach)
+
+    pruning = actions.add_parser("check-pruning", help="Verify range queries only scan the matching partitions")
+    pruning.add_argument("--from", dest="start", type=parse_month, required=True, help="First month")
+    pruning.add_argument("--to", dest="end", type=parse_month, help="Last month (default: --from)")
+    pruning.set_defaults(handler=partitions_check_pruning)
+
+    archiving = commands.add_parser("archive", help="Move old months to compressed Parquet files")
+    archiving.add_argument("--before", type=parse_month, required=True,
+                           help="Archive every month before this one (YYYY-MM)")
+    archiving.add_argument("--dry-run", action="store_true", help="Report row counts without moving anything")
+    archiving.set_defaults(handler=archive)
+
+    backfill = commands.add_parser("backfill-punch-stats",
+                                   help="Fill first/last punch times and punch counts on shift summaries")
+    backfill.add_argument("--all", action="store_true", help="Recompute every summary, not just unfilled ones")
+    backfill.set_defaults(handler=backfill_punch_stats)
+
+    fingerprints = commands.add_parser("refresh-fingerprints",
+                                       help="Recompute change-detection fingerprints from the stored shifts")
+    fingerprints.set_defaults(handler=refresh_fingerprints)
+
+    dedupe = commands.add_parser("dedupe-shifts",
+                                 help="Remove duplicate shift summaries so their unique key can be created")
+    dedupe.set_defaults(handler=dedupe_shifts)
+
+    stores = commands.add_parser("assign-store", help="Set the store on rows ingested before stores were tracked")
+    stores.add_argument("store_id", help="Store number, as in the report header (e.g. 1234)")
+    stores.add_argument("--from", dest="start", type=parse_date, help="First business date (YYYY-MM-DD)")
+    stores.add_argument("--to", dest="end", type=parse_date, help="Last business date (YYYY-MM-DD)")
+    stores.set_defaults(handler=assign_store)
+
+    overtime = commands.add_parser("recompute-overtime",
+                                   help="Rebuild weekly/pay-period overtime totals (ingest keeps them current)")
+    overtime.add_argument("--from", dest="start", type=parse_date, help="First business date (YYYY-MM-DD)")
+    overtime.add_argument("--to", dest="end", type=parse_date, help="Last business date (YYYY-MM-DD)")
+    overtime.set_defaults(handler=recompute_overtime)
+
+    attendance = commands.add_parser("recompute-attendance",
+                                     help="Re-derive attendance statuses with the current rules")
+    attendance.add_argument("--from", dest="start", type=parse_date, help="First business date (YYYY-MM-DD)")
+    attendance.add_argument("--to", dest="end", type=parse_date, help="Last business date (YYYY-MM-DD)")
+    attendance.add_argument("--store", dest="store_id", help="Only this store")
+    attendance.set_defaults(handler=recompute_attendance_statuses)
+
+    legacy = commands.add_parser("classify-attendance-sources",
+                                 help="Tell derived from manual statuses on rows stored before status_source")
+    legacy.set_defaults(handler=classify_attendance_sources)
+
+    args = arg_parser.parse_args()
+
+    if args.command == "partitions" and (not PARTITIONING_ENABLED or engine.dialect.name != "postgresql"):
+        print("Error: partitioning needs PostgreSQL and DB_PARTITIONING=monthly")
+        sys.exit(2)
+
+    sys.exit(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+from sqlalchemy import Index, LargeBinary, text
 from sqlmodel import SQLModel, Field, Relationship
 from datetime import datetime, date
 from typing import Optional, List
@@ -9,8 +10,18 @@ class ShiftSummary(SQLModel, table=True):
     Main shift summary table storing daily shift information per employee.
     """
     __tablename__ = "shift_summary"
+    __table_args__ = (
+        Index("ix_shift_summary_store_date", "store_id", "business_date"),
+        Index("ix_shift_summary_store_employee", "store_id", "employee_last_name", "employee_first_name"),
+        # One summary per employee, store and day; ingest relies on it for
+        # ON CONFLICT. Rows without a store compare equal through coalesce.
+        Index("ux_shift_summary_natural_key", text("coalesce(store_id, '')"),
+              "employee_last_name", "employee_first_name", "business_date", unique=True),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
+    # Store number from the report header or upload, e.g. "1234"
+    store_id: Optional[str] = Field(default=None, index=True)
     employee_first_name: str = Field(index=True)
     employee_last_name: str = Field(index=True)
     business_date: date = Field(index=True)
@@ -20,6 +31,18 @@ class ShiftSummary(SQLModel, table=True):
     scheduled_break_hours: Optional[Decimal] = Field(default=0, max_digits=5, decimal_places=3)
     break_hours: Optional[Decimal] = Field(default=None, max_digits=5, decimal_places=3)
     
+    # Denormalized from the punches at ingest, so listings need no join
+    first_punch_at: Optional[datetime] = Field(default=None)
+    last_punch_at: Optional[datetime] = Field(default=None)
+    punch_count: Optional[int] = Field(default=None)
+    
+    # Scheduled segments as packed (start, end) minute pairs from midnight of
+    # business_date (parsers.shift_parser.pack_punches); internal, not serialized
+    scheduled_segments: Optional[bytes] = Field(default=None, sa_type=LargeBinary, exclude=True)
+    
+    # Hash of hours and punch lists from the source report, used to detect corrections
+    fingerprint: Optional[str] = Field(default=None, max_length=32)
+    
     # Timestamps
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -34,9 +57,13 @@ class ShiftPunch(SQLModel, table=True):
     Stores start/end times for each work segment.
     """
     __tablename__ = "shift_punches"
+    __table_args__ = (
+        Index("ix_shift_punches_store_start", "store_id", "start_datetime"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     shift_summary_id: int = Field(foreign_key="shift_summary.id", index=True)
+    store_id: Optional[str] = Field(default=None, index=True)
     
     start_datetime: datetime = Field(index=True)
     end_datetime: datetime = Field(index=True)
@@ -55,9 +82,13 @@ class AttendanceRecord(SQLModel, table=True):
     Derived from ShiftSummary but allows for manual status overrides and notes.
     """
     __tablename__ = "attendance_records"
+    __table_args__ = (
+        Index("ix_attendance_records_store_date", "store_id", "business_date"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     shift_summary_id: Optional[int] = Field(default=None, foreign_key="shift_summary.id", index=True)
+    store_id: Optional[str] = Field(default=None, index=True)
     
     employee_first_name: str = Field(index=True)
     employee_last_name: str = Field(index=True)
@@ -65,6 +96,10 @@ class AttendanceRecord(SQLModel, table=True):
     
     # Status: Present, Absent, Late, Early Departure, Partial
     status: str = Field(default="Present", index=True)
+    # "derived" from the shift by the attendance rules, or "manual" when set by hand
+    # (kept when statuses are recomputed); null on rows that predate the column, which
+    # are kept too until `manage.py classify-attendance-sources` has sorted them
+    status_source: Optional[str] = Field(default="derived")
     
     # Detailed times (can be null if absent)
     actual_start: Optional[datetime] = None
@@ -78,3 +113,102 @@ class AttendanceRecord(SQLModel, table=True):
     notes: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class PayPeriodTotal(SQLModel, table=True):
+    """
+    Hours per employee and pay period, maintained by the overtime service.
+    Rebuilt for the periods an ingest touches, so overtime reports and alerts
+    never rescan the whole shift history.
+    """
+    __tablename__ = "pay_period_totals"
+    __table_args__ = (
+        Index("ix_pay_period_totals_period", "period_start", "store_id"),
+        Index("ix_pay_period_totals_employee", "store_id", "employee_last_name", "employee_first_name", "period_start",
+              unique=True),
+    )
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    store_id: Optional[str] = Field(default=None)
+    employee_first_name: str
+    employee_last_name: str
+    period_start: date
+    period_end: date
+    
+    scheduled_hours: Decimal = Field(default=0, max_digits=7, decimal_places=3)
+    actual_hours: Decimal = Field(default=0, max_digits=7, decimal_places=3)
+    # Sum over the period's workweeks of hours beyond the weekly threshold
+    overtime_hours: Decimal = Field(default=0, max_digits=7, decimal_places=3)
+    max_week_hours: Decimal = Field(default=0, max_digits=7, decimal_places=3)
+    
+    # Highest total over any 7 consecutive calendar days ending in the period
+    max_rolling_hours: Decimal = Field(default=0, max_digits=7, decimal_places=3)
+    max_rolling_end: Optional[date] = None
+    
+    days_worked: int = Field(default=0)
+    # Longest run of consecutive worked days ending in the period
+    max_consecutive_days: int = Field(default=0)
+    # Run still going on period_end (0 if that day was not worked); the next
+    # period continues its streak from here instead of rescanning history
+    trailing_consecutive_days: Optional[int] = None
+    
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class CacheVersion(SQLModel, table=True):
+    """
+    Version counters for in-process caches. A writer bumps the row when the
+    cached data changes; every worker compares it with the version it loaded
+    and reloads when they differ.
+    """
+    __tablename__ = "cache_versions"
+    
+    name: str = Field(primary_key=True)
+    version: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class IngestedFile(SQLModel, table=True):
+    """
+    Ledger of source PDFs that have already been ingested.
+    Keyed by a SHA-256 of the file contents so renamed or re-copied
+    reports are still recognised and skipped.
+    """
+    __tablename__ = "ingested_files"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    content_hash: str = Field(index=True, unique=True)
+    filename: str
+    
+    # Status: done, partial (some records failed to store), failed; only done files are skipped
+    status: str = Field(default="done", index=True)
+    records_parsed: int = Field(default=0)
+    # Totals over every run of the file, so a --force rerun does not zero them
+    summaries_inserted: int = Field(default=0)
+    summaries_updated: int = Field(default=0)
+    error: Optional[str] = None
+    
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ChangeEvent(SQLModel, table=True):
+    """
+    Data changes written by any process (API workers, the ingest daemon, CLI
+    runs), in the writer's transaction. Every API worker polls this table and
+    relays new rows to its /events subscribers as data.changed and alerts.new.
+    """
+    __tablename__ = "change_events"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # upload, ingest, attendance
+    source: str
+    store_id: Optional[str] = None
+    start_date: date
+    end_date: date
+    # Comma-separated RTK Query tags the dashboard should refetch
+    tags: str
+    # Summaries updated since then are the ones this change wrote; alerts are
+    # raised for them (None when the change wrote no summaries)
+    summaries_since: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
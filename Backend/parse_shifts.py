@@ -2,100 +2,210 @@
 PDF Shift Parser - Main Script
 
 Usage:
-    python parse_shifts.py <pdf_file_path>
+    python parse_shifts.py <pdf_file|directory|glob> [...] [--jobs N] [--dry-run] [--force] [--upsert] [--backend NAME]
 
 Example:
     python parse_shifts.py ./shift_report.pdf
+    python parse_shifts.py doc/ "archive/2024-*.pdf" --jobs 8
+    python parse_shifts.py doc/ --dry-run
+    python parse_shifts.py corrected_report.pdf --upsert
 """
 
-import sys
+import argparse
+import contextlib
+import io
 import os
-from pathlib import Path
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional, Tuple
 
-from parsers.shift_parser import PDFParser, PyMuPDFParser
-from services.shift_service import ShiftDataService
-from db import init_db
+from parsers.shift_parser import PDFParser, ShiftRecord
+from utils.file_utils import expand_pdf_paths, file_sha256
+from utils.pdf_utils import EXTRACTORS
 
 
-def parse_and_store_shifts(pdf_path: str, use_fallback: bool = False):
+def parse_file(pdf_path: str, backend: Optional[str] = None, verbose: bool = False,
+               store_id: Optional[str] = None) -> Tuple[str, List[ShiftRecord], Optional[str]]:
     """
-    Main function to parse PDF and store data in database.
-    
-    Args:
-        pdf_path: Path to the PDF file
-        use_fallback: If True, use PyMuPDF instead of pdfplumber
+    Parse a single PDF. Runs inside a worker process.
+
+    Returns:
+        (pdf_path, records, error message or None)
     """
-    # Validate file exists
-    if not os.path.exists(pdf_path):
-        print(f"Error: File not found: {pdf_path}")
-        return
-    
-    # Initialize database
-    print("🗄️  Initializing database...")
-    init_db()
-    print()
-    
-    # Choose parser
-    parser_class = PyMuPDFParser if use_fallback else PDFParser
-    parser_name = "PyMuPDF" if use_fallback else "pdfplumber"
-    
+    # Parser progress output from parallel workers interleaves badly, so it
+    # is captured unless --verbose is given.
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
     try:
-        # Parse PDF
-        print(f"📊 Using {parser_name} parser...")
-        parser = parser_class(pdf_path)
-        records = parser.parse()
-        
-        if not records:
-            print("⚠️  No records found in PDF")
-            return
-        
-        # Store in database
-        print("\n💾 Storing records in database...")
-        with ShiftDataService() as service:
-            stats = service.insert_shift_records(records)
-        
-        # Print summary
-        print(f"\n{'='*60}")
-        print("IMPORT SUMMARY")
-        print(f"{'='*60}")
-        print(f"Total records parsed:     {stats['total_records']}")
-        print(f"Shift summaries inserted: {stats['summaries_inserted']}")
-        print(f"Punch records inserted:   {stats['punches_inserted']}")
-        print(f"Errors:                   {stats['errors']}")
-        print(f"{'='*60}\n")
-        
-        if stats['summaries_inserted'] > 0:
-            print("Import completed successfully!")
-        else:
-            print("No new records were inserted (possible duplicates)")
-    
+        with output:
+            records = PDFParser(pdf_path, backend=backend, store_id=store_id).parse()
+        return pdf_path, records, None
     except ImportError as e:
-        if "pdfplumber" in str(e) and not use_fallback:
-            print(f"pdfplumber not available: {e}")
-            print("Retrying with PyMuPDF fallback...")
-            parse_and_store_shifts(pdf_path, use_fallback=True)
-        else:
-            print(f"Import error: {e}")
-            print("\nMake sure you have installed the required packages:")
-            print("   pip install pdfplumber pymupdf")
-    
+        return pdf_path, [], f"{e} (install with: pip install pdfplumber pymupdf)"
     except Exception as e:
-        print(f"Error during parsing: {e}")
-        import traceback
-        traceback.print_exc()
+        if verbose:
+            traceback.print_exc()
+        return pdf_path, [], str(e)
+
+
+def parse_and_store_shifts(inputs: List[str], jobs: int = 1, dry_run: bool = False,
+                           force: bool = False, upsert: bool = False,
+                           backend: Optional[str] = None, verbose: bool = False,
+                           store_id: Optional[str] = None) -> dict:
+    """
+    Parse every PDF matched by the inputs and store the records in the database.
+
+    Args:
+        inputs: PDF files, directories or glob patterns
+        jobs: Number of parser processes
+        dry_run: Parse only, never touch the database
+        force: Re-ingest files that the ledger marks as already done
+        upsert: Rewrite stored shifts whose contents changed instead of skipping them
+        backend: PDF extraction backend name (default: PDFParser.BACKEND, usually "auto")
+        verbose: Show per-file parser output
+        store_id: Store for every file (default: read from each report header)
+    """
+    totals = {
+        'files_found': 0,
+        'files_skipped': 0,
+        'files_parsed': 0,
+        'files_failed': 0,
+        'total_records': 0,
+        'summaries_inserted': 0,
+        'summaries_updated': 0,
+        'summaries_unchanged': 0,
+        'summaries_archived': 0,
+        'punches_inserted': 0,
+        'errors': 0,
+    }
+
+    pdf_paths = expand_pdf_paths(inputs)
+    totals['files_found'] = len(pdf_paths)
+    if not pdf_paths:
+        print("Error: No PDF files matched the given paths")
+        return totals
+
+    hashes = {path: file_sha256(path) for path in pdf_paths}
+
+    service = None
+    if not dry_run:
+        # Imported lazily so --dry-run works without a configured database
+        from db import init_db
+        from services.shift_service import ShiftDataService
+
+        print("🗄️  Initializing database...")
+        init_db()
+        print()
+        service = ShiftDataService()
+
+        if not force:
+            done = service.get_ingested_hashes(list(set(hashes.values())))
+            skipped = [p for p in pdf_paths if hashes[p] in done]
+            for path in skipped:
+                print(f"⏭️  Already ingested, skipping: {path}")
+            totals['files_skipped'] = len(skipped)
+            pdf_paths = [p for p in pdf_paths if hashes[p] not in done]
+
+    parser_name = backend or PDFParser.BACKEND
+    jobs = max(1, min(jobs, len(pdf_paths) or 1))
+    print(f"📊 Parsing {len(pdf_paths)} file(s) with {parser_name} backend using {jobs} process(es)...")
+
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(parse_file, path, backend, verbose, store_id) for path in pdf_paths]
+            # Results are written as they arrive, all through the single service session
+            for future in as_completed(futures):
+                path, records, error = future.result()
+
+                if error:
+                    totals['files_failed'] += 1
+                    print(f"❌ {path}: {error}")
+                    if service:
+                        service.record_ingested_file(hashes[path], os.path.basename(path),
+                                                     status="failed", error=error)
+                    continue
+
+                totals['files_parsed'] += 1
+                totals['total_records'] += len(records)
+                print(f"✅ {path}: {len(records)} records")
+
+                if not service:
+                    continue
+
+                stats = service.insert_shift_records(records, upsert=upsert)
+                for key in ('summaries_inserted', 'summaries_updated', 'summaries_unchanged',
+                            'summaries_archived', 'punches_inserted', 'errors'):
+                    totals[key] += stats[key]
+                entry = service.record_ingested_file(hashes[path], os.path.basename(path), stats)
+                if entry.status != "done":
+                    print(f"⚠️  {path}: {stats['errors']} record(s) not stored; the file will be retried on the next run")
+    finally:
+        if service:
+            service.close()
+
+    # Print summary
+    print(f"\n{'='*60}")
+    print("IMPORT SUMMARY" + (" (dry run)" if dry_run else ""))
+    print(f"{'='*60}")
+    print(f"Files found:              {totals['files_found']}")
+    print(f"Files skipped (ingested): {totals['files_skipped']}")
+    print(f"Files parsed:             {totals['files_parsed']}")
+    print(f"Files failed:             {totals['files_failed']}")
+    print(f"Total records parsed:     {totals['total_records']}")
+    print(f"Shift summaries inserted: {totals['summaries_inserted']}")
+    print(f"Shift summaries updated:  {totals['summaries_updated']}")
+    print(f"Unchanged summaries:      {totals['summaries_unchanged']}")
+    print(f"Skipped (archived month): {totals['summaries_archived']}")
+    print(f"Punch records inserted:   {totals['punches_inserted']}")
+    print(f"Errors:                   {totals['errors']}")
+    print(f"{'='*60}\n")
+
+    if dry_run:
+        print("Dry run complete, nothing was written.")
+    elif totals['summaries_inserted'] > 0 or totals['summaries_updated'] > 0:
+        print("Import completed successfully!")
+    elif totals['files_parsed'] > 0:
+        print("No new records were inserted (possible duplicates)")
+
+    return totals
 
 
 def main():
     """Main entry point."""
-    if len(sys.argv) < 2:
-        print("Usage: python parse_shifts.py <pdf_file_path>")
-        print("\nExample:")
-        print("  python parse_shifts.py ./shift_report.pdf")
-        print("  python parse_shifts.py /path/to/scheduled_vs_actual.pdf")
+    arg_parser = argparse.ArgumentParser(
+        description="Parse 'Scheduled vs Actual Hours' PDF reports into the database."
+    )
+    arg_parser.add_argument("paths", nargs="+", help="PDF files, directories or glob patterns")
+    arg_parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                            help="Number of parser processes (default: CPU count)")
+    arg_parser.add_argument("--dry-run", action="store_true",
+                            help="Parse and report without writing to the database")
+    arg_parser.add_argument("--force", action="store_true",
+                            help="Re-ingest files that were already ingested")
+    arg_parser.add_argument("--upsert", action="store_true",
+                            help="Update shifts whose contents changed (corrected re-exports)")
+    arg_parser.add_argument("--backend", choices=["auto", *EXTRACTORS],
+                            help="PDF extraction backend (default: auto-select)")
+    arg_parser.add_argument("--fallback", action="store_const", const="pymupdf", dest="backend",
+                            help="Shorthand for --backend pymupdf")
+    arg_parser.add_argument("--store", dest="store_id",
+                            help="Store number for these reports (default: read from the report header)")
+    arg_parser.add_argument("-v", "--verbose", action="store_true",
+                            help="Show per-file parser output")
+    args = arg_parser.parse_args()
+
+    totals = parse_and_store_shifts(
+        args.paths,
+        jobs=args.jobs,
+        dry_run=args.dry_run,
+        force=args.force,
+        upsert=args.upsert,
+        backend=args.backend,
+        verbose=args.verbose,
+        store_id=args.store_id,
+    )
+    if totals['files_failed'] or totals['errors']:
         sys.exit(1)
-    
-    pdf_path = sys.argv[1]
-    parse_and_store_shifts(pdf_path)
 
 
 if __name__ == "__main__":
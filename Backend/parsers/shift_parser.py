@@ -1,6 +1,7 @@
 """
-PDF Parser for Burger King Shift Reports
+PDF Parser for Restaurant Shift Reports
 Extracts employee shift data from "Scheduled vs Actual Hours" PDFs.
+The store a report belongs to is read from its "<Franchisee> - <Brand> #<number>" header.
 
 Core Architecture:
 1. clean_lines(lines) → normalized lines
@@ -8,27 +9,90 @@ Core Architecture:
 3. parse_record(record_lines) → structured data
 """
 
+import contextlib
+import functools
+import hashlib
+import io
+import os
 import re
-from typing import List, Dict, Optional, Tuple
-from datetime import datetime, date, timedelta
+import sys
+from array import array
+from typing import Any, Callable, List, Dict, Optional, Sequence, Tuple
+from datetime import datetime, date, time, timedelta
 from decimal import Decimal
 from dataclasses import dataclass
 
 # Local imports
-from utils.pdf_utils import extract_text_with_pdfplumber, extract_text_with_pymupdf
+from utils.pdf_utils import (
+    REFERENCE_EXTRACTOR, PDFSource, TextExtractor, available_extractors, get_extractor, source_name,
+)
 from utils.artifact_handler import save_pipeline_artifact
-from utils.time_utils import parse_time_12h
+from utils.page_cache import PageCache, page_digests
+from utils.profiler import profiled
+from utils.time_utils import parse_minutes_12h
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class PunchTime:
-    """Represents a single punch time range."""
-    start: datetime
-    end: datetime
-    duration_minutes: int
+    """
+    Represents a single punch time range.
+    Stored as minute offsets from midnight of the business date; the
+    datetime endpoints are only built when a consumer asks for them.
+    """
+    business_date: date
+    start_minute: int
+    end_minute: int
+
+    @property
+    def start(self) -> datetime:
+        return datetime.combine(self.business_date, time()) + timedelta(minutes=self.start_minute)
+
+    @property
+    def end(self) -> datetime:
+        return datetime.combine(self.business_date, time()) + timedelta(minutes=self.end_minute)
+
+    @property
+    def duration_minutes(self) -> int:
+        return self.end_minute - self.start_minute
+
+# Packed punches are stored (scheduled_segments) and fingerprinted, so their
+# byte order is fixed to little-endian whatever the host's
+_NATIVE_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+def pack_punches(punches: Sequence[PunchTime]) -> bytes:
+    """Pack punches into little-endian unsigned 16-bit (start, end) minute pairs."""
+    minutes = array('H', [m for p in punches for m in (p.start_minute, p.end_minute)])
+    if not _NATIVE_LITTLE_ENDIAN:
+        minutes.byteswap()
+    return minutes.tobytes()
+
+def _packed_minutes(packed: bytes) -> Sequence[int]:
+    """The minute values of pack_punches bytes."""
+    if _NATIVE_LITTLE_ENDIAN:
+        return memoryview(packed).cast('H')
+    minutes = array('H', packed)
+    minutes.byteswap()
+    return minutes
 
-@dataclass
+def unpack_punches(business_date: date, packed: bytes) -> Tuple[PunchTime, ...]:
+    """Materialize PunchTime views over packed minute pairs."""
+    minutes = _packed_minutes(packed)
+    return tuple(
+        PunchTime(business_date, minutes[i], minutes[i + 1])
+        for i in range(0, len(minutes), 2)
+    )
+
+def unpack_minutes(packed: bytes) -> List[Tuple[int, int]]:
+    """(start, end) minute pairs from pack_punches bytes, without building PunchTimes."""
+    minutes = _packed_minutes(packed)
+    return [(minutes[i], minutes[i + 1]) for i in range(0, len(minutes), 2)]
+
+@dataclass(frozen=True, slots=True)
 class ShiftRecord:
-    """Represents a complete shift record for one employee on one day."""
+    """
+    Represents a complete shift record for one employee on one day.
+    Punch lists are kept packed (see pack_punches) so large reports stay
+    small in memory; `punches` and `scheduled_punches` unpack on access.
+    """
     employee_first_name: str
     employee_last_name: str
     business_date: date
@@ -36,8 +100,75 @@ class ShiftRecord:
     scheduled_working_hours: Optional[Decimal]
     scheduled_break_hours: Optional[Decimal]
     break_hours: Optional[Decimal]
-    punches: List[PunchTime]
-    scheduled_punches: List[PunchTime]
+    packed_punches: bytes = b''
+    packed_scheduled_punches: bytes = b''
+    store_id: Optional[str] = None
+
+    @property
+    def punches(self) -> Tuple[PunchTime, ...]:
+        return unpack_punches(self.business_date, self.packed_punches)
+
+    @property
+    def scheduled_punches(self) -> Tuple[PunchTime, ...]:
+        return unpack_punches(self.business_date, self.packed_scheduled_punches)
+
+    def fingerprint(self) -> str:
+        """
+        Stable hash of the hours and punch lists.
+        Used to tell a corrected re-export apart from an identical one.
+        """
+        def hours(value: Optional[Decimal]) -> str:
+            return '' if value is None else str(value.normalize())
+
+        payload = '|'.join([
+            hours(self.actual_working_hours),
+            hours(self.scheduled_working_hours),
+            hours(self.scheduled_break_hours),
+            hours(self.break_hours),
+        ]).encode()
+        digest = hashlib.blake2b(payload, digest_size=16)
+        # Length prefix keeps the actual/scheduled boundary unambiguous
+        digest.update(len(self.packed_punches).to_bytes(2, 'little'))
+        digest.update(self.packed_punches)
+        digest.update(self.packed_scheduled_punches)
+        return digest.hexdigest()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain representation for artifacts and debugging."""
+        def punch_dicts(punches: Tuple[PunchTime, ...]) -> List[Dict[str, Any]]:
+            return [
+                {'start': p.start, 'end': p.end, 'duration_minutes': p.duration_minutes}
+                for p in punches
+            ]
+
+        return {
+            'store_id': self.store_id,
+            'employee_first_name': self.employee_first_name,
+            'employee_last_name': self.employee_last_name,
+            'business_date': self.business_date,
+            'actual_working_hours': self.actual_working_hours,
+            'scheduled_working_hours': self.scheduled_working_hours,
+            'scheduled_break_hours': self.scheduled_break_hours,
+            'break_hours': self.break_hours,
+            'punches': punch_dicts(self.punches),
+            'scheduled_punches': punch_dicts(self.scheduled_punches),
+        }
+
+@functools.lru_cache(maxsize=1024)
+def parse_business_date(date_str: str) -> date:
+    """Parse MM/DD/YYYY; cached so every record of a day shares one date object."""
+    return datetime.strptime(date_str, '%m/%d/%Y').date()
+
+@functools.lru_cache(maxsize=4096)
+def parse_hours(value: str) -> Decimal:
+    """Parse an hours column; cached so repeated values (7.50, 0.50...) share one Decimal."""
+    return Decimal(value)
+
+# Validation verdicts per (backend, layout key), shared by every parser in the process
+_BACKEND_VERDICTS: Dict[Tuple[str, Tuple[str, ...]], bool] = {}
+
+# Extracted-page cache shared by every parser in the process
+_PAGE_CACHE = PageCache()
 
 class PDFParser:
     """
@@ -45,6 +176,9 @@ class PDFParser:
     Handles cleaning, grouping, and parsing of employee records.
     """
     
+    # Extraction backend: a name from utils.pdf_utils.EXTRACTORS, or "auto"
+    BACKEND = os.getenv("PDF_BACKEND", "auto")
+    
     # Regex patterns
     EMPLOYEE_DATE_PATTERN = re.compile(
         r'^([A-Za-z\-\']+),\s+([A-Za-z\-\']+)\s+(\d{1,2}/\d{1,2}/\d{4})'
@@ -52,19 +186,56 @@ class PDFParser:
     TIME_PATTERN = re.compile(
         r'(\d{1,2}:\d{2}[ap])\s*-\s*(\d{1,2}:\d{2}[ap])'
     )
+    # Report header naming the store, e.g. "JS Foods - BURGER KING #1234"
+    STORE_HEADER_PATTERN = re.compile(
+        r'^(?P<franchisee>.+?)\s+-\s+(?P<brand>.+?)\s*#\s*(?P<number>[A-Za-z0-9\-]+)\s*$'
+    )
     
-    def __init__(self, pdf_path: str):
-        self.pdf_path = pdf_path
+    def __init__(self, source: PDFSource, backend: Optional[str] = None, name: Optional[str] = None,
+                 page_cache: Optional[PageCache] = _PAGE_CACHE, store_id: Optional[str] = None,
+                 progress: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        """
+        Args:
+            source: PDF path, bytes-like object or binary file (e.g. a spooled upload)
+            backend: Extraction backend name or "auto"
+            name: Display name for logs and artifacts (defaults to the path or file name)
+            page_cache: Extracted-page cache (None disables caching)
+            store_id: Store the report belongs to; read from the report header when omitted
+            progress: Called as progress(stage, info) after each pipeline stage
+        """
+        self.source = source
+        self.store_id = store_id
+        self.progress = progress
+        self.pdf_path = name or source_name(source)
+        self.backend = backend or self.BACKEND
+        self.page_cache = page_cache
         self.artifact_dir = "pipeline_artifacts"
+        
+        self._page_digests = None
+        self.cache_stats = {'pages': 0, 'hits': 0, 'misses': 0}
 
     # -------------------------------------------------------------------------
     # Core Step 1: Clean and Normalize Lines
     # -------------------------------------------------------------------------
+    def detect_store_id(self, lines: List[str]) -> Optional[str]:
+        """
+        Store number from the report header, e.g. "1234" for
+        "JS Foods - BURGER KING #1234". Returns None if no header matches.
+        """
+        stores = []
+        for line in lines:
+            match = self.STORE_HEADER_PATTERN.match(re.sub(r'\s+', ' ', line).strip())
+            if match and match.group('number') not in stores:
+                stores.append(match.group('number'))
+        if len(stores) > 1:
+            print(f"⚠️  Report headers name several stores ({', '.join(stores)}); using {stores[0]}")
+        return stores[0] if stores else None
+
     def clean_lines(self, lines: List[str]) -> List[str]:
         """Normalize and filter junk lines."""
         cleaned = []
         skip_patterns = [
-            'Scheduled vs Actual Hours', 'JS Foods', 'BURGER KING',
+            'Scheduled vs Actual Hours',
             'Employee', 'Business', 'Labor Type', 'Break', 'Hours',
             'Date', 'Time', 'Worked', '---', '===', 'Total:', 'Page',
             'Global Payments Inc', 'strictly prohibited', 'Difference',
@@ -74,6 +245,8 @@ class PDFParser:
             line = re.sub(r'\s+', ' ', line).strip()
             if not line or any(pattern in line for pattern in skip_patterns):
                 continue
+            if self.STORE_HEADER_PATTERN.match(line):
+                continue
             cleaned.append(line)
         return cleaned
 
@@ -113,10 +286,11 @@ class PDFParser:
             if not match:
                 return None
             
-            first_name = match.group(1).strip()
-            last_name = match.group(2).strip()
+            # Names repeat on every day of the report; intern them so records share one copy
+            first_name = sys.intern(match.group(1).strip())
+            last_name = sys.intern(match.group(2).strip())
             date_str = match.group(3).strip()
-            business_date = datetime.strptime(date_str, '%m/%d/%Y').date()
+            business_date = parse_business_date(date_str)
             
             actual_working_hours = None
             scheduled_working_hours = None
@@ -132,8 +306,8 @@ class PDFParser:
                         try:
                             decimals = [p for p in parts if '.' in p]
                             if len(decimals) >= 2:
-                                b_h = Decimal(decimals[0])
-                                a_h = Decimal(decimals[1])
+                                b_h = parse_hours(decimals[0])
+                                a_h = parse_hours(decimals[1])
                                 if a_h < 100:
                                     break_hours = b_h
                                     actual_working_hours = a_h
@@ -146,13 +320,13 @@ class PDFParser:
                         try:
                             decimals = [p for p in parts if '.' in p]
                             if len(decimals) >= 2:
-                                sb_h = Decimal(decimals[0])
-                                sw_h = Decimal(decimals[1])
+                                sb_h = parse_hours(decimals[0])
+                                sw_h = parse_hours(decimals[1])
                                 if sw_h < 100:
                                     scheduled_break_hours = sb_h
                                     scheduled_working_hours = sw_h
                             elif len(decimals) == 1:
-                                sw_h = Decimal(decimals[0])
+                                sw_h = parse_hours(decimals[0])
                                 if sw_h < 100:
                                     scheduled_working_hours = sw_h
                         except: pass
@@ -166,8 +340,9 @@ class PDFParser:
                 scheduled_working_hours=scheduled_working_hours,
                 scheduled_break_hours=scheduled_break_hours,
                 break_hours=break_hours,
-                punches=punches,
-                scheduled_punches=scheduled_punches or [],
+                packed_punches=pack_punches(punches),
+                packed_scheduled_punches=pack_punches(scheduled_punches),
+                store_id=self.store_id,
             )
         except Exception as e:
             print(f"⚠️  Error parsing record: {e}")
@@ -187,45 +362,179 @@ class PDFParser:
 
     def parse_single_punch(self, start_str: str, end_str: str, business_date: date) -> Optional[PunchTime]:
         """Parse a single punch range, handling cross-midnight shifts."""
-        start_time = parse_time_12h(start_str)
-        end_time = parse_time_12h(end_str)
-        if not start_time or not end_time:
+        start_minute = parse_minutes_12h(start_str)
+        end_minute = parse_minutes_12h(end_str)
+        if start_minute is None or end_minute is None:
             return None
         
-        start_dt = datetime.combine(business_date, start_time)
-        end_dt = datetime.combine(business_date, end_time)
-        
-        if start_time.hour >= 12 and end_time.hour < 12:
-            end_dt += timedelta(days=1)
-        elif end_dt <= start_dt:
-            end_dt += timedelta(days=1)
+        if start_minute >= 12 * 60 and end_minute < 12 * 60:
+            end_minute += 24 * 60
+        elif end_minute <= start_minute:
+            end_minute += 24 * 60
         
-        duration = int((end_dt - start_dt).total_seconds() / 60)
-        return PunchTime(start=start_dt, end=end_dt, duration_minutes=duration)
+        return PunchTime(business_date, start_minute, end_minute)
 
+    # -------------------------------------------------------------------------
+    # Backend Selection
+    # -------------------------------------------------------------------------
+    def extract_lines(self) -> List[str]:
+        """
+        Extract raw text lines with the configured backend.
+        In "auto" mode, installed backends are tried fastest first and a
+        backend is only accepted once it has been validated against the
+        reference backend for this report layout.
+        """
+        if self.backend == "auto":
+            candidates = available_extractors()
+        else:
+            preferred = get_extractor(self.backend)
+            candidates = [preferred] + [e for e in available_extractors() if e is not preferred]
+        
+        if not candidates:
+            raise ImportError("No PDF backend installed. Run: pip install pdfplumber pymupdf")
+        
+        last_error = None
+        for extractor in candidates:
+            try:
+                if self.backend == "auto" and extractor.name != REFERENCE_EXTRACTOR:
+                    # Validate on the first page before paying for the whole document
+                    first_page = self.extract_pages(extractor, [0])
+                    if not self.validate_backend(extractor, first_page):
+                        print(f"⚠️  {extractor.name} output does not match {REFERENCE_EXTRACTOR} "
+                              f"for this layout, skipping")
+                        continue
+                pages = self.extract_pages(extractor)
+            except Exception as e:
+                last_error = e
+                print(f"⚠️  {extractor.name} failed, trying next backend: {e}")
+                continue
+            
+            print(f"📄 Extracted {len(pages)} pages with {extractor.name}")
+            return [line for page in pages for line in page]
+        
+        raise last_error or ValueError("No PDF backend produced valid output")
+    
+    def extract_pages(self, extractor: TextExtractor, page_numbers: Optional[List[int]] = None) -> List[List[str]]:
+        """
+        Extract pages through the page cache.
+        Pages whose content has been seen before (e.g. the repeated days of a
+        cumulative period-to-date report) are read back from the cache and
+        only unseen pages go through the backend.
+        """
+        cache = self.page_cache
+        if not cache or not cache.enabled:
+            return extractor.extract_pages(self.source, page_numbers)
+        
+        if self._page_digests is None:
+            try:
+                self._page_digests = page_digests(self.source) or []
+            except Exception as e:
+                print(f"⚠️  Could not hash pages, page cache disabled for this file: {e}")
+                self._page_digests = []
+        if not self._page_digests:
+            return extractor.extract_pages(self.source, page_numbers)
+        
+        indexes = list(range(len(self._page_digests))) if page_numbers is None else list(page_numbers)
+        keys = {i: cache.key(extractor.name, self._page_digests[i]) for i in indexes}
+        
+        pages = {}
+        missing = []
+        for i in indexes:
+            lines = cache.get(keys[i])
+            if lines is None:
+                missing.append(i)
+            else:
+                pages[i] = lines
+        
+        if missing:
+            for i, lines in zip(missing, extractor.extract_pages(self.source, missing)):
+                cache.put(keys[i], lines)
+                pages[i] = lines
+        
+        if page_numbers is None:
+            self.cache_stats = {
+                'pages': len(indexes),
+                'hits': len(indexes) - len(missing),
+                'misses': len(missing),
+            }
+        return [pages[i] for i in indexes]
+    
+    def validate_backend(self, extractor: TextExtractor, first_page: List[List[str]]) -> bool:
+        """
+        Check that a backend's first page groups into the same records as the
+        reference backend's. The verdict is cached per report layout, so only
+        the first report of each layout pays for a reference extraction.
+        """
+        if extractor.name == REFERENCE_EXTRACTOR:
+            return True
+        
+        key = (extractor.name, self.layout_key(first_page))
+        if key in _BACKEND_VERDICTS:
+            return _BACKEND_VERDICTS[key]
+        
+        try:
+            reference = self.extract_pages(get_extractor(REFERENCE_EXTRACTOR), [0])
+        except Exception as e:
+            # Nothing to compare against; accept the candidate without caching
+            print(f"⚠️  Cannot validate {extractor.name} ({REFERENCE_EXTRACTOR} unavailable: {e})")
+            return True
+        
+        verdict = self.records_match(first_page[0], reference[0])
+        _BACKEND_VERDICTS[key] = verdict
+        return verdict
+    
+    def records_match(self, lines: List[str], reference_lines: List[str]) -> bool:
+        """Whether two extractions clean and group into identical parsed records."""
+        def parsed(raw: List[str]):
+            with contextlib.redirect_stdout(io.StringIO()):
+                records = [self.parse_record(g) for g in self.group_into_records(self.clean_lines(raw))]
+            return [
+                (r.employee_first_name, r.employee_last_name, r.business_date, r.fingerprint())
+                for r in records if r
+            ]
+        
+        return parsed(lines) == parsed(reference_lines)
+    
+    @staticmethod
+    def layout_key(pages: List[List[str]]) -> Tuple[str, ...]:
+        """
+        Identify a report layout by the header lines of its first page,
+        with digits masked so dates and store numbers do not matter.
+        """
+        header = pages[0][:3] if pages else []
+        return tuple(re.sub(r'\d', '#', re.sub(r'\s+', ' ', line).strip()) for line in header)
+    
     # -------------------------------------------------------------------------
     # Pipeline Orchestration
     # -------------------------------------------------------------------------
+    @profiled
     def parse(self) -> List[ShiftRecord]:
         """Main parsing execution pipeline."""
         print(f"\n{'='*60}\n🔍 Starting PDF parsing: {self.pdf_path}\n{'='*60}\n")
         
         # 1. Extraction
-        try:
-            lines = extract_text_with_pdfplumber(self.pdf_path)
-        except Exception as e:
-            print(f"⚠️  pdfplumber failed, falling back to PyMuPDF: {e}")
-            lines = extract_text_with_pymupdf(self.pdf_path)
+        lines = self.extract_lines()
+        if self.cache_stats['pages']:
+            stats = self.cache_stats
+            print(f"🗂️  Page cache: {stats['hits']}/{stats['pages']} pages reused, "
+                  f"{stats['misses']} extracted ({stats['hits'] / stats['pages']:.0%} hit rate)")
         
         save_pipeline_artifact(self.artifact_dir, self.pdf_path, "stage1_raw_text", lines)
         
+        if self.store_id is None:
+            self.store_id = self.detect_store_id(lines)
+        print(f"🏪 Store: {self.store_id or 'unknown'}")
+        self._report("extracted", lines=len(lines), store_id=self.store_id)
+        
         # 2. Cleaning
         cleaned_lines = self.clean_lines(lines)
         save_pipeline_artifact(self.artifact_dir, self.pdf_path, "stage2_cleaned_lines", cleaned_lines)
+        self._report("cleaned", lines=len(cleaned_lines))
         
         # 3. Grouping
         record_groups = self.group_into_records(cleaned_lines)
         save_pipeline_artifact(self.artifact_dir, self.pdf_path, "stage3_grouped_records", record_groups)
+        self._report("grouped", groups=len(record_groups))
         
         # 4. Parsing
         records = []
@@ -236,14 +545,20 @@ class PDFParser:
                 print(f"   ✅ Record {i}: {record.employee_first_name} {record.employee_last_name} - {record.business_date}")
         
         save_pipeline_artifact(self.artifact_dir, self.pdf_path, "stage4_parsed_records", records)
+        self._report("parsed", records=len(records), skipped=len(record_groups) - len(records))
         
         print(f"\n{'='*60}\n✅ Parsing complete: {len(records)} records successfully parsed\n{'='*60}\n")
         return records
 
+    def _report(self, stage: str, **info):
+        """Pass stage progress to the progress callback; a failing callback never stops parsing."""
+        if self.progress is None:
+            return
+        try:
+            self.progress(stage, info)
+        except Exception as e:
+            print(f"⚠️  Progress callback failed at {stage}: {e}")
+
 class PyMuPDFParser(PDFParser):
-    """Subclass that overrides text extraction to use PyMuPDF."""
-    def parse(self) -> List[ShiftRecord]:
-        # Implementation could be customized here if needed, 
-        # but the base parse() already handles fallback.
-        # Keeping it for backward compatibility if needed.
-        return super().parse()
+    """Parser pinned to the PyMuPDF backend (other backends only on failure)."""
+    BACKEND = "pymupdf"
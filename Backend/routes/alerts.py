@@ -1,15 +1,20 @@
 from fastapi import APIRouter, Depends
+from sqlalchemy import or_
 from sqlmodel import Session, select
 from typing import List, Dict, Any
 from datetime import datetime, date
 from decimal import Decimal
 
-from db import get_session
-from models import ShiftSummary, ShiftPunch
+from db import get_read_session
+from models import ShiftSummary, ShiftPunch, PayPeriodTotal
+from services.overtime_service import MAX_CONSECUTIVE_DAYS, WEEKLY_OVERTIME_HOURS
+from utils.profiler import ProfiledRoute
+from utils.query_stats import query_budget
 
 router = APIRouter(
     prefix="/alerts",
     tags=["alerts"],
+    route_class=ProfiledRoute,
 )
 
 def calculate_alerts(summary: ShiftSummary) -> List[Dict[str, Any]]:
@@ -88,11 +93,48 @@ def calculate_alerts(summary: ShiftSummary) -> List[Dict[str, Any]]:
 
     return alerts
 
+def calculate_period_alerts(total: PayPeriodTotal) -> List[Dict[str, Any]]:
+    """Alerts that need more than one day: weekly overtime and consecutive days."""
+    alerts = []
+    
+    employee_name = f"{total.employee_first_name} {total.employee_last_name}"
+    period = f"{total.period_start.isoformat()}_{total.store_id or ''}_{total.employee_last_name}_{total.employee_first_name}"
+    
+    # 6. Weekly Overtime
+    overtime_hours = float(total.overtime_hours or 0)
+    if overtime_hours > 0:
+        alerts.append({
+            "id": f"weekly-ot-{period}",
+            "type": "Weekly Overtime",
+            "employeeName": employee_name,
+            "severity": "high",
+            "message": f"Worked {overtime_hours:.1f}h beyond {float(WEEKLY_OVERTIME_HOURS):g}h/week in the pay period "
+                       f"starting {total.period_start.isoformat()} (busiest week {float(total.max_week_hours):.1f}h).",
+            "date": (total.max_rolling_end or total.period_end).isoformat(),
+            "suggestion": "Confirm overtime was approved and will be paid at the overtime rate."
+        })
+    
+    # 7. Consecutive Days
+    if total.max_consecutive_days > MAX_CONSECUTIVE_DAYS:
+        alerts.append({
+            "id": f"consecutive-{period}",
+            "type": "Consecutive Days",
+            "employeeName": employee_name,
+            "severity": "medium",
+            "message": f"Worked {total.max_consecutive_days} days in a row "
+                       f"(limit {MAX_CONSECUTIVE_DAYS}) in the pay period starting {total.period_start.isoformat()}.",
+            "date": total.period_end.isoformat(),
+            "suggestion": "Schedule a rest day."
+        })
+    
+    return alerts
+
 @router.get("/")
+@query_budget(2)
 def get_alerts(
     start_date: str = None,
     end_date: str = None,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """
     Fetch all auto-detected alerts for a given date range.
@@ -111,6 +153,18 @@ def get_alerts(
     all_alerts = []
     for summary in summaries:
         all_alerts.extend(calculate_alerts(summary))
+    
+    # Multi-day rules come from the precomputed pay-period totals
+    periods = select(PayPeriodTotal).where(or_(
+        PayPeriodTotal.overtime_hours > 0,
+        PayPeriodTotal.max_consecutive_days > MAX_CONSECUTIVE_DAYS
+    ))
+    if start_date:
+        periods = periods.where(PayPeriodTotal.period_end >= datetime.strptime(start_date, '%Y-%m-%d').date())
+    if end_date:
+        periods = periods.where(PayPeriodTotal.period_start <= datetime.strptime(end_date, '%Y-%m-%d').date())
+    for total in session.exec(periods).all():
+        all_alerts.extend(calculate_period_alerts(total))
         
     # Sort by severity (high first) and then by date
     severity_order = {"high": 0, "medium": 1, "low": 2}
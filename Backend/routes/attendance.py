@@ -1,24 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlmodel import Session, select, func
 from typing import List, Optional
 from datetime import datetime, date
 
 # Local imports
-from db import get_session
+from db import get_read_session, get_write_session, mark_write
 from models import AttendanceRecord
+from services.attendance_rules import RULES, STATUS_SOURCE_MANUAL, recompute_attendance
+from services.event_broker import record_change
+from utils.profiler import ProfiledRoute
+from utils.query_stats import query_budget
 
 router = APIRouter(
     prefix="/attendance",
     tags=["attendance"],
+    route_class=ProfiledRoute,
 )
 
 @router.get("/", response_model=List[AttendanceRecord])
+@query_budget(2)
 def get_attendance(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     employee_last_name: Optional[str] = None,
     status: Optional[str] = None,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """
     Fetch attendance records with optional filters.
@@ -37,27 +43,28 @@ def get_attendance(
     return session.exec(query).all()
 
 @router.get("/summary")
+@query_budget(2)
 def get_attendance_summary(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """
     Get high-level attendance stats.
     """
-    query = select(AttendanceRecord)
+    query = select(AttendanceRecord.status, func.count(AttendanceRecord.id)).group_by(AttendanceRecord.status)
     if start_date:
         query = query.where(AttendanceRecord.business_date >= datetime.strptime(start_date, '%Y-%m-%d').date())
     if end_date:
         query = query.where(AttendanceRecord.business_date <= datetime.strptime(end_date, '%Y-%m-%d').date())
         
-    records = session.exec(query).all()
+    counts = dict(session.exec(query).all())
     
     summary = {
-        "total": len(records),
-        "present": len([r for r in records if r.status == "Present"]),
-        "absent": len([r for r in records if r.status == "Absent"]),
-        "late": len([r for r in records if r.status == "Late"])
+        "total": sum(counts.values()),
+        "present": counts.get("Present", 0),
+        "absent": counts.get("Absent", 0),
+        "late": counts.get("Late", 0)
     }
     
     return summary
@@ -71,12 +78,14 @@ class BulkAttendanceItem(BaseModel):
 
 class BulkAttendanceSubmit(BaseModel):
     business_date: date
+    store_id: Optional[str] = None
     records: List[BulkAttendanceItem]
 
 @router.post("/bulk")
 def submit_bulk_attendance(
     data: BulkAttendanceSubmit,
-    session: Session = Depends(get_session)
+    response: Response,
+    session: Session = Depends(get_write_session)
 ):
     """
     Manually mark attendance for multiple employees on a specific date.
@@ -89,30 +98,68 @@ def submit_bulk_attendance(
     
     for item in data.records:
         # Try to find existing record
-        record = session.exec(
-            select(AttendanceRecord).where(
-                AttendanceRecord.employee_first_name == item.first_name,
-                AttendanceRecord.employee_last_name == item.last_name,
-                AttendanceRecord.business_date == data.business_date
-            )
-        ).first()
+        query = select(AttendanceRecord).where(
+            AttendanceRecord.employee_first_name == item.first_name,
+            AttendanceRecord.employee_last_name == item.last_name,
+            AttendanceRecord.business_date == data.business_date
+        )
+        if data.store_id:
+            query = query.where(AttendanceRecord.store_id == data.store_id)
+        record = session.exec(query).first()
         
         if record:
             record.status = item.status
+            record.status_source = STATUS_SOURCE_MANUAL
             record.notes = item.notes
             record.updated_at = datetime.utcnow()
             session.add(record)
             results["updated"] += 1
         else:
             new_record = AttendanceRecord(
+                store_id=data.store_id,
                 employee_first_name=item.first_name,
                 employee_last_name=item.last_name,
                 business_date=data.business_date,
                 status=item.status,
+                status_source=STATUS_SOURCE_MANUAL,
                 notes=item.notes
             )
             session.add(new_record)
             results["created"] += 1
             
+    record_change(session, "attendance", data.business_date, data.business_date,
+                  store_id=data.store_id, tags=["Attendance"])
     session.commit()
+    mark_write(response)
     return {"message": "Attendance submitted successfully", "stats": results}
+
+class RecomputeRequest(BaseModel):
+    start_date: date
+    end_date: date
+    store_id: Optional[str] = None
+
+@router.get("/rules")
+def get_attendance_rules():
+    """
+    The rule set used to derive attendance statuses (configured through ATTENDANCE_* settings).
+    """
+    return RULES.as_dict()
+
+@router.post("/recompute")
+def recompute_attendance_statuses(
+    data: RecomputeRequest,
+    response: Response,
+    session: Session = Depends(get_write_session)
+):
+    """
+    Re-derive statuses, times and variance for a date range from the shift
+    summaries with the current rules. Statuses set through /bulk are kept.
+    """
+    if data.start_date > data.end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    counts = recompute_attendance(session, data.start_date, data.end_date, data.store_id)
+    record_change(session, "attendance", data.start_date, data.end_date,
+                  store_id=data.store_id, tags=["Attendance"])
+    session.commit()
+    mark_write(response)
+    return {"message": "Attendance recomputed", "stats": counts, "rules": RULES.as_dict()}
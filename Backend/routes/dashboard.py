@@ -0,0 +1,78 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+# Local imports
+from db import read_engine
+from routes.alerts import get_alerts
+from routes.attendance import get_attendance_summary
+from routes.employees import get_all_employee_stats
+from routes.shifts import get_shift_stats_daily, get_shift_stats_summary
+from routes.stores import _parse_range
+from utils.profiler import ProfiledRoute
+from utils.query_stats import query_budget
+
+router = APIRouter(
+    prefix="/dashboard",
+    tags=["dashboard"],
+    route_class=ProfiledRoute,
+)
+
+# Section name -> the endpoint that serves it on its own; payloads are identical
+DASHBOARD_SECTIONS = {
+    "summary": get_shift_stats_summary,
+    "daily": get_shift_stats_daily,
+    "employees": get_all_employee_stats,
+    "alerts": get_alerts,
+    "attendance": get_attendance_summary,
+}
+
+
+def _run_section(endpoint, bind: Engine, start_date: Optional[str], end_date: Optional[str]):
+    """One section with its own session; runs in a worker thread. Returns (payload, ms)."""
+    started = time.perf_counter()
+    with Session(bind) as session:
+        payload = endpoint(start_date=start_date, end_date=end_date, session=session)
+    return payload, round((time.perf_counter() - started) * 1000, 1)
+
+
+@router.get("")
+@query_budget(8)
+async def get_dashboard(
+    request: Request,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    sections: Optional[str] = None,
+):
+    """
+    Everything a dashboard page loads, in one request. The sections
+    (comma-separated, default all: summary, daily, employees, alerts,
+    attendance) are queried concurrently, each on its own connection, and
+    returned with their timings.
+    """
+    _parse_range(start_date, end_date)
+    names = [name.strip() for name in sections.split(",") if name.strip()] if sections else list(DASHBOARD_SECTIONS)
+    unknown = [name for name in names if name not in DASHBOARD_SECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown section(s): {', '.join(unknown)}")
+
+    bind = read_engine(request)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        run_in_threadpool(_run_section, DASHBOARD_SECTIONS[name], bind, start_date, end_date)
+        for name in names
+    ))
+
+    payload: Dict[str, Any] = {"start_date": start_date, "end_date": end_date}
+    timings = {}
+    for name, (data, ms) in zip(names, results):
+        payload[name] = data
+        timings[name] = ms
+    payload["timings_ms"] = timings
+    payload["query_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return payload
@@ -0,0 +1,64 @@
+import os
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+# Local imports
+from utils.profiler import PROFILING, list_profiles, profile_path
+from utils.query_stats import (
+    QUERY_BUDGET_DEFAULT,
+    QUERY_BUDGET_STRICT,
+    QUERY_STATS_ENABLED,
+    reset_route_stats,
+    route_stats_snapshot,
+)
+
+# The debug routes expose SQL text and stack dumps, so they are only mounted
+# when DEBUG_ENDPOINTS is set (see main.py)
+DEBUG_ENDPOINTS_ENABLED = os.getenv("DEBUG_ENDPOINTS", "").lower() in ("1", "true", "yes")
+
+router = APIRouter(
+    prefix="/debug",
+    tags=["debug"],
+)
+
+@router.get("/perf")
+def get_perf_stats():
+    """
+    SQL statement counts and database time per route since startup (or the last reset).
+    """
+    return {
+        "enabled": QUERY_STATS_ENABLED,
+        "default_budget": QUERY_BUDGET_DEFAULT or None,
+        "strict": QUERY_BUDGET_STRICT,
+        "routes": route_stats_snapshot(),
+    }
+
+@router.delete("/perf")
+def reset_perf_stats():
+    """
+    Clear the per-route aggregates.
+    """
+    reset_route_stats()
+    return {"message": "Perf stats reset"}
+
+@router.get("/profiles")
+def get_profiles(limit: int = 50):
+    """
+    Saved request profiles, newest first.
+    Send a request with "X-Profile: 1" to record one (see PROFILING).
+    """
+    return {
+        "mode": PROFILING,
+        "profiles": list_profiles(limit),
+    }
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    """
+    Folded stacks for one profile, ready for flamegraph.pl or speedscope.
+    """
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
@@ -1,57 +1,85 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import or_, tuple_
 from sqlmodel import Session, select, func
-from typing import List, Optional
-from datetime import datetime, date
+from typing import List, Literal, Optional, Union
+from datetime import datetime, date, timedelta
+from itertools import groupby
 
 # Local imports
-from db import get_session
-from models import ShiftSummary
+from db import get_read_session
+from models import ShiftSummary, PayPeriodTotal
+from services.archive_service import archived_employee_totals, archived_summaries
+from services.employee_index import employee_index
+from services.overtime_service import MAX_CONSECUTIVE_DAYS, PAY_PERIOD_DAYS, WEEKLY_OVERTIME_HOURS
+from utils.profiler import ProfiledRoute
+from utils.query_stats import query_budget
 
 router = APIRouter(
     prefix="/employees",
     tags=["employees"],
+    route_class=ProfiledRoute,
 )
 
+# bucket="auto" switches to weekly points for ranges longer than this
+TREND_WEEKLY_AFTER_DAYS = 92
+
 @router.get("/")
-def get_employees(session: Session = Depends(get_session)):
+@query_budget(2)
+def get_employees(session: Session = Depends(get_read_session)):
     """
-    Get list of all unique employees.
+    Get list of all unique employees (from the in-memory name index).
     """
-    employees = session.exec(
-        select(
-            ShiftSummary.employee_first_name,
-            ShiftSummary.employee_last_name
-        ).distinct()
-        .order_by(ShiftSummary.employee_last_name, ShiftSummary.employee_first_name)
-    ).all()
-    
+    employee_index.ensure_fresh(session)
     return [
         {
-            "first_name": emp[0],
-            "last_name": emp[1],
-            "full_name": f"{emp[0]} {emp[1]}"
+            "first_name": entry.first_name,
+            "last_name": entry.last_name,
+            "full_name": entry.full_name
         }
-        for emp in employees
+        for entry in employee_index.all()
     ]
 
+@router.get("/search")
+@query_budget(2)
+def search_employees(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=100),
+    store_id: Optional[str] = None,
+    session: Session = Depends(get_read_session)
+):
+    """
+    Autocomplete employee names. Prefix matches on first or last name rank
+    first, then misspellings close enough by trigram similarity.
+    """
+    employee_index.ensure_fresh(session)
+    return employee_index.search(q, limit=limit, store_id=store_id)
+
 @router.get("/stats")
+@query_budget(2)
 def get_all_employee_stats(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    session: Session = Depends(get_session)
+    store_id: Optional[str] = None,
+    session: Session = Depends(get_read_session)
 ):
     """
-    Get aggregated stats for all employees within a date range.
+    Get aggregated stats for all employees within a date range,
+    one row per employee and store.
     """
     query = select(
+        ShiftSummary.store_id,
         ShiftSummary.employee_first_name,
         ShiftSummary.employee_last_name,
         func.sum(ShiftSummary.scheduled_working_hours).label("total_scheduled"),
         func.sum(ShiftSummary.actual_working_hours).label("total_actual"),
         func.sum(ShiftSummary.break_hours).label("total_break"),
         func.count(ShiftSummary.id).label("shift_count")
-    ).group_by(ShiftSummary.employee_first_name, ShiftSummary.employee_last_name)
+    ).group_by(ShiftSummary.store_id, ShiftSummary.employee_first_name, ShiftSummary.employee_last_name)
+    if store_id is not None:
+        query = query.where(ShiftSummary.store_id == store_id)
 
+    start = end = None
     if start_date:
         try:
             start = datetime.strptime(start_date, '%Y-%m-%d').date()
@@ -67,33 +95,222 @@ def get_all_employee_stats(
             raise HTTPException(status_code=400, detail="Invalid end_date format. Use YYYY-MM-DD")
 
     results = session.exec(query).all()
+
+    # Fold in months that were moved to the Parquet archive
+    totals = {(res[0], res[1], res[2]): [res[3] or 0, res[4] or 0, res[5] or 0, res[6]] for res in results}
+    for key, archived in archived_employee_totals(start, end, store_id).items():
+        entry = totals.setdefault(key, [0, 0, 0, 0])
+        for i, value in enumerate(archived):
+            entry[i] += value
     
     return [
         {
-            "first_name": res[0],
-            "last_name": res[1],
-            "full_name": f"{res[0]} {res[1]}",
-            "total_scheduled": float(res[2] or 0),
-            "total_actual": float(res[3] or 0),
-            "total_break": float(res[4] or 0),
-            "shift_count": res[5],
-            "overtime": max(0, float(res[3] or 0) - float(res[2] or 0))
+            "store_id": store,
+            "first_name": first,
+            "last_name": last,
+            "full_name": f"{first} {last}",
+            "total_scheduled": float(scheduled),
+            "total_actual": float(actual),
+            "total_break": float(breaks),
+            "shift_count": count,
+            "overtime": max(0, float(actual) - float(scheduled))
         }
-        for res in results
+        for (store, first, last), (scheduled, actual, breaks, count) in totals.items()
+    ]
+
+@router.get("/overtime")
+@query_budget(2)
+def get_overtime(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    store_id: Optional[str] = None,
+    flagged_only: bool = False,
+    session: Session = Depends(get_read_session)
+):
+    """
+    Pay-period totals per employee for periods overlapping the date range:
+    hours, weekly overtime, busiest rolling 7 days and longest run of
+    consecutive worked days. flagged_only keeps periods with overtime or
+    too many consecutive days.
+    """
+    query = select(PayPeriodTotal).order_by(
+        PayPeriodTotal.period_start.desc(),
+        PayPeriodTotal.overtime_hours.desc(),
+        PayPeriodTotal.employee_last_name,
+        PayPeriodTotal.employee_first_name
+    )
+    try:
+        if start_date:
+            query = query.where(PayPeriodTotal.period_end >= datetime.strptime(start_date, '%Y-%m-%d').date())
+        if end_date:
+            query = query.where(PayPeriodTotal.period_start <= datetime.strptime(end_date, '%Y-%m-%d').date())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if store_id is not None:
+        query = query.where(PayPeriodTotal.store_id == store_id)
+    if flagged_only:
+        query = query.where(or_(
+            PayPeriodTotal.overtime_hours > 0,
+            PayPeriodTotal.max_consecutive_days > MAX_CONSECUTIVE_DAYS
+        ))
+
+    return [
+        {
+            "store_id": total.store_id,
+            "first_name": total.employee_first_name,
+            "last_name": total.employee_last_name,
+            "full_name": f"{total.employee_first_name} {total.employee_last_name}",
+            "period_start": total.period_start.isoformat(),
+            "period_end": total.period_end.isoformat(),
+            "scheduled_hours": float(total.scheduled_hours),
+            "actual_hours": float(total.actual_hours),
+            "overtime_hours": float(total.overtime_hours),
+            "max_week_hours": float(total.max_week_hours),
+            "max_rolling_hours": float(total.max_rolling_hours),
+            "max_rolling_end": total.max_rolling_end.isoformat() if total.max_rolling_end else None,
+            "days_worked": total.days_worked,
+            "max_consecutive_days": total.max_consecutive_days,
+            "weekly_threshold": float(WEEKLY_OVERTIME_HOURS),
+            "period_days": PAY_PERIOD_DAYS,
+        }
+        for total in session.exec(query).all()
     ]
 
+class TrendEmployee(BaseModel):
+    last_name: str
+    first_name: Optional[str] = None  # omitted: everyone with this last name
+
+class TrendRequest(BaseModel):
+    employees: Union[Literal["all"], List[TrendEmployee]] = "all"
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    bucket: Literal["day", "week", "auto"] = "auto"
+    store_id: Optional[str] = None
+
+def _trend_bucket(data: TrendRequest) -> str:
+    if data.bucket != "auto":
+        return data.bucket
+    if data.start_date and data.end_date and (data.end_date - data.start_date).days <= TREND_WEEKLY_AFTER_DAYS:
+        return "day"
+    return "week"
+
+@router.post("/trends")
+@query_budget(2)
+def get_employee_trends(data: TrendRequest, session: Session = Depends(get_read_session)):
+    """
+    Trends for many employees at once, replacing one /{last_name}/trend call per row.
+    All series come from a single query ordered by store, employee and date, grouped in
+    one pass; an employee working at several stores has a series per store.
+    Weekly points are keyed by the Monday of the week.
+    """
+    if data.start_date and data.end_date and data.start_date > data.end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    if data.employees != "all" and not data.employees:
+        return {"bucket": _trend_bucket(data), "series": []}
+
+    pairs = set()
+    last_names = set()
+    if data.employees != "all":
+        for employee in data.employees:
+            if employee.first_name:
+                pairs.add((employee.last_name, employee.first_name))
+            else:
+                last_names.add(employee.last_name)
+
+    # Same-named employees of different stores get a series each
+    query = select(
+        ShiftSummary.store_id,
+        ShiftSummary.employee_last_name,
+        ShiftSummary.employee_first_name,
+        ShiftSummary.business_date,
+        ShiftSummary.scheduled_working_hours,
+        ShiftSummary.actual_working_hours,
+        ShiftSummary.break_hours
+    ).order_by(
+        ShiftSummary.store_id,
+        ShiftSummary.employee_last_name,
+        ShiftSummary.employee_first_name,
+        ShiftSummary.business_date
+    )
+    if data.start_date:
+        query = query.where(ShiftSummary.business_date >= data.start_date)
+    if data.end_date:
+        query = query.where(ShiftSummary.business_date <= data.end_date)
+    if data.store_id is not None:
+        query = query.where(ShiftSummary.store_id == data.store_id)
+    if data.employees != "all":
+        clauses = []
+        if pairs:
+            clauses.append(tuple_(ShiftSummary.employee_last_name, ShiftSummary.employee_first_name).in_(pairs))
+        if last_names:
+            clauses.append(ShiftSummary.employee_last_name.in_(last_names))
+        query = query.where(or_(*clauses))
+
+    rows = session.exec(query).all()
+
+    # Fold in months that were moved to the Parquet archive. Both sides are
+    # then sorted in Python, since the database's collation may order names
+    # differently and split a series in two.
+    archived = [
+        (row["store_id"], row["employee_last_name"], row["employee_first_name"], row["business_date"],
+         row["scheduled_working_hours"], row["actual_working_hours"], row["break_hours"])
+        for row in archived_summaries(data.start_date, data.end_date, columns=[
+            "employee_last_name", "employee_first_name", "business_date", "store_id",
+            "scheduled_working_hours", "actual_working_hours", "break_hours",
+        ])
+        if (data.store_id is None or row["store_id"] == data.store_id)
+        and (data.employees == "all"
+             or row["employee_last_name"] in last_names
+             or (row["employee_last_name"], row["employee_first_name"]) in pairs)
+    ]
+    if archived:
+        rows = sorted(list(rows) + archived, key=lambda row: (row[0] or "", row[1], row[2], row[3]))
+
+    bucket = _trend_bucket(data)
+    if bucket == "week":
+        point_date = lambda row: row[3] - timedelta(days=row[3].weekday())
+    else:
+        point_date = lambda row: row[3]
+
+    series = []
+    for (store_id, last, first), shifts in groupby(rows, key=lambda row: (row[0], row[1], row[2])):
+        points = []
+        for day, day_rows in groupby(shifts, key=point_date):
+            scheduled = actual = breaks = 0.0
+            for row in day_rows:
+                scheduled += float(row[4] or 0)
+                actual += float(row[5] or 0)
+                breaks += float(row[6] or 0)
+            points.append({
+                "date": day.isoformat(),
+                "scheduled": round(scheduled, 2),
+                "actual": round(actual, 2),
+                "break": round(breaks, 2),
+            })
+        series.append({
+            "store_id": store_id,
+            "first_name": first,
+            "last_name": last,
+            "full_name": f"{first} {last}",
+            "points": points,
+        })
+
+    return {"bucket": bucket, "series": series}
+
 @router.get("/{last_name}/trend")
+@query_budget(2)
 def get_employee_trend(
     last_name: str,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """
     Get daily trend for a specific employee.
     """
     query = select(ShiftSummary).where(ShiftSummary.employee_last_name == last_name).order_by(ShiftSummary.business_date)
 
+    start = end = None
     if start_date:
         start = datetime.strptime(start_date, '%Y-%m-%d').date()
         query = query.where(ShiftSummary.business_date >= start)
@@ -102,8 +319,8 @@ def get_employee_trend(
         query = query.where(ShiftSummary.business_date <= end)
 
     results = session.exec(query).all()
-    
-    return [
+
+    trend = [
         {
             "date": res.business_date.isoformat(),
             "scheduled": float(res.scheduled_working_hours or 0),
@@ -112,3 +329,21 @@ def get_employee_trend(
         }
         for res in results
     ]
+
+    # Fold in months that were moved to the Parquet archive
+    archived = archived_summaries(start, end, last_name=last_name, columns=[
+        "business_date", "scheduled_working_hours", "actual_working_hours", "break_hours",
+    ])
+    if archived:
+        trend.extend(
+            {
+                "date": row["business_date"].isoformat(),
+                "scheduled": float(row["scheduled_working_hours"] or 0),
+                "actual": float(row["actual_working_hours"] or 0),
+                "break": float(row["break_hours"] or 0),
+            }
+            for row in archived
+        )
+        trend.sort(key=lambda point: point["date"])
+    
+    return trend
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import os
+from datetime import datetime, date
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Header, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+# Local imports
+from services.event_broker import broker
+
+router = APIRouter(
+    prefix="/events",
+    tags=["events"],
+)
+
+# Idle connections get a comment/ping this often so proxies keep them open
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", 15))
+
+
+def _parse_date(value: Optional[str], field: str) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {field} format. Use YYYY-MM-DD")
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-sent events for uploads, data changes and new alerts.
+    Only events touching start_date..end_date are sent (all when omitted).
+    Reconnecting browsers resume from Last-Event-ID automatically.
+    """
+    start = _parse_date(start_date, "start_date")
+    end = _parse_date(end_date, "end_date")
+    resume_from = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    subscriber = broker.subscribe(start, end, resume_from)
+
+    async def event_stream():
+        try:
+            # Tell EventSource how long to wait before reconnecting
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def websocket_events(websocket: WebSocket, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    """
+    The same events over a WebSocket. Clients can change their date range by
+    sending {"start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"}.
+    """
+    await websocket.accept()
+    try:
+        start = _parse_date(start_date, "start_date")
+        end = _parse_date(end_date, "end_date")
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+    subscriber = broker.subscribe(start, end)
+
+    async def receive_ranges():
+        while True:
+            message = await websocket.receive_json()
+            try:
+                subscriber.start = _parse_date(message.get("start_date"), "start_date")
+                subscriber.end = _parse_date(message.get("end_date"), "end_date")
+            except (HTTPException, AttributeError):
+                await websocket.send_json({"type": "error", "data": {"detail": "Invalid date range"}})
+
+    receiver = asyncio.create_task(receive_ranges())
+    try:
+        while True:
+            getter = asyncio.create_task(subscriber.queue.get())
+            done, _ = await asyncio.wait(
+                {getter, receiver}, timeout=EVENT_HEARTBEAT_SECONDS, return_when=asyncio.FIRST_COMPLETED
+            )
+            if getter not in done:
+                getter.cancel()
+                if receiver in done:
+                    # Client went away (or sent something unreadable)
+                    break
+                await websocket.send_json({"type": "ping"})
+                continue
+            await websocket.send_json(getter.result())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        broker.unsubscribe(subscriber)
+
+
+@router.get("/status")
+def get_event_status():
+    """
+    Connected subscribers and the id of the last published event.
+    """
+    return broker.status()
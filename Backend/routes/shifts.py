@@ -1,76 +1,139 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import DateTime, Integer, and_, bindparam, cast, literal_column, or_, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import aliased
 from sqlmodel import Session, select, func
 from typing import List, Dict, Any, Optional
-from datetime import datetime
-import os
-import shutil
-from pathlib import Path
+from datetime import datetime, time, timedelta
+from itertools import chain, groupby
+import uuid
+
+import numpy as np
 
 # Local imports
-from db import get_session
-from models import ShiftSummary, ShiftPunch
-from parsers.shift_parser import PDFParser
+from db import get_read_session, get_write_session, mark_write
+from models import ShiftSummary, ShiftPunch, AttendanceRecord
+from parsers.shift_parser import PDFParser, unpack_minutes
+from services.event_broker import broker
+from services.archive_service import archived_daily_totals, archived_employee_totals
 from services.shift_service import ShiftDataService
+from utils.coverage_utils import bucket_times, headcount_timeline, parse_bucket
+from utils.interval_utils import IntervalIndex, find_overlaps, merge_intervals, subtract_intervals
+from utils.profiler import ProfiledRoute
+from utils.query_stats import query_budget
 
 router = APIRouter(
     prefix="/shifts",
     tags=["shifts"],
+    route_class=ProfiledRoute,
 )
 
+# Longest a single punch can run; bounds the index scan for overlap queries
+MAX_PUNCH_SPAN = timedelta(hours=24)
+
+# Fields /shifts/?fields= can select; the computed ones list the columns they need
+SHIFT_FIELDS = {
+    column.name: (column,)
+    for column in ShiftSummary.__table__.columns
+    if column.name != "scheduled_segments"
+}
+SHIFT_FIELDS.update({
+    "start_time": (ShiftSummary.__table__.c.first_punch_at,),
+    "end_time": (ShiftSummary.__table__.c.last_punch_at,),
+})
+
+
+def _shift_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Requested field names, in order (None for all); 400 on unknown names."""
+    if not fields:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in SHIFT_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(SHIFT_FIELDS)}"
+        )
+    return names
+
+
+def _clock_time(value: Optional[datetime]) -> Optional[str]:
+    return value.strftime("%H:%M:%S") if value else None
+
+
 @router.get("/")
+@query_budget(2)
 def get_shifts(
+    store_id: str = None,
     employee_last_name: str = None,
     start_date: str = None,
     end_date: str = None,
-    session: Session = Depends(get_session)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,business_date,start_time"),
+    session: Session = Depends(get_read_session)
 ):
     """
-    Fetch shift summaries with optional filters, including computed start/end times and punch count.
+    Fetch shift summaries with optional filters, including start/end times and punch count.
+    With fields=, only those fields are selected from the database and returned.
     """
-    query = select(
-        ShiftSummary,
-        func.min(ShiftPunch.start_datetime).label("start_time"),
-        func.max(ShiftPunch.end_datetime).label("end_time"),
-        func.count(ShiftPunch.id).label("punch_count")
-    ).outerjoin(ShiftPunch).group_by(ShiftSummary.id)
-    
+    names = _shift_fields(fields)
+    filters = []
+    if store_id:
+        filters.append(ShiftSummary.store_id == store_id)
     if employee_last_name:
-        query = query.where(ShiftSummary.employee_last_name == employee_last_name)
+        filters.append(ShiftSummary.employee_last_name == employee_last_name)
     
     if start_date:
-        query = query.where(ShiftSummary.business_date >= datetime.strptime(start_date, '%Y-%m-%d').date())
+        filters.append(ShiftSummary.business_date >= datetime.strptime(start_date, '%Y-%m-%d').date())
     
     if end_date:
-        query = query.where(ShiftSummary.business_date <= datetime.strptime(end_date, '%Y-%m-%d').date())
+        filters.append(ShiftSummary.business_date <= datetime.strptime(end_date, '%Y-%m-%d').date())
     
-    query = query.order_by(ShiftSummary.business_date.desc())
+    if names is not None:
+        columns = list(dict.fromkeys(column for name in names for column in SHIFT_FIELDS[name]))
+        rows = session.exec(
+            select(*columns).where(*filters).order_by(ShiftSummary.business_date.desc())
+        ).all()
+        positions = {column.name: i for i, column in enumerate(columns)}
+        computed = {
+            "start_time": lambda row: _clock_time(row[positions["first_punch_at"]]),
+            "end_time": lambda row: _clock_time(row[positions["last_punch_at"]]),
+            "punch_count": lambda row: row[positions["punch_count"]] or 0,
+        }
+        return [
+            {
+                name: computed[name](row) if name in computed else row[positions[name]]
+                for name in names
+            }
+            for row in rows
+        ]
+    
+    query = select(ShiftSummary).where(*filters).order_by(ShiftSummary.business_date.desc())
     
     results = session.exec(query).all()
     
     records = []
-    for summary, start_t, end_t, p_count in results:
+    for summary in results:
         record = summary.model_dump()
-        record["start_time"] = start_t.strftime("%H:%M:%S") if start_t else None
-        record["end_time"] = end_t.strftime("%H:%M:%S") if end_t else None
-        record["punch_count"] = p_count
+        record["start_time"] = _clock_time(summary.first_punch_at)
+        record["end_time"] = _clock_time(summary.last_punch_at)
+        record["punch_count"] = summary.punch_count or 0
         records.append(record)
         
     return records
 
 
 @router.get("/analytics")
+@query_budget(2)
 def get_shift_analytics(
     start_date: str = None,
     end_date: str = None,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """
     Detailed analytics for scatter plots and break compliance.
     """
-    query = select(
-        ShiftSummary,
-        func.count(ShiftPunch.id).label("punch_count")
-    ).outerjoin(ShiftPunch).group_by(ShiftSummary.id)
+    query = select(ShiftSummary)
 
     if start_date:
         query = query.where(ShiftSummary.business_date >= datetime.strptime(start_date, '%Y-%m-%d').date())
@@ -87,14 +150,362 @@ def get_shift_analytics(
             "actual_hours": float(s.actual_working_hours or 0),
             "break_hours": float(s.break_hours or 0),
             "scheduled_break_hours": float(s.scheduled_break_hours or 0),
-            "punch_count": p_count
+            "punch_count": s.punch_count or 0
+        }
+        for s in results
+    ]
+
+
+def _minutes_after(column, origin: datetime, dialect: str):
+    """
+    SQL for the whole minutes from origin to a timestamp column, so coverage
+    reads plain integers instead of building datetimes row by row.
+    """
+    if dialect == "postgresql":
+        return cast(func.floor(func.extract("epoch", column - origin) / 60), Integer)
+    # SQLite timestamps are text; round julianday() to whole seconds first.
+    # Integer division truncates towards zero, which only differs from floor
+    # before the origin, where coverage clips to 0 anyway.
+    return cast(func.round((func.julianday(column) - func.julianday(origin)) * 86400), Integer) // 60
+
+
+@router.get("/coverage")
+@query_budget(2)
+def get_staffing_coverage(
+    day: Optional[str] = Query(None, alias="date"),
+    start_date: str = None,
+    end_date: str = None,
+    bucket: str = "15m",
+    include_scheduled: bool = False,
+    store_id: Optional[str] = None,
+    session: Session = Depends(get_read_session)
+):
+    """
+    Headcount on the floor per time bucket, from punch intervals.
+    Pass `date` for a single day or `start_date`/`end_date` for a range,
+    and `store_id` for one store (all stores otherwise).
+    Each bucket reports the peak and average number of people clocked in;
+    with include_scheduled=true the scheduled headcount is overlaid.
+    """
+    try:
+        bucket_minutes = parse_bucket(bucket)
+        first_day = datetime.strptime(day or start_date, '%Y-%m-%d').date()
+        last_day = datetime.strptime(day or end_date, '%Y-%m-%d').date() if (day or end_date) else first_day
+    except TypeError:
+        raise HTTPException(status_code=400, detail="Provide date or start_date")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if last_day < first_day:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+
+    window_start = datetime.combine(first_day, time())
+    window_end = datetime.combine(last_day + timedelta(days=1), time())
+    total_minutes = int((window_end - window_start).total_seconds() // 60)
+    dialect = session.get_bind().dialect.name
+
+    def minute_offsets(start_column, end_column, *where) -> np.ndarray:
+        """(start, end) of each interval as minutes from window_start, computed in SQL."""
+        rows = session.connection().execute(select(
+            _minutes_after(start_column, window_start, dialect),
+            _minutes_after(end_column, window_start, dialect)
+        ).where(*where)).all()
+        # fromiter over the flattened rows; np.array on Row objects is far slower
+        return np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=2 * len(rows)).reshape(-1, 2)
+
+    # One query for every punch overlapping the window. The lower bound on
+    # start_datetime keeps the scan on its index while still catching shifts
+    # that began the day before and run past midnight.
+    punches = minute_offsets(
+        ShiftPunch.start_datetime, ShiftPunch.end_datetime,
+        ShiftPunch.start_datetime >= window_start - MAX_PUNCH_SPAN,
+        ShiftPunch.start_datetime < window_end,
+        ShiftPunch.end_datetime > window_start,
+        *([ShiftPunch.store_id == store_id] if store_id else [])
+    )
+    actual = headcount_timeline(punches[:, 0], punches[:, 1], total_minutes, bucket_minutes)
+
+    scheduled = None
+    if include_scheduled:
+        shifts = minute_offsets(
+            AttendanceRecord.scheduled_start, AttendanceRecord.scheduled_end,
+            AttendanceRecord.business_date >= first_day - timedelta(days=1),
+            AttendanceRecord.business_date <= last_day,
+            AttendanceRecord.scheduled_start.is_not(None),
+            AttendanceRecord.scheduled_end.is_not(None),
+            *([AttendanceRecord.store_id == store_id] if store_id else [])
+        )
+        scheduled = headcount_timeline(shifts[:, 0], shifts[:, 1], total_minutes, bucket_minutes)
+
+    times = bucket_times(window_start, len(actual['peak']), bucket_minutes)
+    peak = actual['peak'].tolist()
+    average = actual['average'].round(2).tolist()
+    scheduled_peak = scheduled['peak'].tolist() if scheduled else None
+
+    return {
+        "start": window_start.isoformat(),
+        "end": window_end.isoformat(),
+        "bucket_minutes": bucket_minutes,
+        "store_id": store_id,
+        "punch_count": len(punches),
+        "buckets": [
+            {
+                "time": times[i],
+                "headcount": peak[i],
+                "avg_headcount": average[i],
+                **({"scheduled": scheduled_peak[i]} if scheduled_peak else {}),
+            }
+            for i in range(len(times))
+        ]
+    }
+
+
+# Columns the interval endpoints load; plain rows are much cheaper than ORM objects
+PUNCH_COLUMNS = (
+    ShiftPunch.id, ShiftPunch.shift_summary_id, ShiftPunch.start_datetime, ShiftPunch.end_datetime,
+    ShiftSummary.store_id, ShiftSummary.employee_first_name, ShiftSummary.employee_last_name,
+)
+
+
+def _punch_payload(row) -> Dict[str, Any]:
+    """A PUNCH_COLUMNS row, as returned by the interval endpoints."""
+    punch_id, shift_summary_id, start, end, store_id, first_name, last_name = row
+    return {
+        "punch_id": punch_id,
+        "shift_summary_id": shift_summary_id,
+        "store_id": store_id,
+        "employee_name": f"{first_name} {last_name}",
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+    }
+
+
+@router.get("/on-shift")
+@query_budget(1)
+def get_on_shift(
+    at: List[str] = Query(..., description="Timestamp(s), e.g. 2025-01-15T14:15"),
+    session: Session = Depends(get_read_session)
+):
+    """
+    Who was clocked in at each of the given points in time.
+    Uses the GiST-indexed punch_range on Postgres, joined against the unnested
+    points so every point is answered by one query; elsewhere the candidate
+    punches are fetched once and answered from an in-memory interval index.
+    """
+    try:
+        points = list(dict.fromkeys(datetime.fromisoformat(value) for value in at))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if session.get_bind().dialect.name == "postgresql":
+        unnested = func.unnest(bindparam("points", points, type_=ARRAY(DateTime))).table_valued("at").render_derived(name="points")
+        rows = session.exec(
+            select(unnested.c.at, *PUNCH_COLUMNS)
+            .join_from(unnested, ShiftPunch, text("shift_punches.punch_range @> points.at"))
+            .join(ShiftSummary, ShiftPunch.shift_summary_id == ShiftSummary.id)
+        ).all()
+        on_shift = {point: [] for point in points}
+        for row in rows:
+            on_shift[row[0]].append(_punch_payload(row[1:]))
+    else:
+        rows = session.exec(
+            select(*PUNCH_COLUMNS).join(ShiftSummary).where(
+                ShiftPunch.start_datetime >= min(points) - MAX_PUNCH_SPAN,
+                ShiftPunch.start_datetime <= max(points)
+            )
+        ).all()
+        index = IntervalIndex((row[2], row[3], row) for row in rows)
+        on_shift = {point: [_punch_payload(row) for row in index.at(point)] for point in points}
+
+    return [
+        {"at": point.isoformat(), "count": len(punches), "punches": punches}
+        for point, punches in on_shift.items()
+    ]
+
+
+@router.get("/overlaps")
+@query_budget(2)
+def get_overlapping_punches(
+    start_date: str,
+    end_date: str = None,
+    store_id: Optional[str] = None,
+    session: Session = Depends(get_read_session)
+):
+    """
+    Duplicate or overlapping punches for the same employee, by business date.
+    An employee is a name at a store: same-named people at two stores never pair.
+    Exact duplicates (same start and end) are reported as "duplicate".
+    """
+    try:
+        first_day = datetime.strptime(start_date, '%Y-%m-%d').date()
+        last_day = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else first_day
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    window_start = datetime.combine(first_day, time.min)
+    window_end = datetime.combine(last_day + timedelta(days=1), time.min)
+
+    if session.get_bind().dialect.name == "postgresql":
+        punch_a, punch_b = aliased(ShiftPunch, name="punch_a"), aliased(ShiftPunch, name="punch_b")
+        summary_a, summary_b = aliased(ShiftSummary), aliased(ShiftSummary)
+        rows = session.exec(
+            select(
+                punch_a.id, punch_a.shift_summary_id, punch_a.start_datetime, punch_a.end_datetime,
+                punch_b.id, punch_b.shift_summary_id, punch_b.start_datetime, punch_b.end_datetime,
+                summary_a.store_id, summary_a.employee_first_name, summary_a.employee_last_name
+            )
+            .join(summary_a, punch_a.shift_summary_id == summary_a.id)
+            .join(punch_b, and_(
+                punch_b.id > punch_a.id,
+                literal_column("punch_a.punch_range").op("&&")(literal_column("punch_b.punch_range"))
+            ))
+            .join(summary_b, punch_b.shift_summary_id == summary_b.id)
+            .where(
+                # punch_a is only the lower id of the pair, so take it from the
+                # window widened by a punch's length and require either punch
+                # to start inside the range, as the SQLite path does
+                text("punch_a.punch_range && tsrange(:window_from, :window_to)").bindparams(
+                    window_from=window_start - MAX_PUNCH_SPAN, window_to=window_end + MAX_PUNCH_SPAN
+                ),
+                or_(
+                    and_(punch_a.start_datetime >= window_start, punch_a.start_datetime < window_end),
+                    and_(punch_b.start_datetime >= window_start, punch_b.start_datetime < window_end)
+                ),
+                summary_b.store_id.is_not_distinct_from(summary_a.store_id),
+                summary_b.employee_first_name == summary_a.employee_first_name,
+                summary_b.employee_last_name == summary_a.employee_last_name,
+                *([summary_a.store_id == store_id] if store_id else [])
+            )
+        ).all()
+        pairs = [(tuple(row[0:4]) + tuple(row[8:]), tuple(row[4:])) for row in rows]
+    else:
+        query = select(*PUNCH_COLUMNS).join(ShiftSummary).where(
+            ShiftSummary.business_date >= first_day - timedelta(days=1),
+            ShiftSummary.business_date <= last_day + timedelta(days=1)
+        )
+        if store_id:
+            query = query.where(ShiftSummary.store_id == store_id)
+        rows = session.exec(query).all()
+        pairs = [
+            # Grouped by store and name; "" stands in for rows without a store so keys sort
+            (a, b) for a, b in find_overlaps(((row[4] or "", row[5], row[6]), row[2], row[3], row) for row in rows)
+            # Neighbouring days are only loaded to catch cross-day overlaps
+            if any(first_day <= p[2].date() <= last_day for p in (a, b))
+        ]
+
+    overlaps = []
+    for a, b in pairs:
+        overlaps.append({
+            "type": "duplicate" if a[2:4] == b[2:4] else "overlap",
+            "store_id": a[4],
+            "employee_name": f"{a[5]} {a[6]}",
+            "overlap_minutes": int((min(a[3], b[3]) - max(a[2], b[2])).total_seconds() // 60),
+            "punches": [_punch_payload(a), _punch_payload(b)],
+        })
+    return overlaps
+
+
+def _minute_intervals(day_start: datetime, intervals: List[tuple]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "start": (day_start + timedelta(minutes=start)).isoformat(),
+            "end": (day_start + timedelta(minutes=end)).isoformat(),
+            "minutes": end - start,
         }
-        for s, p_count in results
+        for start, end in intervals
     ]
 
 
+@router.get("/variance-intervals")
+@query_budget(2)
+def get_variance_intervals(
+    start_date: str,
+    end_date: str = None,
+    store_id: str = None,
+    employee_last_name: str = None,
+    include_matching: bool = False,
+    session: Session = Depends(get_read_session)
+):
+    """
+    Where each shift's punches departed from its schedule: unscheduled work
+    (clocked in outside the scheduled segments) and missed scheduled time.
+    Shifts, scheduled segments and punches come from one query; each shift is
+    then a linear merge of its two sorted interval lists. Shifts stored before
+    segments were kept fall back to their scheduled start-end span.
+    """
+    try:
+        first_day = datetime.strptime(start_date, '%Y-%m-%d').date()
+        last_day = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else first_day
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    query = (
+        select(
+            ShiftSummary.id,
+            ShiftSummary.employee_first_name,
+            ShiftSummary.employee_last_name,
+            ShiftSummary.business_date,
+            ShiftSummary.scheduled_segments,
+            AttendanceRecord.scheduled_start,
+            AttendanceRecord.scheduled_end,
+            ShiftPunch.start_datetime,
+            ShiftPunch.end_datetime
+        )
+        .outerjoin(AttendanceRecord, AttendanceRecord.shift_summary_id == ShiftSummary.id)
+        .outerjoin(ShiftPunch, and_(
+            ShiftPunch.shift_summary_id == ShiftSummary.id,
+            # Bounds on the partition key so punches are pruned to the range
+            ShiftPunch.start_datetime >= datetime.combine(first_day, time()),
+            ShiftPunch.start_datetime < datetime.combine(last_day + timedelta(days=2), time())
+        ))
+        .where(
+            ShiftSummary.business_date >= first_day,
+            ShiftSummary.business_date <= last_day
+        )
+        .order_by(ShiftSummary.business_date, ShiftSummary.id, ShiftPunch.start_datetime)
+    )
+    if store_id:
+        query = query.where(ShiftSummary.store_id == store_id)
+    if employee_last_name:
+        query = query.where(ShiftSummary.employee_last_name == employee_last_name)
+
+    shifts = []
+    for shift_id, rows in groupby(session.exec(query), key=lambda row: row[0]):
+        rows = list(rows)
+        _, first_name, last_name, business_date, segments, sched_start, sched_end, _, _ = rows[0]
+        day_start = datetime.combine(business_date, time())
+
+        def minutes(value: datetime) -> int:
+            return int((value - day_start).total_seconds() // 60)
+
+        if segments:
+            scheduled = merge_intervals(unpack_minutes(segments))
+        elif sched_start and sched_end:
+            scheduled = [(minutes(sched_start), minutes(sched_end))]
+        else:
+            scheduled = []
+        actual = merge_intervals((minutes(row[7]), minutes(row[8])) for row in rows if row[7] is not None)
+
+        unscheduled = subtract_intervals(actual, scheduled)
+        missed = subtract_intervals(scheduled, actual)
+        if not (unscheduled or missed or include_matching):
+            continue
+        shifts.append({
+            "shift_summary_id": shift_id,
+            "employee_name": f"{first_name} {last_name}",
+            "business_date": business_date.isoformat(),
+            "scheduled_minutes": sum(end - start for start, end in scheduled),
+            "actual_minutes": sum(end - start for start, end in actual),
+            "unscheduled_minutes": sum(end - start for start, end in unscheduled),
+            "missed_minutes": sum(end - start for start, end in missed),
+            "unscheduled": _minute_intervals(day_start, unscheduled),
+            "missed": _minute_intervals(day_start, missed),
+        })
+    return shifts
+
+
 @router.get("/{shift_id}", response_model=ShiftSummary)
-def get_shift_detail(shift_id: int, session: Session = Depends(get_session)):
+@query_budget(2)
+def get_shift_detail(shift_id: int, session: Session = Depends(get_read_session)):
     """
     Fetch a specific shift summary with all punch records.
     """
@@ -105,7 +516,8 @@ def get_shift_detail(shift_id: int, session: Session = Depends(get_session)):
 
 
 @router.get("/{shift_id}/punches", response_model=List[ShiftPunch])
-def get_shift_punches(shift_id: int, session: Session = Depends(get_session)):
+@query_budget(2)
+def get_shift_punches(shift_id: int, session: Session = Depends(get_read_session)):
     """
     Fetch all punch records for a specific shift.
     """
@@ -116,38 +528,58 @@ def get_shift_punches(shift_id: int, session: Session = Depends(get_session)):
 
 
 @router.get("/stats/summary")
+@query_budget(2)
 def get_shift_stats_summary(
     start_date: str = None,
     end_date: str = None,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """
     Get aggregated KPIs across all employees for a date range.
     """
     query = select(
         func.count(ShiftSummary.id).label("total_shifts"),
-        func.count(func.distinct(ShiftSummary.employee_last_name + ShiftSummary.employee_first_name)).label("total_employees"),
+        # An employee is a name at a store
+        func.count(func.distinct(
+            func.coalesce(ShiftSummary.store_id, '') + '|' + ShiftSummary.employee_last_name + '|' + ShiftSummary.employee_first_name
+        )).label("total_employees"),
         func.sum(ShiftSummary.scheduled_working_hours).label("total_scheduled"),
         func.sum(ShiftSummary.actual_working_hours).label("total_actual"),
         func.sum(ShiftSummary.break_hours).label("total_break")
     )
 
-    if start_date:
-        query = query.where(ShiftSummary.business_date >= datetime.strptime(start_date, '%Y-%m-%d').date())
-    if end_date:
-        query = query.where(ShiftSummary.business_date <= datetime.strptime(end_date, '%Y-%m-%d').date())
+    start = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+    end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    filters = []
+    if start:
+        filters.append(ShiftSummary.business_date >= start)
+    if end:
+        filters.append(ShiftSummary.business_date <= end)
 
-    res = session.exec(query).first()
-    
-    actual = float(res[3] or 0)
-    scheduled = float(res[2] or 0)
+    res = session.exec(query.where(*filters)).first()
+    total_shifts, total_employees = res[0], res[1]
+    scheduled, actual, breaks = float(res[2] or 0), float(res[3] or 0), float(res[4] or 0)
+
+    # Fold in months that were moved to the Parquet archive
+    archived = archived_employee_totals(start, end)
+    if archived:
+        names = set(session.exec(
+            select(ShiftSummary.store_id, ShiftSummary.employee_first_name, ShiftSummary.employee_last_name)
+            .distinct().where(*filters)
+        ).all())
+        total_employees = len(names | set(archived))
+        for a_scheduled, a_actual, a_breaks, a_count in archived.values():
+            scheduled += float(a_scheduled)
+            actual += float(a_actual)
+            breaks += float(a_breaks)
+            total_shifts += a_count
     
     return {
-        "total_shifts": res[0],
-        "total_employees": res[1],
+        "total_shifts": total_shifts,
+        "total_employees": total_employees,
         "total_scheduled": round(scheduled, 1),
         "total_actual": round(actual, 1),
-        "total_break": round(float(res[4] or 0), 1),
+        "total_break": round(breaks, 1),
         "variance": round(actual - scheduled, 1),
         "compliance": round((actual / scheduled * 100) if scheduled > 0 else 100, 0),
         "overtime": round(max(0, actual - scheduled), 1)
@@ -155,10 +587,11 @@ def get_shift_stats_summary(
 
 
 @router.get("/stats/daily")
+@query_budget(2)
 def get_shift_stats_daily(
     start_date: str = None,
     end_date: str = None,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """
     Get daily aggregated hours for trend charts.
@@ -170,80 +603,106 @@ def get_shift_stats_daily(
         func.sum(ShiftSummary.break_hours).label("breaks")
     ).group_by(ShiftSummary.business_date).order_by(ShiftSummary.business_date)
 
-    if start_date:
-        query = query.where(ShiftSummary.business_date >= datetime.strptime(start_date, '%Y-%m-%d').date())
-    if end_date:
-        query = query.where(ShiftSummary.business_date <= datetime.strptime(end_date, '%Y-%m-%d').date())
+    start = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+    end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    if start:
+        query = query.where(ShiftSummary.business_date >= start)
+    if end:
+        query = query.where(ShiftSummary.business_date <= end)
 
     results = session.exec(query).all()
+
+    # Fold in months that were moved to the Parquet archive
+    days = archived_daily_totals(start, end)
+    for r in results:
+        entry = days.setdefault(r[0], [0, 0, 0])
+        for i, value in enumerate(r[1:]):
+            entry[i] += value or 0
     
     return [
         {
-            "date": r[0].isoformat(),
-            "scheduled": float(r[1] or 0),
-            "actual": float(r[2] or 0),
-            "breaks": float(r[3] or 0),
-            "overtime": max(0, float(r[2] or 0) - float(r[1] or 0))
+            "date": day.isoformat(),
+            "scheduled": float(scheduled or 0),
+            "actual": float(actual or 0),
+            "breaks": float(breaks or 0),
+            "overtime": max(0, float(actual or 0) - float(scheduled or 0))
         }
-        for r in results
+        for day, (scheduled, actual, breaks) in sorted(days.items())
     ]
 
 @router.post("/upload")
 async def upload_shift_report(
+    response: Response,
     file: UploadFile = File(...),
-    session: Session = Depends(get_session)
+    store_id: Optional[str] = Form(None),
+    job_id: Optional[str] = Form(None),
+    upsert: bool = False,
+    session: Session = Depends(get_write_session)
 ):
     """
     Upload a PDF shift report, parse it, and store records in the database.
+    Pass upsert=true to apply a corrected re-export over shifts already stored.
+    The store is read from the report header unless a store_id form field is sent.
+    
+    Progress is published on /events as upload.progress events under job_id
+    (a form field, so the client can subscribe before uploading; generated
+    when omitted). The stored rows are announced as data.changed and
+    alerts.new like any other ingest.
+    
+    The spooled upload is parsed in place: small files never touch disk and
+    larger ones are read from the anonymous temp file Starlette spilled them to.
     """
     if not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
 
-    # Ensure uploads directory exists
-    upload_dir = Path("uploads")
-    upload_dir.mkdir(exist_ok=True)
-    
-    file_path = upload_dir / file.filename
-    
+    job_id = job_id or uuid.uuid4().hex[:12]
+
+    def progress(stage: str, info: Dict[str, Any]):
+        broker.publish("upload.progress", {"job_id": job_id, "filename": file.filename, "stage": stage, **info})
+
     try:
-        # Save temporary file
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        # Parse PDF
-        parser = PDFParser(str(file_path))
-        records = parser.parse()
+        progress("received", {})
+        # Parse PDF (in the threadpool so concurrent uploads don't block the event loop)
+        parser = PDFParser(file.file, name=file.filename, store_id=store_id or None, progress=progress)
+        records = await run_in_threadpool(parser.parse)
         
         if not records:
+            progress("done", {"records": 0})
             return {
                 "message": "No records found in PDF",
                 "stats": {
                     "total_records": 0,
                     "summaries_inserted": 0,
+                    "summaries_updated": 0,
+                    "summaries_unchanged": 0,
+                    "summaries_archived": 0,
                     "punches_inserted": 0,
                     "errors": 0
                 }
             }
         
         # Store in database
-        with ShiftDataService() as service:
-            stats = service.insert_shift_records(records)
+        def store():
+            with ShiftDataService() as service:
+                return service.insert_shift_records(records, upsert=upsert, source="upload")
+        progress("storing", {"records": len(records)})
+        stats = await run_in_threadpool(store)
+        # The uploader's follow-up reads must see these rows, replica lag or not
+        mark_write(response)
+        progress("stored", stats)
+        progress("done", {"records": len(records)})
             
         return {
             "message": "File processed successfully",
             "stats": stats,
-            "filename": file.filename
+            "filename": file.filename,
+            "store_id": parser.store_id,
+            "job_id": job_id
         }
         
     except Exception as e:
+        progress("failed", {"error": str(e)})
         print(f"Error processing upload: {e}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        # Clean up temporary file if it exists
-        if file_path.exists():
-            try:
-                os.remove(file_path)
-            except:
-                pass
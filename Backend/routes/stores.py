@@ -0,0 +1,208 @@
+import asyncio
+import os
+import time
+from datetime import datetime, date
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select, func
+
+# Local imports
+from db import get_read_session, read_engine
+from models import ShiftSummary, AttendanceRecord
+from utils.profiler import ProfiledRoute
+from utils.query_stats import query_budget
+
+router = APIRouter(
+    prefix="/stores",
+    tags=["stores"],
+    route_class=ProfiledRoute,
+)
+
+# Per-store queries run concurrently, at most this many at a time
+STORE_QUERY_CONCURRENCY = int(os.getenv("STORE_QUERY_CONCURRENCY", 8))
+
+
+def _parse_range(start_date: Optional[str], end_date: Optional[str]):
+    try:
+        start = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+        end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    return start, end
+
+
+def _store_filters(model, store_id: Optional[str], start: Optional[date], end: Optional[date]) -> list:
+    filters = [model.store_id == store_id if store_id is not None else model.store_id.is_(None)]
+    if start:
+        filters.append(model.business_date >= start)
+    if end:
+        filters.append(model.business_date <= end)
+    return filters
+
+
+def _list_store_ids(bind: Engine) -> List[Optional[str]]:
+    with Session(bind) as session:
+        return list(session.exec(select(ShiftSummary.store_id).distinct().order_by(ShiftSummary.store_id)).all())
+
+
+async def _fan_out(worker, store_ids: List[Optional[str]], *args) -> List[Any]:
+    """Run worker(store_id, *args) for every store in the threadpool, bounded by STORE_QUERY_CONCURRENCY."""
+    semaphore = asyncio.Semaphore(STORE_QUERY_CONCURRENCY)
+
+    async def run(store_id):
+        async with semaphore:
+            return await run_in_threadpool(worker, store_id, *args)
+
+    return await asyncio.gather(*(run(store_id) for store_id in store_ids))
+
+
+@router.get("/")
+@query_budget(2)
+def get_stores(session: Session = Depends(get_read_session)):
+    """
+    List stores with their shift counts and date coverage.
+    Rows ingested before stores were tracked are grouped under store_id null.
+    """
+    rows = session.exec(
+        select(
+            ShiftSummary.store_id,
+            func.count(ShiftSummary.id),
+            func.count(func.distinct(ShiftSummary.employee_last_name + ShiftSummary.employee_first_name)),
+            func.min(ShiftSummary.business_date),
+            func.max(ShiftSummary.business_date)
+        ).group_by(ShiftSummary.store_id).order_by(ShiftSummary.store_id)
+    ).all()
+
+    return [
+        {
+            "store_id": store_id,
+            "total_shifts": shifts,
+            "total_employees": employees,
+            "first_date": first.isoformat() if first else None,
+            "last_date": last.isoformat() if last else None,
+        }
+        for store_id, shifts, employees, first, last in rows
+    ]
+
+
+def _store_summary(store_id: Optional[str], bind: Engine, start: Optional[date], end: Optional[date]) -> Dict[str, Any]:
+    """KPIs for one store; runs in a worker thread with its own session."""
+    started = time.perf_counter()
+    with Session(bind) as session:
+        totals = session.exec(
+            select(
+                func.count(ShiftSummary.id),
+                func.count(func.distinct(ShiftSummary.employee_last_name + ShiftSummary.employee_first_name)),
+                func.sum(ShiftSummary.scheduled_working_hours),
+                func.sum(ShiftSummary.actual_working_hours),
+                func.sum(ShiftSummary.break_hours)
+            ).where(*_store_filters(ShiftSummary, store_id, start, end))
+        ).one()
+        statuses = dict(session.exec(
+            select(AttendanceRecord.status, func.count(AttendanceRecord.id))
+            .where(*_store_filters(AttendanceRecord, store_id, start, end))
+            .group_by(AttendanceRecord.status)
+        ).all())
+
+    scheduled = float(totals[2] or 0)
+    actual = float(totals[3] or 0)
+    return {
+        "store_id": store_id,
+        "total_shifts": totals[0],
+        "total_employees": totals[1],
+        "total_scheduled": round(scheduled, 1),
+        "total_actual": round(actual, 1),
+        "total_break": round(float(totals[4] or 0), 1),
+        "variance": round(actual - scheduled, 1),
+        "attendance": statuses,
+        "query_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+@router.get("/summary")
+async def get_cross_store_summary(
+    request: Request,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    store_ids: Optional[List[str]] = Query(None, alias="store_id"),
+):
+    """
+    KPIs per store plus chain-wide totals. Each store is queried separately
+    and concurrently (each one an index range scan on store and date), then
+    the results are merged. Employees are counted per store.
+    """
+    start, end = _parse_range(start_date, end_date)
+    bind = read_engine(request)
+    started = time.perf_counter()
+
+    if store_ids is None:
+        store_ids = await run_in_threadpool(_list_store_ids, bind)
+    stores = await _fan_out(_store_summary, store_ids, bind, start, end)
+
+    attendance: Dict[str, int] = {}
+    for store in stores:
+        for status, count in store["attendance"].items():
+            attendance[status] = attendance.get(status, 0) + count
+    scheduled = sum(store["total_scheduled"] for store in stores)
+    actual = sum(store["total_actual"] for store in stores)
+
+    return {
+        "stores": stores,
+        "totals": {
+            "store_count": len(stores),
+            "total_shifts": sum(store["total_shifts"] for store in stores),
+            "total_employees": sum(store["total_employees"] for store in stores),
+            "total_scheduled": round(scheduled, 1),
+            "total_actual": round(actual, 1),
+            "total_break": round(sum(store["total_break"] for store in stores), 1),
+            "variance": round(actual - scheduled, 1),
+            "attendance": attendance,
+        },
+        "query_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def _store_daily(store_id: Optional[str], bind: Engine, start: Optional[date], end: Optional[date]) -> list:
+    """Daily scheduled/actual hours for one store; runs in a worker thread."""
+    with Session(bind) as session:
+        return session.exec(
+            select(
+                ShiftSummary.business_date,
+                func.sum(ShiftSummary.scheduled_working_hours),
+                func.sum(ShiftSummary.actual_working_hours)
+            )
+            .where(*_store_filters(ShiftSummary, store_id, start, end))
+            .group_by(ShiftSummary.business_date)
+        ).all()
+
+
+@router.get("/daily")
+async def get_cross_store_daily(
+    request: Request,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    store_ids: Optional[List[str]] = Query(None, alias="store_id"),
+):
+    """
+    Daily hours side by side for each store, for comparison charts.
+    Per-store queries run concurrently and are merged by date.
+    """
+    start, end = _parse_range(start_date, end_date)
+    bind = read_engine(request)
+
+    if store_ids is None:
+        store_ids = await run_in_threadpool(_list_store_ids, bind)
+    per_store = await _fan_out(_store_daily, store_ids, bind, start, end)
+
+    days: Dict[date, Dict[str, Any]] = {}
+    for store_id, rows in zip(store_ids, per_store):
+        for business_date, scheduled, actual in rows:
+            day = days.setdefault(business_date, {"date": business_date.isoformat(), "stores": {}})
+            day["stores"][store_id or "unassigned"] = {
+                "scheduled": float(scheduled or 0),
+                "actual": float(actual or 0),
+            }
+    return [days[day] for day in sorted(days)]
@@ -0,0 +1,234 @@
+"""
+Cold-data archival to Parquet.
+
+Whole months older than a cutoff are moved out of shift_summary,
+shift_punches and attendance_records into zstd-compressed Parquet files:
+
+    <ARCHIVE_DIR>/<table>/month=YYYY-MM/part-<timestamp>.parquet
+
+Punches are archived with the month of their shift summary. The read
+helpers let the stats endpoints fold archived months back into their
+answers, scanning only the month directories a range touches.
+"""
+
+import os
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Date, DateTime, Integer, LargeBinary, Numeric, Table, delete, func, select
+from sqlmodel import Session
+
+from models import ShiftSummary, ShiftPunch, AttendanceRecord
+from services.partition_service import iter_months, month_start, next_month
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ARCHIVE_COMPRESSION = "zstd"
+
+
+# -----------------------------------------------------------------------------
+# Layout
+# -----------------------------------------------------------------------------
+def _month_dir(table: str, month: date) -> str:
+    return os.path.join(ARCHIVE_DIR, table, f"month={month:%Y-%m}")
+
+
+def archived_months(table: str = ShiftSummary.__tablename__) -> List[date]:
+    """Months that have archive files for a table, oldest first."""
+    table_dir = os.path.join(ARCHIVE_DIR, table)
+    if not os.path.isdir(table_dir):
+        return []
+    months = []
+    for name in os.listdir(table_dir):
+        if name.startswith("month="):
+            try:
+                months.append(datetime.strptime(name[6:], '%Y-%m').date())
+            except ValueError:
+                continue
+    return sorted(months)
+
+
+def _arrow_schema(table: Table) -> "pa.Schema":
+    """Arrow schema matching a table's columns, so every part file agrees."""
+    fields = []
+    for column in table.columns:
+        if isinstance(column.type, Numeric):
+            arrow_type = pa.decimal128(column.type.precision, column.type.scale)
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp('us')
+        elif isinstance(column.type, Date):
+            arrow_type = pa.date32()
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, LargeBinary):
+            arrow_type = pa.binary()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+# -----------------------------------------------------------------------------
+# Archival
+# -----------------------------------------------------------------------------
+def archive_before(session: Session, cutoff: date, dry_run: bool = False) -> Dict[str, Dict[str, int]]:
+    """
+    Move every whole month before the cutoff's month into Parquet files.
+    Each month is written, then deleted from the database in its own
+    transaction, so an interrupted run never loses rows.
+
+    Returns:
+        {"YYYY-MM": {table: rows archived}}
+    """
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow not installed. Run: pip install pyarrow")
+
+    first_day = session.execute(select(func.min(ShiftSummary.business_date))).scalar()
+    if first_day is None or month_start(cutoff) <= first_day:
+        return {}
+
+    results = {}
+    last_month = date.fromordinal(month_start(cutoff).toordinal() - 1)
+    for month in iter_months(first_day, last_month):
+        counts = _archive_month(session, month, dry_run)
+        if counts:
+            results[f"{month:%Y-%m}"] = counts
+    return results
+
+
+def _archive_month(session: Session, month: date, dry_run: bool) -> Dict[str, int]:
+    """Archive one month; returns row counts per table (empty if nothing to do)."""
+    in_month = (ShiftSummary.business_date >= month, ShiftSummary.business_date < next_month(month))
+    attendance_in_month = (
+        AttendanceRecord.business_date >= month,
+        AttendanceRecord.business_date < next_month(month)
+    )
+    summary_ids = select(ShiftSummary.id).where(*in_month).scalar_subquery()
+    queries = {
+        ShiftSummary: select(ShiftSummary.__table__).where(*in_month),
+        ShiftPunch: select(ShiftPunch.__table__).where(ShiftPunch.shift_summary_id.in_(summary_ids)),
+        AttendanceRecord: select(AttendanceRecord.__table__).where(*attendance_in_month),
+    }
+
+    counts = {}
+    written = []
+    for model, query in queries.items():
+        rows = [dict(row) for row in session.execute(query).mappings()]
+        if not rows:
+            continue
+        counts[model.__tablename__] = len(rows)
+        if dry_run:
+            continue
+        written.append(_write_part(model.__table__, month, rows))
+
+    if not counts or dry_run:
+        return counts
+
+    try:
+        # Children first; punches are matched through their summaries
+        session.execute(delete(ShiftPunch).where(ShiftPunch.shift_summary_id.in_(summary_ids)))
+        session.execute(delete(AttendanceRecord).where(*attendance_in_month))
+        session.execute(delete(ShiftSummary).where(*in_month))
+        session.commit()
+    except Exception:
+        session.rollback()
+        # The rows are still in the database; drop the copies so they are not counted twice
+        for path in written:
+            os.remove(path)
+        raise
+
+    print(f"🗄️  Archived {month:%Y-%m}: " + ", ".join(f"{t} {n}" for t, n in counts.items()))
+    return counts
+
+
+def _write_part(table: Table, month: date, rows: List[dict]) -> str:
+    """Write rows as a new part file for the month; returns its path."""
+    directory = _month_dir(table.name, month)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"part-{time.time_ns()}.parquet")
+    arrow_table = pa.Table.from_pylist(rows, schema=_arrow_schema(table))
+    tmp_path = f"{path}.tmp"
+    pq.write_table(arrow_table, tmp_path, compression=ARCHIVE_COMPRESSION)
+    os.replace(tmp_path, path)
+    return path
+
+
+# -----------------------------------------------------------------------------
+# Reads
+# -----------------------------------------------------------------------------
+def archived_summaries(start: Optional[date] = None, end: Optional[date] = None,
+                       columns: Optional[List[str]] = None,
+                       last_name: Optional[str] = None,
+                       store_id: Optional[str] = None) -> List[dict]:
+    """
+    Archived shift_summary rows with business_date in [start, end].
+    Only month directories overlapping the range are opened.
+    """
+    if not PYARROW_AVAILABLE:
+        return []
+    table = ShiftSummary.__tablename__
+    months = [
+        month for month in archived_months(table)
+        if (start is None or next_month(month) > start) and (end is None or month <= end)
+    ]
+    if not months:
+        return []
+
+    files = [
+        os.path.join(_month_dir(table, month), name)
+        for month in months
+        for name in sorted(os.listdir(_month_dir(table, month)))
+        if name.endswith(".parquet")
+    ]
+    dataset = ds.dataset(files, format="parquet", schema=_arrow_schema(ShiftSummary.__table__))
+
+    condition = None
+    for clause in (
+        ds.field("business_date") >= pa.scalar(start, pa.date32()) if start else None,
+        ds.field("business_date") <= pa.scalar(end, pa.date32()) if end else None,
+        ds.field("employee_last_name") == last_name if last_name else None,
+        ds.field("store_id") == store_id if store_id else None,
+    ):
+        if clause is not None:
+            condition = clause if condition is None else condition & clause
+    return dataset.to_table(columns=columns, filter=condition).to_pylist()
+
+
+def archived_employee_totals(start: Optional[date] = None, end: Optional[date] = None,
+                             store_id: Optional[str] = None) -> Dict[Tuple[Optional[str], str, str], List]:
+    """(store, first, last) -> [scheduled, actual, break, shift count] over archived months."""
+    totals = defaultdict(lambda: [Decimal(0), Decimal(0), Decimal(0), 0])
+    for row in archived_summaries(start, end, store_id=store_id, columns=[
+        "store_id", "employee_first_name", "employee_last_name",
+        "scheduled_working_hours", "actual_working_hours", "break_hours",
+    ]):
+        entry = totals[(row["store_id"], row["employee_first_name"], row["employee_last_name"])]
+        entry[0] += row["scheduled_working_hours"] or 0
+        entry[1] += row["actual_working_hours"] or 0
+        entry[2] += row["break_hours"] or 0
+        entry[3] += 1
+    return dict(totals)
+
+
+def archived_daily_totals(start: Optional[date] = None,
+                          end: Optional[date] = None) -> Dict[date, List]:
+    """business_date -> [scheduled, actual, breaks] over archived months."""
+    totals = defaultdict(lambda: [Decimal(0), Decimal(0), Decimal(0)])
+    for row in archived_summaries(start, end, columns=[
+        "business_date", "scheduled_working_hours", "actual_working_hours", "break_hours",
+    ]):
+        entry = totals[row["business_date"]]
+        entry[0] += row["scheduled_working_hours"] or 0
+        entry[1] += row["actual_working_hours"] or 0
+        entry[2] += row["break_hours"] or 0
+    return dict(totals)
@@ -0,0 +1,226 @@
+"""
+Attendance status rules.
+
+One rule set drives both ingest (derive_status, per record) and bulk
+recomputation (status_expression, the same rules as a SQL CASE), so changing
+the policy only needs a recompute, not a re-ingest. Rules apply in order:
+
+    Absent           scheduled hours but no worked hours
+    Partial          worked less than ATTENDANCE_PARTIAL_RATIO of the scheduled hours
+    Late             first punch more than ATTENDANCE_LATE_GRACE_MINUTES after the scheduled start
+    Early Departure  last punch more than ATTENDANCE_EARLY_GRACE_MINUTES before the scheduled end
+    Present          otherwise
+
+Rows whose status was set through /attendance/bulk (status_source "manual")
+keep their status; recomputation only refreshes their times and hours. Rows
+that predate status_source have it null, and since overrides made back then
+cannot be told apart by their source they are kept as well, until
+classify_legacy_sources (manage.py classify-attendance-sources) has sorted
+them into derived and manual.
+"""
+
+import os
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Optional
+
+from sqlalchemy import and_, case, func, literal, or_, update
+from sqlmodel import Session, select
+
+from models import AttendanceRecord, ShiftSummary
+from services.partition_service import iter_months, next_month
+
+STATUS_SOURCE_DERIVED = "derived"
+STATUS_SOURCE_MANUAL = "manual"
+
+
+def keeps_status(source: Optional[str]) -> bool:
+    """Whether a row's stored status survives re-derivation: manual or unknown source."""
+    return source != STATUS_SOURCE_DERIVED
+
+
+def _keeps_status_clause():
+    return or_(
+        AttendanceRecord.status_source == STATUS_SOURCE_MANUAL,
+        AttendanceRecord.status_source.is_(None)
+    )
+
+
+@dataclass(frozen=True)
+class AttendanceRules:
+    late_grace_minutes: int = 7
+    early_grace_minutes: int = 15
+    partial_ratio: Decimal = Decimal("0.5")
+
+    @classmethod
+    def from_env(cls) -> "AttendanceRules":
+        return cls(
+            late_grace_minutes=int(os.getenv("ATTENDANCE_LATE_GRACE_MINUTES", 7)),
+            early_grace_minutes=int(os.getenv("ATTENDANCE_EARLY_GRACE_MINUTES", 15)),
+            partial_ratio=Decimal(os.getenv("ATTENDANCE_PARTIAL_RATIO", "0.5")),
+        )
+
+    def as_dict(self) -> dict:
+        rules = asdict(self)
+        rules["partial_ratio"] = float(self.partial_ratio)
+        return rules
+
+
+RULES = AttendanceRules.from_env()
+
+
+# -----------------------------------------------------------------------------
+# Per Record (ingest)
+# -----------------------------------------------------------------------------
+def derive_status(scheduled_hours: Optional[Decimal], actual_hours: Optional[Decimal],
+                  scheduled_start: Optional[datetime], scheduled_end: Optional[datetime],
+                  actual_start: Optional[datetime], actual_end: Optional[datetime],
+                  rules: AttendanceRules = RULES) -> str:
+    scheduled = scheduled_hours or Decimal(0)
+    actual = actual_hours or Decimal(0)
+
+    if scheduled > 0 and actual == 0:
+        return "Absent"
+    if scheduled > 0 and actual < scheduled * rules.partial_ratio:
+        return "Partial"
+    if scheduled_start and actual_start and actual_start > scheduled_start + timedelta(minutes=rules.late_grace_minutes):
+        return "Late"
+    if scheduled_end and actual_end and actual_end < scheduled_end - timedelta(minutes=rules.early_grace_minutes):
+        return "Early Departure"
+    return "Present"
+
+
+# -----------------------------------------------------------------------------
+# Set-Based (recompute)
+# -----------------------------------------------------------------------------
+def _minutes_between(later, earlier, dialect: str):
+    """SQL expression for (later - earlier) in minutes."""
+    if dialect == "postgresql":
+        return func.extract("epoch", later - earlier) / 60
+    # SQLite stores timestamps as text; julianday() is a float, so round to whole
+    # seconds or an exact 7 minutes would compare as slightly more than 7
+    return func.round((func.julianday(later) - func.julianday(earlier)) * 86400) / 60
+
+
+def status_expression(dialect: str, scheduled_hours, actual_hours, scheduled_start, scheduled_end,
+                      actual_start, actual_end, rules: AttendanceRules = RULES):
+    """derive_status as a SQL CASE over the given column expressions."""
+    scheduled = func.coalesce(scheduled_hours, 0)
+    actual = func.coalesce(actual_hours, 0)
+    return case(
+        (and_(scheduled > 0, actual == 0), literal("Absent")),
+        (and_(scheduled > 0, actual < scheduled * rules.partial_ratio), literal("Partial")),
+        (and_(
+            scheduled_start.isnot(None), actual_start.isnot(None),
+            _minutes_between(actual_start, scheduled_start, dialect) > rules.late_grace_minutes
+        ), literal("Late")),
+        (and_(
+            scheduled_end.isnot(None), actual_end.isnot(None),
+            _minutes_between(scheduled_end, actual_end, dialect) > rules.early_grace_minutes
+        ), literal("Early Departure")),
+        else_=literal("Present"),
+    )
+
+
+def _derived_status(dialect: str, rules: AttendanceRules):
+    """
+    (status, actual_start, actual_end) expressions for an attendance row joined
+    to its shift summary. Punch times fall back to the row's own for summaries
+    stored before they were denormalized.
+    """
+    actual_start = func.coalesce(ShiftSummary.first_punch_at, AttendanceRecord.actual_start)
+    actual_end = func.coalesce(ShiftSummary.last_punch_at, AttendanceRecord.actual_end)
+    derived = status_expression(
+        dialect,
+        ShiftSummary.scheduled_working_hours,
+        ShiftSummary.actual_working_hours,
+        AttendanceRecord.scheduled_start,
+        AttendanceRecord.scheduled_end,
+        actual_start,
+        actual_end,
+        rules,
+    )
+    return derived, actual_start, actual_end
+
+
+def recompute_attendance(session: Session, start: date, end: date, store_id: Optional[str] = None,
+                         rules: AttendanceRules = RULES) -> Dict[str, int]:
+    """
+    Re-derive status, times and hours of attendance rows dated start..end from
+    their shift summaries, one UPDATE ... FROM statement per month (committed
+    per month). Manually set statuses, and those of unknown source, are kept.
+    Returns row counts.
+    """
+    derived, actual_start, actual_end = _derived_status(session.get_bind().dialect.name, rules)
+    keeps_status = _keeps_status_clause()
+    actual_hours = func.coalesce(ShiftSummary.actual_working_hours, 0)
+
+    counts = {"updated": 0, "manual_kept": 0}
+    for month in iter_months(start, end):
+        first_day = max(start, month)
+        end_day = min(end + timedelta(days=1), next_month(month))
+        # Both sides bounded, so each side only scans its own month's partition
+        in_range = [
+            AttendanceRecord.shift_summary_id == ShiftSummary.id,
+            AttendanceRecord.business_date >= first_day,
+            AttendanceRecord.business_date < end_day,
+            ShiftSummary.business_date >= first_day,
+            ShiftSummary.business_date < end_day,
+        ]
+        if store_id is not None:
+            in_range.append(AttendanceRecord.store_id == store_id)
+
+        result = session.execute(
+            update(AttendanceRecord)
+            .where(*in_range)
+            .values(
+                status=case((keeps_status, AttendanceRecord.status), else_=derived),
+                actual_start=actual_start,
+                actual_end=actual_end,
+                total_hours=actual_hours,
+                variance_hours=actual_hours - func.coalesce(ShiftSummary.scheduled_working_hours, 0),
+                updated_at=datetime.utcnow(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        counts["updated"] += result.rowcount
+        counts["manual_kept"] += session.exec(
+            select(func.count(AttendanceRecord.id)).where(*in_range, keeps_status)
+        ).one()
+        session.commit()
+    return counts
+
+
+def classify_legacy_sources(session: Session, rules: AttendanceRules = RULES) -> Dict[str, int]:
+    """
+    Fill status_source on rows that predate it (a one-time upgrade step).
+    A row whose status is what the rules derive from its shift, and that
+    carries no notes, is "derived"; anything else, including rows created
+    through /attendance/bulk without a shift, was set by hand and becomes
+    "manual". Run it with the rules that were in force when those rows were
+    stored (the defaults, unless changed). Returns row counts.
+    """
+    derived, _, _ = _derived_status(session.get_bind().dialect.name, rules)
+    unknown = AttendanceRecord.status_source.is_(None)
+    counts = {}
+    counts[STATUS_SOURCE_DERIVED] = session.execute(
+        update(AttendanceRecord)
+        .where(
+            unknown,
+            AttendanceRecord.shift_summary_id == ShiftSummary.id,
+            AttendanceRecord.business_date == ShiftSummary.business_date,
+            AttendanceRecord.notes.is_(None),
+            AttendanceRecord.status == derived
+        )
+        .values(status_source=STATUS_SOURCE_DERIVED)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    counts[STATUS_SOURCE_MANUAL] = session.execute(
+        update(AttendanceRecord)
+        .where(unknown)
+        .values(status_source=STATUS_SOURCE_MANUAL)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    session.commit()
+    return counts
@@ -0,0 +1,332 @@
+"""
+In-memory employee name index for autocomplete.
+
+Every (first, last) name seen in shift_summary is held per worker with:
+
+    a sorted list of name words    prefix matches by bisection ("jo", "smi")
+    trigram postings per word      candidates for typo-tolerant matches, which
+                                   are then scored by edit distance ("jhon" -> "John")
+
+The index is loaded on startup and kept current without rescanning shifts:
+ingest looks up names it has not stored before (find_new_employees) and,
+once committed, bumps the "employees" row of cache_versions and adds them
+to the local index. Other workers, and the API after a CLI or daemon ingest, compare
+that version at most every EMPLOYEE_INDEX_CHECK_SECONDS and reload when it
+moved.
+"""
+
+import os
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from models import CacheVersion, ShiftSummary
+
+# How often a worker checks cache_versions for employees added elsewhere
+EMPLOYEE_INDEX_CHECK_SECONDS = float(os.getenv("EMPLOYEE_INDEX_CHECK_SECONDS", 5))
+
+# Fuzzy matches need at least this similarity per query word: 1 - edits / length
+# of the longer word, counting a swap of neighbouring letters as one edit
+EMPLOYEE_SEARCH_MIN_SIMILARITY = float(os.getenv("EMPLOYEE_SEARCH_MIN_SIMILARITY", 0.7))
+
+# Words sharing the most trigrams with a query word that get scored
+FUZZY_CANDIDATES = 50
+
+CACHE_NAME = "employees"
+
+
+def normalize(text: str) -> str:
+    """Lowercase, accent-free form used for matching ("José" -> "jose")."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return " ".join("".join(c for c in decomposed if not unicodedata.combining(c)).split())
+
+
+def trigrams(word: str) -> Set[str]:
+    """Trigrams of a word, padded so short names and word starts still count."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a: str, b: str) -> float:
+    """1 - optimal string alignment distance / longer length (1.0 for equal words)."""
+    longest = max(len(a), len(b))
+    if not longest:
+        return 1.0
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return 1 - previous[-1] / longest
+
+
+@dataclass
+class EmployeeEntry:
+    first_name: str
+    last_name: str
+    store_ids: Set[Optional[str]] = field(default_factory=set)
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.first_name} {self.last_name}"
+
+    def as_dict(self) -> dict:
+        return {
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+            "full_name": self.full_name,
+            "store_ids": sorted(self.store_ids, key=lambda store_id: store_id or ""),
+        }
+
+
+class _Snapshot:
+    """Immutable lookup structures; searches read one while a reload builds the next."""
+
+    def __init__(self, entries: List[EmployeeEntry]):
+        self.entries = entries
+        # (word, entry index), sorted for prefix bisection
+        self.tokens: List[Tuple[str, int]] = []
+        # trigram -> positions in self.words
+        self.trigrams: Dict[str, List[int]] = {}
+        self.words: List[Tuple[str, int]] = []
+        self.word_trigram_counts: List[int] = []
+        for i, entry in enumerate(entries):
+            for word in set(normalize(entry.full_name).split()):
+                self.tokens.append((word, i))
+                grams = trigrams(word)
+                for gram in grams:
+                    self.trigrams.setdefault(gram, []).append(len(self.words))
+                self.words.append((word, i))
+                self.word_trigram_counts.append(len(grams))
+        self.tokens.sort()
+
+    def prefix_matches(self, prefix: str) -> Dict[int, bool]:
+        """Entry index -> whether some token equals the prefix, for tokens starting with it."""
+        matches: Dict[int, bool] = {}
+        pos = bisect_left(self.tokens, (prefix, -1))
+        while pos < len(self.tokens) and self.tokens[pos][0].startswith(prefix):
+            token, i = self.tokens[pos]
+            matches[i] = matches.get(i, False) or token == prefix
+            pos += 1
+        return matches
+
+    def similar_words(self, word: str) -> Dict[int, float]:
+        """Entry index -> best similarity of its words to word, for those above the threshold."""
+        shared = Counter(
+            position for gram in trigrams(word) for position in self.trigrams.get(gram, ())
+        )
+        best: Dict[int, float] = {}
+        for position, common in shared.most_common(FUZZY_CANDIDATES):
+            candidate, i = self.words[position]
+            longest = max(len(candidate), len(word))
+            # Cheap bounds first: the length difference alone limits the
+            # similarity, and each allowed edit breaks at most 4 trigrams
+            if 1 - abs(len(candidate) - len(word)) / longest < EMPLOYEE_SEARCH_MIN_SIMILARITY:
+                continue
+            max_edits = int((1 - EMPLOYEE_SEARCH_MIN_SIMILARITY) * longest + 1e-9)
+            if common < self.word_trigram_counts[position] - 4 * max_edits:
+                continue
+            score = similarity(word, candidate)
+            if score >= EMPLOYEE_SEARCH_MIN_SIMILARITY and score > best.get(i, 0):
+                best[i] = score
+        return best
+
+
+class EmployeeIndex:
+    """Per-process employee name index; see the module docstring."""
+
+    def __init__(self):
+        self._snapshot = _Snapshot([])
+        self._by_key: Dict[Tuple[str, str], EmployeeEntry] = {}
+        self._lock = threading.Lock()
+        self.version: Optional[int] = None
+        self.loaded = False
+        self._checked_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._snapshot.entries)
+
+    # -------------------------------------------------------------------------
+    # Loading
+    # -------------------------------------------------------------------------
+    def load(self, bind: Engine, version: Optional[int] = None):
+        """
+        (Re)build the index from shift_summary in one grouped query. version
+        is the cache version already read by the caller, if any; it is read
+        before the names so a concurrent ingest only causes another reload.
+        """
+        with Session(bind) as session:
+            if version is None:
+                version = _read_version(session)
+            rows = session.exec(
+                select(ShiftSummary.employee_first_name, ShiftSummary.employee_last_name, ShiftSummary.store_id)
+                .group_by(ShiftSummary.employee_first_name, ShiftSummary.employee_last_name, ShiftSummary.store_id)
+            ).all()
+        by_key: Dict[Tuple[str, str], EmployeeEntry] = {}
+        for first, last, store_id in rows:
+            by_key.setdefault((first, last), EmployeeEntry(first, last)).store_ids.add(store_id)
+        with self._lock:
+            self._by_key = by_key
+            self._snapshot = _Snapshot(self._sorted(by_key))
+            self.version = version
+            self.loaded = True
+            self._checked_at = time.monotonic()
+
+    def ensure_fresh(self, session: Session):
+        """Reload if another process registered employees since the last check."""
+        if self.loaded and time.monotonic() - self._checked_at < EMPLOYEE_INDEX_CHECK_SECONDS:
+            return
+        version = _read_version(session)
+        if not self.loaded or version != self.version:
+            self.load(session.get_bind(), version)
+        else:
+            self._checked_at = time.monotonic()
+
+    def add(self, names: Iterable[Tuple[str, str, Optional[str]]], version: Optional[int] = None):
+        """
+        Add (first, last, store) names ingested by this process. version is the
+        cache_versions value the ingest wrote; when it directly follows the
+        loaded one nothing was missed, so the next check needs no reload.
+        """
+        if not self.loaded:
+            return
+        with self._lock:
+            by_key = dict(self._by_key)
+            for first, last, store_id in names:
+                entry = by_key.get((first, last))
+                if entry is None:
+                    entry = by_key[(first, last)] = EmployeeEntry(first, last)
+                elif store_id in entry.store_ids:
+                    continue
+                else:
+                    entry = by_key[(first, last)] = EmployeeEntry(first, last, set(entry.store_ids))
+                entry.store_ids.add(store_id)
+            self._by_key = by_key
+            self._snapshot = _Snapshot(self._sorted(by_key))
+            if version is not None and self.version is not None and version == self.version + 1:
+                self.version = version
+
+    @staticmethod
+    def _sorted(by_key: Dict[Tuple[str, str], EmployeeEntry]) -> List[EmployeeEntry]:
+        return [by_key[key] for key in sorted(by_key, key=lambda key: (key[1], key[0]))]
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+    def all(self, store_id: Optional[str] = None) -> List[EmployeeEntry]:
+        """Every employee, ordered by last then first name."""
+        entries = self._snapshot.entries
+        if store_id is None:
+            return list(entries)
+        return [entry for entry in entries if store_id in entry.store_ids]
+
+    def search(self, query: str, limit: int = 10, store_id: Optional[str] = None) -> List[dict]:
+        """
+        Ranked matches for a partial or misspelled name. Names where every
+        query word starts one of their words rank first (whole-word hits
+        higher); if that leaves room, names whose words are close to every
+        query word by edit similarity follow.
+        """
+        snapshot = self._snapshot
+        words = normalize(query).split()
+        if not words:
+            return []
+
+        def allowed(i: int) -> bool:
+            return store_id is None or store_id in snapshot.entries[i].store_ids
+
+        scores: Dict[int, float] = {}
+        candidates: Optional[Dict[int, float]] = None
+        for word in words:
+            matches = snapshot.prefix_matches(word)
+            word_scores = {i: (1.0 if exact else 0.5) for i, exact in matches.items()}
+            if candidates is None:
+                candidates = word_scores
+            else:
+                candidates = {i: score + word_scores[i] for i, score in candidates.items() if i in word_scores}
+        for i, score in candidates.items():
+            if allowed(i):
+                scores[i] = 1 + score / len(words)
+
+        results = [(score, i, "prefix") for i, score in scores.items()]
+        if len(results) < limit:
+            fuzzy: Optional[Dict[int, float]] = None
+            for word in words:
+                word_scores = snapshot.similar_words(word)
+                if fuzzy is None:
+                    fuzzy = word_scores
+                else:
+                    fuzzy = {i: score + word_scores[i] for i, score in fuzzy.items() if i in word_scores}
+            for i, score in fuzzy.items():
+                if i not in scores and allowed(i):
+                    results.append((score / len(words), i, "fuzzy"))
+
+        results.sort(key=lambda result: (-result[0], result[1]))
+        return [
+            {**snapshot.entries[i].as_dict(), "score": round(score, 3), "match": match}
+            for score, i, match in results[:limit]
+        ]
+
+
+# -----------------------------------------------------------------------------
+# Versioning
+# -----------------------------------------------------------------------------
+def _read_version(session: Session) -> int:
+    version = session.exec(select(CacheVersion.version).where(CacheVersion.name == CACHE_NAME)).first()
+    return version or 0
+
+
+def bump_version(session: Session) -> int:
+    """
+    Increment the employees cache version in the caller's transaction; returns
+    the new value. A single upsert, so two writers creating the row at once
+    cannot collide on its primary key.
+    """
+    now = datetime.utcnow()
+    dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+    session.execute(
+        dialect.insert(CacheVersion)
+        .values(name=CACHE_NAME, version=1, updated_at=now)
+        .on_conflict_do_update(
+            index_elements=[CacheVersion.name],
+            set_={'version': CacheVersion.version + 1, 'updated_at': now}
+        )
+    )
+    return _read_version(session)
+
+
+def find_new_employees(session: Session, names: Set[Tuple[str, str, Optional[str]]]) -> List[tuple]:
+    """
+    Of the (first, last, store) names about to be written, those not stored
+    yet. Call before inserting; bump the version once the rows are committed,
+    in a short transaction of its own, so concurrent ingests do not queue on
+    the cache_versions row for the length of an upload.
+    """
+    if not names:
+        return []
+    known = set(session.exec(
+        select(ShiftSummary.employee_first_name, ShiftSummary.employee_last_name, ShiftSummary.store_id)
+        .distinct()
+        .where(tuple_(ShiftSummary.employee_first_name, ShiftSummary.employee_last_name).in_(
+            list({(first, last) for first, last, _ in names})
+        ))
+    ).all())
+    return sorted(names - known, key=lambda name: (name[1], name[0], name[2] or ""))
+
+
+employee_index = EmployeeIndex()
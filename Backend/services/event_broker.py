@@ -0,0 +1,259 @@
+"""
+Event broker for live dashboard updates.
+
+/events/stream (SSE) and /events/ws (WebSocket) deliver events to
+subscribers, so the dashboard refetches only when data actually changed.
+Event types:
+
+    upload.progress  per-stage progress of an upload job
+    data.changed     rows changed for a business date range
+    alerts.new       alerts raised by newly ingested shifts
+
+Events that carry a date range only reach subscribers whose range overlaps
+it; events without one reach everybody. publish() is safe to call from
+worker threads.
+
+Data changes cross processes through the change_events table: ingest (upload,
+daemon or CLI) and attendance edits add a row with record_change() in their
+own transaction, and the ChangeRelay of every API worker polls the table
+every EVENT_POLL_SECONDS and publishes data.changed and alerts.new to its
+subscribers. upload.progress is published directly by the worker handling
+the upload.
+"""
+
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import delete, func
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from models import ChangeEvent, ShiftSummary
+
+# Events a slow subscriber may fall behind by before the oldest are dropped
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", 256))
+
+# Recent events kept so reconnecting SSE clients can resume (Last-Event-ID)
+EVENT_HISTORY_SIZE = int(os.getenv("EVENT_HISTORY_SIZE", 512))
+
+# How often each API worker checks change_events for changes made elsewhere
+EVENT_POLL_SECONDS = float(os.getenv("EVENT_POLL_SECONDS", 1))
+
+# change_events rows older than this are deleted by the relays
+EVENT_RETENTION_HOURS = float(os.getenv("EVENT_RETENTION_HOURS", 24))
+
+# Ids are taken before commit, so a slow writer can commit a row below ids
+# already relayed; rows this far below the last id are checked again
+EVENT_ID_LOOKBACK = 100
+
+ALL_TAGS = ("Shift", "Employee", "Alert", "Attendance")
+
+
+class Subscriber:
+    """One connected client: a bounded queue plus its date range."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop,
+                 start: Optional[date] = None, end: Optional[date] = None):
+        self.loop = loop
+        self.start = start
+        self.end = end
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.dropped = 0
+
+    def wants(self, event: Dict[str, Any]) -> bool:
+        """True if the event's date range (when it has one) overlaps the subscription."""
+        event_start, event_end = event.get("start_date"), event.get("end_date")
+        if event_start is None and event_end is None:
+            return True
+        if self.start is not None and event_end is not None and event_end < self.start.isoformat():
+            return False
+        if self.end is not None and event_start is not None and event_start > self.end.isoformat():
+            return False
+        return True
+
+    def deliver(self, event: Dict[str, Any]):
+        """Queue an event (runs on the subscriber's loop); drops the oldest when full."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class EventBroker:
+    """Fan-out of published events to subscribers."""
+
+    def __init__(self):
+        self._subscribers: Set[Subscriber] = set()
+        self._history: deque = deque(maxlen=EVENT_HISTORY_SIZE)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, start: Optional[date] = None, end: Optional[date] = None,
+                  last_event_id: Optional[int] = None) -> Subscriber:
+        """Register a subscriber on the running loop, replaying events after last_event_id."""
+        subscriber = Subscriber(asyncio.get_running_loop(), start, end)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._history:
+                    if event["id"] > last_event_id and subscriber.wants(event):
+                        subscriber.deliver(event)
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event_type: str, data: Dict[str, Any],
+                start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, Any]:
+        """Send an event to every interested subscriber; returns the event."""
+        with self._lock:
+            event = {
+                "id": next(self._ids),
+                "type": event_type,
+                "time": time.time(),
+                "start_date": start.isoformat() if start else None,
+                "end_date": end.isoformat() if end else None,
+                "data": data,
+            }
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            if not subscriber.wants(event):
+                continue
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+            except RuntimeError:
+                # Loop already closed; the connection is going away
+                self.unsubscribe(subscriber)
+        return event
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            subscribers: List[Subscriber] = list(self._subscribers)
+            last_id = self._history[-1]["id"] if self._history else 0
+        return {
+            "subscribers": len(subscribers),
+            "dropped": sum(subscriber.dropped for subscriber in subscribers),
+            "last_event_id": last_id,
+        }
+
+
+broker = EventBroker()
+
+
+# -----------------------------------------------------------------------------
+# Cross-process changes
+# -----------------------------------------------------------------------------
+def record_change(session: Session, source: str, start: date, end: date,
+                  store_id: Optional[str] = None, tags: Iterable[str] = ALL_TAGS,
+                  summaries_since: Optional[datetime] = None):
+    """
+    Add a change_events row in the caller's transaction, so the change is
+    announced exactly when (and only if) it commits.
+    """
+    session.add(ChangeEvent(
+        source=source,
+        store_id=store_id,
+        start_date=start,
+        end_date=end,
+        tags=",".join(tags),
+        summaries_since=summaries_since,
+    ))
+
+
+class ChangeRelay:
+    """
+    Publishes change_events rows from every process to this worker's
+    subscribers, polling from a background thread.
+    """
+
+    def __init__(self, alerts_for: Optional[Callable[[ShiftSummary], List[Dict[str, Any]]]] = None):
+        self.alerts_for = alerts_for
+        self.last_id = 0
+        self._seen: deque = deque(maxlen=EVENT_ID_LOOKBACK)
+        self._pruned_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, bind: Engine):
+        """Relay changes committed from now on (earlier rows are not replayed)."""
+        with Session(bind) as session:
+            self.last_id = session.exec(select(func.max(ChangeEvent.id))).one() or 0
+            self._seen.extend(session.exec(
+                select(ChangeEvent.id).where(ChangeEvent.id > self.last_id - EVENT_ID_LOOKBACK)
+            ).all())
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(bind,), name="change-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=EVENT_POLL_SECONDS + 5)
+            self._thread = None
+
+    def _run(self, bind: Engine):
+        while not self._stop.wait(EVENT_POLL_SECONDS):
+            try:
+                self.poll(bind)
+            except Exception as e:
+                print(f"⚠️  Change relay poll failed: {e}")
+
+    def poll(self, bind: Engine) -> int:
+        """Publish rows committed since the last poll; returns how many."""
+        with Session(bind) as session:
+            rows = session.exec(
+                select(ChangeEvent)
+                .where(ChangeEvent.id > self.last_id - EVENT_ID_LOOKBACK)
+                .order_by(ChangeEvent.id)
+            ).all()
+            published = 0
+            for row in rows:
+                if row.id in self._seen:
+                    continue
+                self._seen.append(row.id)
+                self.last_id = max(self.last_id, row.id)
+                self._publish(session, row)
+                published += 1
+            if time.monotonic() - self._pruned_at > 3600:
+                self._prune(session)
+        return published
+
+    def _publish(self, session: Session, row: ChangeEvent):
+        broker.publish("data.changed", {
+            "source": row.source,
+            "store_id": row.store_id,
+            "tags": row.tags.split(","),
+        }, row.start_date, row.end_date)
+
+        # Alerts cost a query per change; nobody listening, nothing to raise
+        if row.summaries_since is None or self.alerts_for is None or not broker.has_subscribers:
+            return
+        query = select(ShiftSummary).where(
+            ShiftSummary.business_date >= row.start_date,
+            ShiftSummary.business_date <= row.end_date,
+            ShiftSummary.updated_at >= row.summaries_since,
+        )
+        if row.store_id is not None:
+            query = query.where(ShiftSummary.store_id == row.store_id)
+        alerts = [alert for summary in session.exec(query).all() for alert in self.alerts_for(summary)]
+        if alerts:
+            broker.publish("alerts.new", {"source": row.source, "alerts": alerts}, row.start_date, row.end_date)
+
+    def _prune(self, session: Session):
+        cutoff = datetime.utcnow() - timedelta(hours=EVENT_RETENTION_HOURS)
+        session.execute(delete(ChangeEvent).where(ChangeEvent.created_at < cutoff))
+        session.commit()
+        self._pruned_at = time.monotonic()
@@ -0,0 +1,259 @@
+"""
+Weekly and pay-period overtime.
+
+Per employee, pay_period_totals holds the hours of each pay period, the
+overtime of its workweeks (hours beyond WEEKLY_OVERTIME_HOURS), the busiest
+rolling 7-day window and the longest run of consecutive worked days.
+
+Totals come from one query ordered by employee and date, consumed in a
+single pass: the rolling window is a deque over calendar days and workweek
+and period sums are accumulated as the rows go by. Ingest recomputes only
+the periods its dates can affect (a day also counts towards the rolling
+windows of the 6 days after it). A streak can be longer than the history
+loaded, so each period stores the run still going on its last day and the
+next recompute picks the streak up from there.
+
+Recomputation replaces a store's rows for a range of periods, so it takes a
+PostgreSQL advisory lock per (period, store): ingests of different stores
+never wait on each other, while two of the same store take turns. A
+recompute of every store takes each period's lock exclusively, which the
+per-store recomputes hold shared.
+
+Pay periods are PAY_PERIOD_DAYS long, counted from PAY_PERIOD_ANCHOR, which
+also starts the workweeks. Keep PAY_PERIOD_DAYS a multiple of 7 so each
+workweek falls inside one period; a straddling week is credited to the
+period it starts in.
+"""
+
+import os
+from collections import deque
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, insert, or_
+from sqlmodel import Session, func, select
+
+from db import advisory_xact_lock
+from models import ShiftSummary, PayPeriodTotal
+
+WEEKLY_OVERTIME_HOURS = Decimal(os.getenv("WEEKLY_OVERTIME_HOURS", "40"))
+PAY_PERIOD_DAYS = int(os.getenv("PAY_PERIOD_DAYS", 14))
+# A Monday; the first day of a pay period and of a workweek
+PAY_PERIOD_ANCHOR = datetime.strptime(os.getenv("PAY_PERIOD_ANCHOR", "2024-01-01"), '%Y-%m-%d').date()
+
+# Working more consecutive days than this raises an alert
+MAX_CONSECUTIVE_DAYS = int(os.getenv("MAX_CONSECUTIVE_DAYS", 6))
+
+ROLLING_DAYS = 7
+
+
+# -----------------------------------------------------------------------------
+# Calendar
+# -----------------------------------------------------------------------------
+def period_start_for(day: date) -> date:
+    return PAY_PERIOD_ANCHOR + timedelta(days=(day - PAY_PERIOD_ANCHOR).days // PAY_PERIOD_DAYS * PAY_PERIOD_DAYS)
+
+
+def week_start_for(day: date) -> date:
+    return PAY_PERIOD_ANCHOR + timedelta(days=(day - PAY_PERIOD_ANCHOR).days // 7 * 7)
+
+
+def _lock_periods(session: Session, first_period: date, last_period: date,
+                  store_ids: Optional[Iterable[Optional[str]]]):
+    """Advisory locks for rewriting the periods first..last of the given stores (all when None)."""
+    periods = []
+    period = first_period
+    while period <= last_period:
+        periods.append(f"pay_periods:{period}")
+        period += timedelta(days=PAY_PERIOD_DAYS)
+    if store_ids is None:
+        advisory_xact_lock(session, periods)
+        return
+    advisory_xact_lock(session, periods, shared=True)
+    advisory_xact_lock(session, [f"{period}:{store_id or ''}" for period in periods for store_id in store_ids])
+
+
+def _store_filter(column, store_ids: Iterable[Optional[str]]):
+    """WHERE clause for a set of stores, where None means rows without a store."""
+    store_ids = set(store_ids)
+    clauses = []
+    named = [store_id for store_id in store_ids if store_id is not None]
+    if named:
+        clauses.append(column.in_(named))
+    if None in store_ids:
+        clauses.append(column.is_(None))
+    return or_(*clauses)
+
+
+# -----------------------------------------------------------------------------
+# Computation
+# -----------------------------------------------------------------------------
+def _employee_periods(days: Iterable, first_period: date, last_period: date,
+                      carried_streak: int = 0) -> Dict[date, dict]:
+    """
+    Period totals for one employee from (date, scheduled, actual) rows in date
+    order. Rows before first_period only feed the rolling window, streaks and
+    workweeks; carried_streak is the run of worked days ending the day before
+    first_period, which those rows may only show part of.
+    """
+    window = deque()
+    window_hours = Decimal(0)
+    streak = 0
+    last_worked = None
+    weeks: Dict[date, Decimal] = {}
+    periods: Dict[date, dict] = {}
+    period_limit = last_period + timedelta(days=PAY_PERIOD_DAYS)
+
+    for day, rows in groupby(days, key=lambda row: row[0]):
+        scheduled = actual = Decimal(0)
+        for _, row_scheduled, row_actual in rows:
+            scheduled += row_scheduled or 0
+            actual += row_actual or 0
+
+        week = week_start_for(day)
+        weeks[week] = weeks.get(week, Decimal(0)) + actual
+
+        window.append((day, actual))
+        window_hours += actual
+        while window[0][0] <= day - timedelta(days=ROLLING_DAYS):
+            window_hours -= window.popleft()[1]
+
+        if day >= first_period and carried_streak:
+            if last_worked == first_period - timedelta(days=1):
+                streak = max(streak, carried_streak)
+            carried_streak = 0
+
+        if actual > 0:
+            streak = streak + 1 if last_worked == day - timedelta(days=1) else 1
+            last_worked = day
+
+        if day < first_period or day >= period_limit:
+            continue
+        period = periods.get(period_start_for(day))
+        if period is None:
+            period = periods[period_start_for(day)] = {
+                'scheduled_hours': Decimal(0),
+                'actual_hours': Decimal(0),
+                'overtime_hours': Decimal(0),
+                'max_week_hours': Decimal(0),
+                'max_rolling_hours': Decimal(0),
+                'max_rolling_end': None,
+                'days_worked': 0,
+                'max_consecutive_days': 0,
+                'trailing_consecutive_days': 0,
+            }
+        period['scheduled_hours'] += scheduled
+        period['actual_hours'] += actual
+        if actual > 0:
+            period['days_worked'] += 1
+            period['max_consecutive_days'] = max(period['max_consecutive_days'], streak)
+            if day == period_start_for(day) + timedelta(days=PAY_PERIOD_DAYS - 1):
+                period['trailing_consecutive_days'] = streak
+        if window_hours > period['max_rolling_hours']:
+            period['max_rolling_hours'] = window_hours
+            period['max_rolling_end'] = day
+
+    for week, hours in weeks.items():
+        period = periods.get(period_start_for(week))
+        if period is None:
+            continue
+        period['overtime_hours'] += max(Decimal(0), hours - WEEKLY_OVERTIME_HOURS)
+        period['max_week_hours'] = max(period['max_week_hours'], hours)
+    return periods
+
+
+def recompute_pay_periods(session: Session, start: date, end: date,
+                          store_ids: Optional[Iterable[Optional[str]]] = None) -> int:
+    """
+    Rebuild pay_period_totals for every period that shifts dated start..end
+    can affect, for the given stores (all when None). The caller commits,
+    which releases the period locks. Returns the number of rows written.
+    """
+    first_period = period_start_for(start)
+    last_period = period_start_for(end + timedelta(days=ROLLING_DAYS - 1))
+    last_day = last_period + timedelta(days=PAY_PERIOD_DAYS - 1)
+    load_from = min(first_period - timedelta(days=ROLLING_DAYS - 1), week_start_for(first_period))
+    load_to = max(last_day, week_start_for(last_day) + timedelta(days=6))
+    if store_ids is not None:
+        store_ids = set(store_ids)
+    # Before reading, so the totals include every shift committed ahead of us
+    _lock_periods(session, first_period, last_period, store_ids)
+
+    query = select(
+        ShiftSummary.store_id,
+        ShiftSummary.employee_last_name,
+        ShiftSummary.employee_first_name,
+        ShiftSummary.business_date,
+        ShiftSummary.scheduled_working_hours,
+        ShiftSummary.actual_working_hours
+    ).where(
+        ShiftSummary.business_date >= load_from,
+        ShiftSummary.business_date <= load_to
+    ).order_by(
+        ShiftSummary.store_id,
+        ShiftSummary.employee_last_name,
+        ShiftSummary.employee_first_name,
+        ShiftSummary.business_date
+    )
+    if store_ids is not None:
+        query = query.where(_store_filter(ShiftSummary.store_id, store_ids))
+
+    # Streaks still running at the end of the period before the first one
+    carried = select(
+        PayPeriodTotal.store_id,
+        PayPeriodTotal.employee_last_name,
+        PayPeriodTotal.employee_first_name,
+        PayPeriodTotal.trailing_consecutive_days
+    ).where(
+        PayPeriodTotal.period_start == first_period - timedelta(days=PAY_PERIOD_DAYS),
+        PayPeriodTotal.trailing_consecutive_days > 0
+    )
+    if store_ids is not None:
+        carried = carried.where(_store_filter(PayPeriodTotal.store_id, store_ids))
+    carried_streaks = {tuple(row[:3]): row[3] for row in session.exec(carried)}
+
+    now = datetime.utcnow()
+    totals: List[dict] = []
+    for (store_id, last, first), rows in groupby(session.exec(query), key=lambda row: row[:3]):
+        periods = _employee_periods(
+            ((row[3], row[4], row[5]) for row in rows), first_period, last_period,
+            carried_streaks.get((store_id, last, first), 0)
+        )
+        for period_start, values in periods.items():
+            totals.append({
+                'store_id': store_id,
+                'employee_first_name': first,
+                'employee_last_name': last,
+                'period_start': period_start,
+                'period_end': period_start + timedelta(days=PAY_PERIOD_DAYS - 1),
+                **values,
+                'updated_at': now,
+            })
+
+    statement = delete(PayPeriodTotal).where(
+        PayPeriodTotal.period_start >= first_period,
+        PayPeriodTotal.period_start <= last_period
+    )
+    if store_ids is not None:
+        statement = statement.where(_store_filter(PayPeriodTotal.store_id, store_ids))
+    session.execute(statement)
+    if totals:
+        session.execute(insert(PayPeriodTotal), totals)
+    return len(totals)
+
+
+def recompute_all(session: Session, start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """Rebuild every pay period between start and end (default: all stored shifts) and commit."""
+    if start is None or end is None:
+        first_day, last_day = session.exec(
+            select(func.min(ShiftSummary.business_date), func.max(ShiftSummary.business_date))
+        ).one()
+        if first_day is None:
+            return 0
+        start = start or first_day
+        end = end or last_day
+    written = recompute_pay_periods(session, start, end)
+    session.commit()
+    return written
@@ -0,0 +1,221 @@
+"""
+Monthly range partitioning for the shift tables (PostgreSQL only).
+
+Enabled with DB_PARTITIONING=monthly. The partitioned tables must be created
+by init_db on an empty database; existing plain tables are left alone.
+Partitions are named <table>_yYYYYmMM and created ahead of time by init_db
+and on demand by ingest, so inserts never hit a missing range.
+"""
+
+import json
+import os
+from datetime import date
+from typing import Dict, Iterator, List, Set, Tuple
+
+from sqlalchemy import Column, MetaData, PrimaryKeyConstraint, Table, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlmodel import SQLModel
+
+from db import advisory_xact_lock
+
+PARTITIONING_ENABLED = os.getenv("DB_PARTITIONING", "").lower() in ("1", "true", "monthly")
+
+# Months of empty partitions kept ready beyond the current month
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", 3))
+
+# Partitioned table -> partition key column
+PARTITIONED_TABLES: Dict[str, str] = {
+    "shift_summary": "business_date",
+    "shift_punches": "start_datetime",
+    "attendance_records": "business_date",
+}
+
+# Partitions known to exist, so ingest only issues DDL for new months
+_known_partitions: Set[str] = set()
+
+
+# -----------------------------------------------------------------------------
+# Month Helpers
+# -----------------------------------------------------------------------------
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def iter_months(start: date, end: date) -> Iterator[date]:
+    """First day of every month from start to end, inclusive."""
+    month = month_start(start)
+    while month <= end:
+        yield month
+        month = next_month(month)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+# -----------------------------------------------------------------------------
+# DDL
+# -----------------------------------------------------------------------------
+def _partitioned_table(table: Table, key: str) -> Table:
+    """
+    Copy of a model table declared as PARTITION BY RANGE (key).
+    Postgres requires the partition key in the primary key, and foreign keys
+    cannot reference a partitioned table by id alone, so the copy has a
+    composite primary key and no foreign keys. ids still come from one
+    sequence per table and stay unique.
+    """
+    columns = [
+        Column(
+            column.name,
+            column.type,
+            nullable=column.nullable and column.name != key,
+            index=column.index,
+            autoincrement=column.name == "id",
+        )
+        for column in table.columns
+    ]
+    return Table(
+        table.name,
+        MetaData(),
+        *columns,
+        PrimaryKeyConstraint("id", key),
+        postgresql_partition_by=f"RANGE ({key})",
+    )
+
+
+def create_partitioned_tables(conn: Connection):
+    """
+    Create the partitioned parents before SQLModel's create_all runs,
+    which then skips them. Tables that already exist are left untouched.
+    """
+    existing = set(inspect(conn).get_table_names())
+    partitioned = {row[0] for row in conn.execute(text(
+        "SELECT c.relname FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid"
+    ))}
+    for name, key in PARTITIONED_TABLES.items():
+        if name in existing:
+            if name not in partitioned:
+                print(f"⚠️  {name} already exists as a plain table; partitioning needs a fresh database")
+            continue
+        table = _partitioned_table(SQLModel.metadata.tables[name], key)
+        conn.execute(CreateTable(table))
+        for index in table.indexes:
+            conn.execute(CreateIndex(index))
+        print(f"🧩 Created partitioned table {name} (by {key})")
+
+
+def list_partitions(conn: Connection, table: str) -> List[Tuple[str, str]]:
+    """(partition name, bound expression) for every attached partition."""
+    return [tuple(row) for row in conn.execute(text(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = :table
+        ORDER BY c.relname
+        """
+    ), {"table": table})]
+
+
+def ensure_month_partitions(bind: Engine, start: date, end: date):
+    """
+    Create any missing monthly partitions covering start..end.
+    Runs in its own transaction so a rolled-back ingest never forgets
+    partitions that were already created.
+    """
+    if not PARTITIONING_ENABLED or bind.dialect.name != "postgresql":
+        return
+    wanted = [
+        (table, month)
+        for month in iter_months(start, end)
+        for table in PARTITIONED_TABLES
+        if partition_name(table, month) not in _known_partitions
+    ]
+    if not wanted:
+        return
+
+    with bind.begin() as conn:
+        # Concurrent ingests may want the same new month
+        advisory_xact_lock(conn, ["partitions"])
+        for table, month in wanted:
+            name = partition_name(table, month)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+            ))
+    _known_partitions.update(partition_name(table, month) for table, month in wanted)
+
+
+def ensure_future_partitions(bind: Engine, today: date = None):
+    """Partitions for the current month plus PARTITION_MONTHS_AHEAD months."""
+    month = month_start(today or date.today())
+    end = month
+    for _ in range(PARTITION_MONTHS_AHEAD):
+        end = next_month(end)
+    ensure_month_partitions(bind, month, end)
+
+
+# -----------------------------------------------------------------------------
+# Archival & Checks
+# -----------------------------------------------------------------------------
+def detach_month(bind: Engine, month: date, drop: bool = False) -> List[str]:
+    """
+    Detach one month from every partitioned table.
+    The detached tables keep their data under the same names, ready to be
+    dumped (pg_dump -t) or archived, unless drop=True removes them outright.
+    """
+    detached = []
+    with bind.begin() as conn:
+        attached = {
+            name
+            for table in PARTITIONED_TABLES
+            for name, _ in list_partitions(conn, table)
+        }
+        for table in PARTITIONED_TABLES:
+            name = partition_name(table, month_start(month))
+            if name not in attached:
+                continue
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            if drop:
+                conn.execute(text(f"DROP TABLE {name}"))
+            detached.append(name)
+    _known_partitions.difference_update(detached)
+    return detached
+
+
+def _scanned_relations(plan: dict) -> Set[str]:
+    """Relation names touched anywhere in an EXPLAIN (FORMAT JSON) plan tree."""
+    names = {plan["Relation Name"]} if "Relation Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= _scanned_relations(child)
+    return names
+
+
+def check_pruning(bind: Engine, start: date, end: date) -> Dict[str, dict]:
+    """
+    EXPLAIN a range query over whole months on each partitioned table and
+    report which partitions the planner kept. Pruning works when nothing outside
+    the requested months is scanned.
+    """
+    results = {}
+    with bind.connect() as conn:
+        for table, key in PARTITIONED_TABLES.items():
+            plan = conn.execute(
+                text(f"EXPLAIN (FORMAT JSON) SELECT count(*) FROM {table} "
+                     f"WHERE {key} >= :start AND {key} < :end"),
+                {"start": month_start(start), "end": next_month(end)},
+            ).scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            scanned = _scanned_relations(plan[0]["Plan"])
+            expected = {partition_name(table, month) for month in iter_months(start, end)}
+            results[table] = {
+                "scanned": sorted(scanned),
+                "pruned": scanned <= expected,
+            }
+    return results
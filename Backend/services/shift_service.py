@@ -3,14 +3,43 @@ Database service for storing parsed shift data.
 Handles insertion of shift summaries and punch records.
 """
 
-from sqlmodel import Session, select
+from sqlmodel import Session, func, select
+from sqlalchemy import delete, insert, literal_column, text, update
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects import postgresql, sqlite
 from decimal import Decimal
-from typing import List
-from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from datetime import datetime, date, timedelta
+from functools import partial
 
-from models import ShiftSummary, ShiftPunch, AttendanceRecord
-from parsers.shift_parser import ShiftRecord
+from models import ShiftSummary, ShiftPunch, AttendanceRecord, IngestedFile
+from parsers.shift_parser import PunchTime, ShiftRecord, pack_punches
+from services.attendance_rules import derive_status, keeps_status
+from services.employee_index import bump_version, employee_index, find_new_employees
+from services.event_broker import record_change
+from services.overtime_service import recompute_pay_periods
+from services.archive_service import archived_months
+from services.partition_service import ensure_month_partitions, month_start
 from db import engine
+from utils.profiler import profiled
+
+# Number of records written per flush during bulk inserts
+BULK_CHUNK_SIZE = 500
+
+# Unique index on the natural key of a summary, and its columns: the ON
+# CONFLICT target of ingest
+NATURAL_KEY_INDEX = "ux_shift_summary_natural_key"
+SUMMARY_CONFLICT_TARGET = [
+    literal_column("coalesce(store_id, '')"),
+    "employee_last_name",
+    "employee_first_name",
+    "business_date",
+]
+_natural_key_found = False
+
+
+def _record_key(record: ShiftRecord) -> Tuple[Optional[str], str, str, date]:
+    return (record.store_id, record.employee_first_name, record.employee_last_name, record.business_date)
 
 
 class ShiftDataService:
@@ -19,100 +48,684 @@ class ShiftDataService:
     def __init__(self):
         self.session = Session(engine)
     
-    def insert_shift_records(self, records: List[ShiftRecord]) -> dict:
+    @profiled
+    def insert_shift_records(self, records: List[ShiftRecord], upsert: bool = False, source: str = "ingest") -> dict:
         """
         Insert parsed shift records into database.
+        Existing keys are fetched in one query and new rows are written in
+        chunks; a failing chunk is retried record by record so one bad row
+        does not sink the batch.
+        
+        With upsert=True, records whose fingerprint differs from the stored
+        one have their summary, punches and attendance row rewritten; records
+        with a matching fingerprint are left untouched.
+        
+        Safe to run concurrently: summaries are inserted with ON CONFLICT DO
+        NOTHING on their natural key, so a record another ingest stored in
+        the meantime is treated as existing rather than duplicated, and
+        pay-period totals are rebuilt under per-store advisory locks.
+        
+        Records dated in a month that has been archived are skipped (counted
+        as summaries_archived); archived months are read-only.
+        
+        Writes are announced on /events (see services/event_broker.py) under
+        source, whichever process ingests.
         Returns statistics about the insertion.
         """
+        started = datetime.utcnow()
         stats = {
             'total_records': len(records),
             'summaries_inserted': 0,
+            'summaries_updated': 0,
+            'summaries_unchanged': 0,
+            'summaries_archived': 0,
             'punches_inserted': 0,
             'errors': 0
         }
         
+        # Archived months live in Parquet, which the stats endpoints add to the
+        # database rows; storing them again would count those shifts twice
+        archived = set(archived_months())
+        if archived:
+            kept = [record for record in records if month_start(record.business_date) not in archived]
+            stats['summaries_archived'] = len(records) - len(kept)
+            if stats['summaries_archived']:
+                print(f"🗄️  Skipping {stats['summaries_archived']} record(s) dated in archived months")
+            records = kept
+        
+        if records:
+            dates = [record.business_date for record in records]
+            # Before this session reads the shift tables: creating a partition
+            # locks its parent, and would wait forever on our own open read.
+            # Punches past midnight land in the next day's partition.
+            ensure_month_partitions(engine, min(dates), max(dates) + timedelta(days=1))
+        
+        existing = self._existing_fingerprints(records)
+        seen = set()
+        new_records = []
+        changed = []
+        claimed = []
         for record in records:
-            try:
+            key = _record_key(record)
+            if key in seen:
+                print(f"⚠️  Duplicate record found for {record.employee_last_name}, "
+                      f"{record.employee_first_name} on {record.business_date}. Skipping.")
+                continue
+            seen.add(key)
+            
+            unassigned = (None,) + key[1:]
+            if key not in existing and record.store_id is not None and unassigned in existing:
+                # Stored before stores were tracked; this report's store claims the row
+                existing[key] = existing.pop(unassigned)
+                claimed.append((existing[key][0], record))
+            
+            if key not in existing:
+                new_records.append(record)
+                continue
+            
+            summary_id, fingerprint = existing[key]
+            if upsert and fingerprint != record.fingerprint():
+                changed.append((summary_id, record))
+                continue
+            
+            stats['summaries_unchanged'] += 1
+            if not upsert:
                 # Check if record already exists (prevent duplicates)
-                existing = self.session.exec(
-                    select(ShiftSummary).where(
-                        ShiftSummary.employee_first_name == record.employee_first_name,
-                        ShiftSummary.employee_last_name == record.employee_last_name,
-                        ShiftSummary.business_date == record.business_date
-                    )
-                ).first()
-                
-                if existing:
-                    print(f"⚠️  Duplicate record found for {record.employee_last_name}, "
-                          f"{record.employee_first_name} on {record.business_date}. Skipping.")
-                    continue
-                
-                summary = ShiftSummary(
-                    employee_first_name=record.employee_first_name,
-                    employee_last_name=record.employee_last_name,
-                    business_date=record.business_date,
-                    actual_working_hours=record.actual_working_hours,
-                    scheduled_working_hours=record.scheduled_working_hours,
-                    scheduled_break_hours=record.scheduled_break_hours,
-                    break_hours=record.break_hours
-                )
-                
-                self.session.add(summary)
-                self.session.flush()
-                
-                stats['summaries_inserted'] += 1
-                
-                # Create punch records
-                for punch in record.punches:
-                    punch_record = ShiftPunch(
-                        shift_summary_id=summary.id,
-                        start_datetime=punch.start,
-                        end_datetime=punch.end,
-                        duration_minutes=punch.duration_minutes
-                    )
-                    self.session.add(punch_record)
-                    stats['punches_inserted'] += 1
-                
-                # Create attendance record
-                actual_start = min([p.start for p in record.punches]) if record.punches else None
-                actual_end = max([p.end for p in record.punches]) if record.punches else None
-                sched_start = min([p.start for p in record.scheduled_punches]) if record.scheduled_punches else None
-                sched_end = max([p.end for p in record.scheduled_punches]) if record.scheduled_punches else None
-                
-                status = "Present"
-                if (record.scheduled_working_hours or Decimal('0')) > Decimal('0') and (not record.actual_working_hours or record.actual_working_hours == Decimal('0')):
-                    status = "Absent"
-                elif sched_start and actual_start and actual_start > (sched_start + timedelta(minutes=7)):
-                    status = "Late"
-
-                attendance = AttendanceRecord(
-                    shift_summary_id=summary.id,
-                    employee_first_name=record.employee_first_name,
-                    employee_last_name=record.employee_last_name,
-                    business_date=record.business_date,
-                    status=status,
-                    actual_start=actual_start,
-                    actual_end=actual_end,
-                    scheduled_start=sched_start,
-                    scheduled_end=sched_end,
-                    total_hours=record.actual_working_hours or Decimal('0'),
-                    variance_hours=(record.actual_working_hours or Decimal('0')) - (record.scheduled_working_hours or Decimal('0'))
+                print(f"⚠️  Duplicate record found for {record.employee_last_name}, "
+                      f"{record.employee_first_name} on {record.business_date}. Skipping.")
+        
+        # Rows in key order, so concurrent ingests of overlapping data wait on
+        # each other's conflicting rows in the same order instead of deadlocking
+        new_records.sort(key=lambda record: (record.store_id or "",) + _record_key(record)[1:])
+        changed.sort(key=lambda item: item[0])
+        
+        # Employees (or stores of an employee) not seen before invalidate the name index
+        new_names = find_new_employees(self.session, {
+            (record.employee_first_name, record.employee_last_name, record.store_id)
+            for record in new_records + [record for _, record in claimed]
+        })
+        if claimed:
+            self._claim_unassigned(claimed)
+        self._write_chunked(new_records, partial(self._insert_chunk, upsert=upsert), stats)
+        self._write_chunked(changed, self._update_chunk, stats)
+        
+        # Weekly/pay-period totals for just the periods these shifts touch;
+        # claimed rows move from the store-less totals to their store's
+        written = new_records + [record for _, record in changed] + [record for _, record in claimed]
+        if written:
+            dates = [record.business_date for record in written]
+            stores = {record.store_id for record in written} | ({None} if claimed else set())
+            recompute_pay_periods(self.session, min(dates), max(dates), stores)
+            record_change(self.session, source, min(dates), max(dates),
+                          store_id=stores.pop() if len(stores) == 1 else None,
+                          summaries_since=started)
+        
+        self.session.commit()
+        if new_names:
+            index_version = bump_version(self.session)
+            self.session.commit()
+            employee_index.add(new_names, index_version)
+        return stats
+    
+    def _write_chunked(self, items: list, writer: Callable[[list], Dict[str, int]], stats: dict):
+        """
+        Run a chunk writer inside savepoints, merging its counts into stats.
+        A failing chunk is retried item by item to isolate the bad record.
+        """
+        for i in range(0, len(items), BULK_CHUNK_SIZE):
+            chunk = items[i:i + BULK_CHUNK_SIZE]
+            try:
+                with self.session.begin_nested():
+                    counts = writer(chunk)
+            except Exception as e:
+                print(f"⚠️  Bulk write of {len(chunk)} records failed, retrying one by one: {e}")
+                for item in chunk:
+                    record = item[1] if isinstance(item, tuple) else item
+                    try:
+                        with self.session.begin_nested():
+                            counts = writer([item])
+                    except Exception as e:
+                        stats['errors'] += 1
+                        print(f"❌ Error writing record for {record.employee_last_name}, "
+                              f"{record.employee_first_name}: {e}")
+                        continue
+                    for key, value in counts.items():
+                        stats[key] += value
+                continue
+            
+            for key, value in counts.items():
+                stats[key] += value
+            print(f"✅ {', '.join(f'{k}: {v}' for k, v in counts.items())}")
+    
+    def _claim_unassigned(self, claimed: List[Tuple[int, ShiftRecord]]):
+        """
+        Set the store on summaries (with their punches and attendance rows)
+        stored without one, which this ingest matched by employee and day.
+        """
+        by_store: Dict[str, List[int]] = {}
+        for summary_id, record in claimed:
+            by_store.setdefault(record.store_id, []).append(summary_id)
+        for store_id, summary_ids in by_store.items():
+            for model, column in (
+                (ShiftSummary, ShiftSummary.id),
+                (ShiftPunch, ShiftPunch.shift_summary_id),
+                (AttendanceRecord, AttendanceRecord.shift_summary_id),
+            ):
+                self.session.execute(
+                    update(model)
+                    .where(column.in_(summary_ids), model.store_id.is_(None))
+                    .values(store_id=store_id)
+                    .execution_options(synchronize_session=False)
                 )
-                self.session.add(attendance)
-                
-                # Commit after each record
-                self.session.commit()
-                
-                print(f"✅ Inserted: {record.employee_last_name}, {record.employee_first_name} "
-                      f"- {record.business_date} ({len(record.punches)} punches)")
+        print(f"🏪 {len(claimed)} record(s) stored before stores were tracked were assigned their store")
+    
+    def _existing_fingerprints(self, records: List[ShiftRecord]) -> Dict[Tuple[Optional[str], str, str, date], Tuple[int, Optional[str]]]:
+        """Map (store, first, last, date) to (id, fingerprint) for rows in the records' date range."""
+        if not records:
+            return {}
+        dates = [r.business_date for r in records]
+        rows = self.session.exec(
+            select(
+                ShiftSummary.store_id,
+                ShiftSummary.employee_first_name,
+                ShiftSummary.employee_last_name,
+                ShiftSummary.business_date,
+                ShiftSummary.id,
+                ShiftSummary.fingerprint
+            ).where(
+                ShiftSummary.business_date >= min(dates),
+                ShiftSummary.business_date <= max(dates)
+            )
+        ).all()
+        return {
+            (store, first, last, day): (summary_id, fingerprint)
+            for store, first, last, day, summary_id, fingerprint in rows
+        }
+    
+    def _natural_key_exists(self) -> bool:
+        """
+        Whether ux_shift_summary_natural_key exists. It is missing on databases
+        whose duplicates kept init_db from creating it, until dedupe-shifts runs.
+        Checked until it is found, then remembered for the process.
+        """
+        global _natural_key_found
+        if _natural_key_found:
+            return True
+        dialect = self.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            query = "SELECT 1 FROM pg_indexes WHERE indexname = :name"
+        elif dialect == "sqlite":
+            query = "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"
+        else:
+            return False
+        _natural_key_found = self.session.execute(text(query), {"name": NATURAL_KEY_INDEX}).first() is not None
+        if not _natural_key_found:
+            print(f"⚠️  {NATURAL_KEY_INDEX} is missing; concurrent ingests may store duplicates "
+                  f"until `python manage.py dedupe-shifts` has run")
+        return _natural_key_found
+    
+    def _summary_insert(self):
+        """
+        INSERT for summaries that skips rows whose natural key is taken
+        (ON CONFLICT DO NOTHING), or a plain INSERT when that key's unique
+        index does not exist, as ON CONFLICT would fail without it.
+        """
+        dialect = self.session.get_bind().dialect.name
+        if not self._natural_key_exists():
+            return insert(ShiftSummary)
+        if dialect == "postgresql":
+            return postgresql.insert(ShiftSummary).on_conflict_do_nothing(index_elements=SUMMARY_CONFLICT_TARGET)
+        return sqlite.insert(ShiftSummary).on_conflict_do_nothing(index_elements=SUMMARY_CONFLICT_TARGET)
+    
+    def _insert_chunk(self, records: List[ShiftRecord], upsert: bool = False) -> Dict[str, int]:
+        """
+        Write summaries, punches and attendance rows for a batch of new records,
+        one bulk INSERT each. Summaries skip rows whose natural key is already
+        taken; those were stored by a concurrent ingest after our existence
+        check and are handled like records that existed all along.
+        """
+        now = datetime.utcnow()
+        summary_rows = [
+            {
+                'store_id': record.store_id,
+                'employee_first_name': record.employee_first_name,
+                'employee_last_name': record.employee_last_name,
+                'business_date': record.business_date,
+                'actual_working_hours': record.actual_working_hours,
+                'scheduled_working_hours': record.scheduled_working_hours,
+                'scheduled_break_hours': record.scheduled_break_hours,
+                'break_hours': record.break_hours,
+                'fingerprint': record.fingerprint(),
+                'scheduled_segments': record.packed_scheduled_punches or None,
+                **self._punch_stats(record),
+                'created_at': now,
+                'updated_at': now,
+            }
+            for record in records
+        ]
+        inserted = {
+            (store, first, last, day): summary_id
+            for summary_id, store, first, last, day in self.session.execute(
+                self._summary_insert()
+                .returning(
+                    ShiftSummary.id,
+                    ShiftSummary.store_id,
+                    ShiftSummary.employee_first_name,
+                    ShiftSummary.employee_last_name,
+                    ShiftSummary.business_date
+                ),
+                summary_rows
+            )
+        }
+        
+        punch_rows = []
+        attendance_rows = []
+        lost = []
+        for record in records:
+            summary_id = inserted.get(_record_key(record))
+            if summary_id is None:
+                lost.append(record)
+                continue
+            punch_rows.extend(
+                {
+                    'shift_summary_id': summary_id,
+                    'store_id': record.store_id,
+                    'start_datetime': punch.start,
+                    'end_datetime': punch.end,
+                    'duration_minutes': punch.duration_minutes,
+                    'created_at': now,
+                }
+                for punch in record.punches
+            )
+            attendance_rows.append(self._build_attendance(record, summary_id).model_dump(exclude={'id'}))
+        if punch_rows:
+            self.session.execute(insert(ShiftPunch), punch_rows)
+        if attendance_rows:
+            self.session.execute(insert(AttendanceRecord), attendance_rows)
+        
+        counts = {
+            'summaries_inserted': len(inserted),
+            'summaries_updated': 0,
+            'summaries_unchanged': 0,
+            'punches_inserted': len(punch_rows),
+        }
+        if lost:
+            self._resolve_conflicts(lost, upsert, counts)
+        return counts
+    
+    def _resolve_conflicts(self, records: List[ShiftRecord], upsert: bool, counts: Dict[str, int]):
+        """
+        Records whose summary a concurrent ingest inserted first: with upsert,
+        rewrite the ones whose fingerprint differs; leave the rest.
+        """
+        existing = self._existing_fingerprints(records)
+        changed = []
+        for record in records:
+            summary_id, fingerprint = existing.get(_record_key(record), (None, None))
+            if upsert and summary_id is not None and fingerprint != record.fingerprint():
+                changed.append((summary_id, record))
+            else:
+                counts['summaries_unchanged'] += 1
+        if changed:
+            for key, value in self._update_chunk(changed).items():
+                counts[key] += value
+        print(f"⚠️  {len(records)} record(s) were stored by a concurrent ingest; "
+              f"{len(changed)} rewritten")
+    
+    def _update_chunk(self, changed: List[Tuple[int, ShiftRecord]]) -> Dict[str, int]:
+        """
+        Rewrite summaries whose fingerprint changed, using bulk statements:
+        one UPDATE batch for summaries, one DELETE plus one INSERT batch for
+        punches and one UPDATE batch for attendance rows.
+        """
+        now = datetime.utcnow()
+        summary_ids = [summary_id for summary_id, _ in changed]
+        
+        self.session.execute(update(ShiftSummary), [
+            {
+                'id': summary_id,
+                'actual_working_hours': record.actual_working_hours,
+                'scheduled_working_hours': record.scheduled_working_hours,
+                'scheduled_break_hours': record.scheduled_break_hours,
+                'break_hours': record.break_hours,
+                'fingerprint': record.fingerprint(),
+                'scheduled_segments': record.packed_scheduled_punches or None,
+                **self._punch_stats(record),
+                'updated_at': now,
+            }
+            for summary_id, record in changed
+        ])
+        
+        self.session.execute(delete(ShiftPunch).where(ShiftPunch.shift_summary_id.in_(summary_ids)))
+        punch_rows = [
+            {
+                'shift_summary_id': summary_id,
+                'store_id': record.store_id,
+                'start_datetime': punch.start,
+                'end_datetime': punch.end,
+                'duration_minutes': punch.duration_minutes,
+                'created_at': now,
+            }
+            for summary_id, record in changed
+            for punch in record.punches
+        ]
+        if punch_rows:
+            self.session.execute(insert(ShiftPunch), punch_rows)
+        
+        attendance = {
+            summary_id: (attendance_id, status, source)
+            for summary_id, attendance_id, status, source in self.session.exec(
+                select(
+                    AttendanceRecord.shift_summary_id,
+                    AttendanceRecord.id,
+                    AttendanceRecord.status,
+                    AttendanceRecord.status_source
+                ).where(AttendanceRecord.shift_summary_id.in_(summary_ids))
+            ).all()
+        }
+        attendance_rows = []
+        for summary_id, record in changed:
+            derived = self._build_attendance(record, summary_id)
+            if summary_id not in attendance:
+                self.session.add(derived)
+                continue
+            attendance_id, status, source = attendance[summary_id]
+            attendance_rows.append({
+                'id': attendance_id,
+                # Statuses set by hand (or of unknown source) survive corrected re-exports
+                'status': status if keeps_status(source) else derived.status,
+                'actual_start': derived.actual_start,
+                'actual_end': derived.actual_end,
+                'scheduled_start': derived.scheduled_start,
+                'scheduled_end': derived.scheduled_end,
+                'total_hours': derived.total_hours,
+                'variance_hours': derived.variance_hours,
+                'updated_at': now,
+            })
+        if attendance_rows:
+            self.session.execute(update(AttendanceRecord), attendance_rows)
+        
+        self.session.flush()
+        return {'summaries_updated': len(changed), 'punches_inserted': len(punch_rows)}
+    
+    @staticmethod
+    def _punch_stats(record: ShiftRecord) -> Dict[str, object]:
+        """First/last punch times and punch count, stored on the summary."""
+        punches = record.punches
+        return {
+            'first_punch_at': min(p.start for p in punches) if punches else None,
+            'last_punch_at': max(p.end for p in punches) if punches else None,
+            'punch_count': len(punches),
+        }
+    
+    def backfill_punch_stats(self, only_missing: bool = True, batch_size: int = 10000) -> int:
+        """
+        Fill first_punch_at / last_punch_at / punch_count from shift_punches
+        for summaries stored before those columns existed.
+        Runs as set-based UPDATEs over id ranges, committing per batch.
+        """
+        punches = ShiftPunch.shift_summary_id == ShiftSummary.id
+        values = {
+            'first_punch_at': select(func.min(ShiftPunch.start_datetime)).where(punches).scalar_subquery(),
+            'last_punch_at': select(func.max(ShiftPunch.end_datetime)).where(punches).scalar_subquery(),
+            'punch_count': select(func.count(ShiftPunch.id)).where(punches).scalar_subquery(),
+        }
+        max_id = self.session.exec(select(func.max(ShiftSummary.id))).one() or 0
+        
+        updated = 0
+        for low in range(0, max_id + 1, batch_size):
+            statement = update(ShiftSummary).where(
+                ShiftSummary.id >= low,
+                ShiftSummary.id < low + batch_size
+            )
+            if only_missing:
+                statement = statement.where(ShiftSummary.punch_count.is_(None))
+            result = self.session.execute(statement.values(**values).execution_options(synchronize_session=False))
+            self.session.commit()
+            updated += result.rowcount
+        return updated
+    
+    def refresh_fingerprints(self, batch_size: int = 10000) -> int:
+        """
+        Recompute stored fingerprints from the stored hours and punches, so the
+        first re-ingest after ShiftRecord.fingerprint changes only rewrites
+        summaries whose data really differs. Commits per batch; returns the
+        number of summaries whose fingerprint changed.
+        """
+        max_id = self.session.exec(select(func.max(ShiftSummary.id))).one() or 0
+        
+        updated = 0
+        for low in range(0, max_id + 1, batch_size):
+            summaries = self.session.exec(
+                select(
+                    ShiftSummary.id,
+                    ShiftSummary.employee_first_name,
+                    ShiftSummary.employee_last_name,
+                    ShiftSummary.business_date,
+                    ShiftSummary.actual_working_hours,
+                    ShiftSummary.scheduled_working_hours,
+                    ShiftSummary.scheduled_break_hours,
+                    ShiftSummary.break_hours,
+                    ShiftSummary.scheduled_segments,
+                    ShiftSummary.store_id,
+                    ShiftSummary.fingerprint
+                ).where(ShiftSummary.id >= low, ShiftSummary.id < low + batch_size)
+            ).all()
+            if not summaries:
+                continue
             
-            except Exception as e:
-                self.session.rollback()
-                stats['errors'] += 1
-                print(f"❌ Error inserting record for {record.employee_last_name}, "
-                      f"{record.employee_first_name}: {e}")
+            # Punches in insertion order, as minute offsets from each business date
+            days = {row[0]: row[3] for row in summaries}
+            punches: Dict[int, List[PunchTime]] = {}
+            for summary_id, start, end in self.session.exec(
+                select(ShiftPunch.shift_summary_id, ShiftPunch.start_datetime, ShiftPunch.end_datetime)
+                .where(ShiftPunch.shift_summary_id >= low, ShiftPunch.shift_summary_id < low + batch_size)
+                .order_by(ShiftPunch.shift_summary_id, ShiftPunch.id)
+            ):
+                midnight = datetime.combine(days[summary_id], datetime.min.time())
+                punches.setdefault(summary_id, []).append(PunchTime(
+                    days[summary_id],
+                    int((start - midnight).total_seconds() // 60),
+                    int((end - midnight).total_seconds() // 60)
+                ))
+            
+            changed = []
+            for summary_id, first, last, day, actual, scheduled, scheduled_break, break_hours, segments, store_id, stored in summaries:
+                fingerprint = ShiftRecord(
+                    employee_first_name=first,
+                    employee_last_name=last,
+                    business_date=day,
+                    actual_working_hours=actual,
+                    scheduled_working_hours=scheduled,
+                    scheduled_break_hours=scheduled_break,
+                    break_hours=break_hours,
+                    packed_punches=pack_punches(punches.get(summary_id, ())),
+                    packed_scheduled_punches=segments or b'',
+                    store_id=store_id
+                ).fingerprint()
+                if fingerprint != stored:
+                    changed.append({'id': summary_id, 'fingerprint': fingerprint})
+            if changed:
+                self.session.execute(update(ShiftSummary), changed)
+            self.session.commit()
+            updated += len(changed)
+        return updated
+    
+    def _delete_summaries(self, summary_ids: List[int]) -> Dict[str, int]:
+        """Delete summaries with their punches and attendance rows. Returns rows deleted per table."""
+        counts = {model.__tablename__: 0 for model in (ShiftPunch, AttendanceRecord, ShiftSummary)}
+        for i in range(0, len(summary_ids), BULK_CHUNK_SIZE):
+            chunk = summary_ids[i:i + BULK_CHUNK_SIZE]
+            for model, column in (
+                (ShiftPunch, ShiftPunch.shift_summary_id),
+                (AttendanceRecord, AttendanceRecord.shift_summary_id),
+                (ShiftSummary, ShiftSummary.id),
+            ):
+                result = self.session.execute(delete(model).where(column.in_(chunk)))
+                counts[model.__tablename__] += result.rowcount
+        return counts
+    
+    def remove_duplicate_summaries(self) -> Dict[str, int]:
+        """
+        Keep the first (lowest id) summary of each employee, store and day and
+        delete the rest with their punches and attendance rows, so the unique
+        natural key can be created on a database that predates it. Rebuilds
+        the pay-period totals of the affected dates. Returns rows deleted per table.
+        """
+        keep = select(func.min(ShiftSummary.id)).group_by(
+            func.coalesce(ShiftSummary.store_id, ''),
+            ShiftSummary.employee_last_name,
+            ShiftSummary.employee_first_name,
+            ShiftSummary.business_date
+        )
+        duplicates = self.session.exec(
+            select(ShiftSummary.id, ShiftSummary.business_date).where(ShiftSummary.id.not_in(keep))
+        ).all()
+        counts = self._delete_summaries([summary_id for summary_id, _ in duplicates])
+        if not duplicates:
+            return counts
         
-        return stats
+        dates = [day for _, day in duplicates]
+        recompute_pay_periods(self.session, min(dates), max(dates))
+        self.session.commit()
+        return counts
+    
+    def assign_store(self, store_id: str, start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, int]:
+        """
+        Set store_id on rows stored before stores were tracked (store_id IS NULL),
+        optionally limited to a business date range. Returns rows updated per table.
+        
+        A store-less summary whose employee and day were ingested again with
+        this store (before ingest learned to claim such rows) is the same
+        shift twice; it is merged into the stored row by deleting it.
+        """
+        tagged = aliased(ShiftSummary)
+        collisions = select(ShiftSummary.id).where(
+            ShiftSummary.store_id.is_(None),
+            select(tagged.id).where(
+                tagged.store_id == store_id,
+                tagged.employee_last_name == ShiftSummary.employee_last_name,
+                tagged.employee_first_name == ShiftSummary.employee_first_name,
+                tagged.business_date == ShiftSummary.business_date
+            ).exists()
+        )
+        if start:
+            collisions = collisions.where(ShiftSummary.business_date >= start)
+        if end:
+            collisions = collisions.where(ShiftSummary.business_date <= end)
+        merged = self._delete_summaries(list(self.session.exec(collisions).all()))
+        
+        counts = {}
+        for model, date_column in (
+            (ShiftSummary, ShiftSummary.business_date),
+            (AttendanceRecord, AttendanceRecord.business_date),
+        ):
+            statement = update(model).where(model.store_id.is_(None))
+            if start:
+                statement = statement.where(date_column >= start)
+            if end:
+                statement = statement.where(date_column <= end)
+            result = self.session.execute(statement.values(store_id=store_id).execution_options(synchronize_session=False))
+            counts[model.__tablename__] = result.rowcount
+        
+        # Punches follow their summaries
+        result = self.session.execute(
+            update(ShiftPunch)
+            .where(
+                ShiftPunch.store_id.is_(None),
+                ShiftPunch.shift_summary_id.in_(select(ShiftSummary.id).where(ShiftSummary.store_id == store_id))
+            )
+            .values(store_id=store_id)
+            .execution_options(synchronize_session=False)
+        )
+        counts[ShiftPunch.__tablename__] = result.rowcount
+        counts['duplicates_merged'] = merged[ShiftSummary.__tablename__]
+        
+        # Pay-period totals are kept per store; move the range over
+        first_day, last_day = self.session.exec(
+            select(func.min(ShiftSummary.business_date), func.max(ShiftSummary.business_date))
+            .where(ShiftSummary.store_id == store_id)
+        ).one()
+        if first_day is not None:
+            recompute_pay_periods(self.session, start or first_day, end or last_day, {None, store_id})
+        # Employees' stores changed; workers reload their name index
+        bump_version(self.session)
+        self.session.commit()
+        return counts
+    
+    def _build_attendance(self, record: ShiftRecord, shift_summary_id: int) -> AttendanceRecord:
+        """Derive the attendance row for a parsed shift record."""
+        actual_start = min([p.start for p in record.punches]) if record.punches else None
+        actual_end = max([p.end for p in record.punches]) if record.punches else None
+        sched_start = min([p.start for p in record.scheduled_punches]) if record.scheduled_punches else None
+        sched_end = max([p.end for p in record.scheduled_punches]) if record.scheduled_punches else None
+        
+        status = derive_status(
+            record.scheduled_working_hours, record.actual_working_hours,
+            sched_start, sched_end, actual_start, actual_end
+        )
+        
+        return AttendanceRecord(
+            shift_summary_id=shift_summary_id,
+            store_id=record.store_id,
+            employee_first_name=record.employee_first_name,
+            employee_last_name=record.employee_last_name,
+            business_date=record.business_date,
+            status=status,
+            actual_start=actual_start,
+            actual_end=actual_end,
+            scheduled_start=sched_start,
+            scheduled_end=sched_end,
+            total_hours=record.actual_working_hours or Decimal('0'),
+            variance_hours=(record.actual_working_hours or Decimal('0')) - (record.scheduled_working_hours or Decimal('0'))
+        )
+    
+    # -------------------------------------------------------------------------
+    # Ingest Ledger
+    # -------------------------------------------------------------------------
+    def get_ingested_hashes(self, content_hashes: List[str]) -> Set[str]:
+        """Return the subset of file hashes that were already ingested successfully."""
+        if not content_hashes:
+            return set()
+        rows = self.session.exec(
+            select(IngestedFile.content_hash).where(
+                IngestedFile.content_hash.in_(content_hashes),
+                IngestedFile.status == "done"
+            )
+        ).all()
+        return set(rows)
+    
+    def record_ingested_file(self, content_hash: str, filename: str, stats: dict = None,
+                             status: str = None, error: str = None) -> IngestedFile:
+        """
+        Create or update the ledger entry for a source file. Without an explicit
+        status, a file with record errors is "partial" so the next run retries it.
+        Inserted and updated summary counts add up over reruns of the file.
+        """
+        stats = stats or {}
+        if status is None:
+            status = "partial" if stats.get('errors') else "done"
+            if status == "partial" and error is None:
+                error = f"{stats['errors']} record(s) could not be stored"
+        entry = self.session.exec(
+            select(IngestedFile).where(IngestedFile.content_hash == content_hash)
+        ).first()
+        if not entry:
+            entry = IngestedFile(content_hash=content_hash, filename=filename)
+        
+        entry.filename = filename
+        entry.status = status
+        if 'total_records' in stats:
+            entry.records_parsed = stats['total_records']
+        # Columns added to an existing ledger are NULL on its older rows
+        entry.summaries_inserted = (entry.summaries_inserted or 0) + stats.get('summaries_inserted', 0)
+        entry.summaries_updated = (entry.summaries_updated or 0) + stats.get('summaries_updated', 0)
+        entry.error = error
+        entry.updated_at = datetime.utcnow()
+        
+        self.session.add(entry)
+        self.session.commit()
+        return entry
     
     def get_shift_summary(self, employee_last_name: str = None, 
                          start_date: datetime = None, 
@@ -0,0 +1,89 @@
+"""
+Shared test setup.
+
+db.py reads DATABASE_URL when it is imported, so the tests point it at a
+throwaway SQLite file here, before any test module imports the app. Set
+TEST_DATABASE_URL to run against another database instead (the tests drop
+and recreate every table in it); DATABASE_URL itself is never used, so a
+.env pointing at real data is safe. Query budgets are enforced
+(QUERY_BUDGET_STRICT) in every test that goes through the app.
+"""
+
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Optional, Sequence, Tuple
+
+import pytest
+
+_TEST_DIR = tempfile.mkdtemp(prefix="shifttrack-tests-")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{_TEST_DIR}/test.db"
+os.environ["ARCHIVE_DIR"] = os.path.join(_TEST_DIR, "archive")
+os.environ["PROFILE_DIR"] = os.path.join(_TEST_DIR, "profiles")
+os.environ.setdefault("SQL_ECHO", "false")
+# Routes over their @query_budget fail the request instead of logging
+os.environ["QUERY_BUDGET_STRICT"] = "1"
+
+
+@pytest.fixture
+def db():
+    """A freshly created, empty schema (and no archive); returns the engine."""
+    from sqlmodel import SQLModel
+    import models  # noqa: F401  (registers the tables drop_all has to drop)
+    from db import engine, init_db
+
+    shutil.rmtree(os.environ["ARCHIVE_DIR"], ignore_errors=True)
+    SQLModel.metadata.drop_all(engine)
+    init_db()
+    return engine
+
+
+@pytest.fixture
+def client(db):
+    """TestClient over the app, started against the fresh schema."""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def make_record(store_id: Optional[str], first: str, last: str, day: date,
+                punches: Sequence[Tuple[int, int]] = ((9 * 60, 17 * 60),),
+                scheduled: Sequence[Tuple[int, int]] = ((9 * 60, 17 * 60),)):
+    """A parsed ShiftRecord; punches are (start, end) minutes from midnight of day."""
+    from parsers.shift_parser import PunchTime, ShiftRecord, pack_punches
+
+    def hours(intervals) -> Decimal:
+        return Decimal(sum(end - start for start, end in intervals)) / 60
+
+    return ShiftRecord(
+        employee_first_name=first,
+        employee_last_name=last,
+        business_date=day,
+        actual_working_hours=hours(punches),
+        scheduled_working_hours=hours(scheduled),
+        scheduled_break_hours=Decimal(0),
+        break_hours=Decimal(0),
+        packed_punches=pack_punches([PunchTime(day, start, end) for start, end in punches]),
+        packed_scheduled_punches=pack_punches([PunchTime(day, start, end) for start, end in scheduled]),
+        store_id=store_id,
+    )
+
+
+def ingest(records, upsert: bool = False) -> dict:
+    """Store records through the shared ingest path; returns its stats."""
+    from services.shift_service import ShiftDataService
+
+    with ShiftDataService() as service:
+        return service.insert_shift_records(records, upsert=upsert)
+
+
+def days(start: date, count: int):
+    return [start + timedelta(days=i) for i in range(count)]
+
+
+def at(day: date, minute: int) -> str:
+    return (datetime.combine(day, datetime.min.time()) + timedelta(minutes=minute)).isoformat()
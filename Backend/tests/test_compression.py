@@ -0,0 +1,45 @@
+"""
+Compressible responses always say they vary by Accept-Encoding, so a shared
+cache never hands a compressed body to a client that cannot decode it.
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from utils.compression import COMPRESSION_MIN_BYTES, CompressionMiddleware
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/large")
+    def large():
+        return {"data": "x" * COMPRESSION_MIN_BYTES}
+
+    @app.get("/binary")
+    def binary():
+        return PlainTextResponse("x" * COMPRESSION_MIN_BYTES, media_type="application/octet-stream")
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("accept", ["gzip", "identity", "gzip;q=0"])
+@pytest.mark.parametrize("path", ["/small", "/large"])
+def test_compressible_responses_vary_on_accept_encoding(client, path, accept):
+    response = client.get(path, headers={"Accept-Encoding": accept})
+    assert response.headers["vary"] == "Accept-Encoding"
+    compressed = accept == "gzip" and path == "/large"
+    assert response.headers.get("content-encoding") == ("gzip" if compressed else None)
+
+
+def test_other_types_do_not_vary(client):
+    response = client.get("/binary", headers={"Accept-Encoding": "identity"})
+    assert "vary" not in response.headers
@@ -0,0 +1,66 @@
+"""
+Ingests outside the API (daemon, CLI) reach /events subscribers through the
+change_events table and each worker's ChangeRelay.
+"""
+
+import asyncio
+from datetime import date
+
+from conftest import days, ingest, make_record
+
+
+def relayed(engine, relay, start=None, end=None):
+    """Events a subscriber to start..end receives from one relay poll."""
+    from services.event_broker import broker
+
+    async def collect():
+        subscriber = broker.subscribe(start, end)
+        try:
+            relay.poll(engine)
+            # Deliveries are scheduled on the subscriber's loop
+            await asyncio.sleep(0)
+            events = []
+            while not subscriber.queue.empty():
+                events.append(subscriber.queue.get_nowait())
+            return events
+        finally:
+            broker.unsubscribe(subscriber)
+
+    return asyncio.run(collect())
+
+
+def test_ingest_outside_the_api_is_relayed(db):
+    from routes.alerts import calculate_alerts
+    from services.event_broker import ChangeRelay
+
+    relay = ChangeRelay(alerts_for=calculate_alerts)
+    relay.start(db)
+    relay.stop()
+
+    # 10 hours straight against 8 scheduled: overtime and no break
+    ingest([make_record("1234", "John", "Doe", day, punches=[(480, 1080)]) for day in days(date(2025, 3, 3), 2)])
+    events = relayed(db, relay)
+    assert [event["type"] for event in events] == ["data.changed", "alerts.new"]
+    changed, alerts = events
+    assert (changed["start_date"], changed["end_date"]) == ("2025-03-03", "2025-03-04")
+    assert changed["data"]["source"] == "ingest"
+    assert changed["data"]["store_id"] == "1234"
+    assert {alert["type"] for alert in alerts["data"]["alerts"]} == {"Excessive Overtime", "No Break Taken"}
+
+    # Each change is relayed once; unchanged re-ingests announce nothing
+    ingest([make_record("1234", "John", "Doe", date(2025, 3, 3), punches=[(480, 1080)])])
+    assert relayed(db, relay) == []
+
+    # Subscribers only hear about their date range
+    ingest([make_record("1234", "John", "Doe", date(2025, 4, 1))])
+    assert relayed(db, relay, date(2025, 3, 1), date(2025, 3, 31)) == []
+
+
+def test_relay_skips_changes_before_it_started(db):
+    from services.event_broker import ChangeRelay
+
+    ingest([make_record("1234", "John", "Doe", date(2025, 3, 3))])
+    relay = ChangeRelay()
+    relay.start(db)
+    relay.stop()
+    assert relayed(db, relay) == []
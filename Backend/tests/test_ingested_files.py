@@ -0,0 +1,23 @@
+"""
+The ingested_files ledger keeps what a file stored across forced reruns.
+"""
+
+from datetime import date
+
+from conftest import days, make_record
+
+
+def test_forced_upsert_rerun_keeps_counts(db):
+    from services.shift_service import ShiftDataService
+
+    records = [make_record("1234", "John", "Doe", day) for day in days(date(2025, 3, 3), 2)]
+    corrected = [records[0], make_record("1234", "John", "Doe", date(2025, 3, 4), punches=[(540, 1080)])]
+    with ShiftDataService() as service:
+        service.record_ingested_file("abc", "report.pdf", service.insert_shift_records(records))
+        # A --force --upsert run of a corrected export of the same file
+        entry = service.record_ingested_file("abc", "report.pdf", service.insert_shift_records(corrected, upsert=True))
+        assert (entry.records_parsed, entry.summaries_inserted, entry.summaries_updated) == (2, 2, 1)
+
+        # A failure without stats keeps them too
+        entry = service.record_ingested_file("abc", "report.pdf", status="failed", error="boom")
+        assert (entry.records_parsed, entry.summaries_inserted, entry.summaries_updated) == (2, 2, 1)
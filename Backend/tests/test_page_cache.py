@@ -0,0 +1,53 @@
+"""
+Page cache keys must tell apart pages that only share a content stream,
+e.g. pages drawn through form XObjects ("q /fzFrm0 Do Q").
+"""
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from parsers.shift_parser import PDFParser
+from utils.page_cache import PageCache, page_digests
+from utils.pdf_utils import get_extractor
+
+DOE = "Doe, John 1/2/2025"
+ROE = "Roe, Jane 1/2/2025"
+
+
+def xobject_pdf(*texts: str) -> bytes:
+    """A PDF whose pages each draw one line of text through a form XObject."""
+    source = fitz.open()
+    for text in texts:
+        source.new_page().insert_text((72, 72), text)
+    doc = fitz.open()
+    for i in range(len(texts)):
+        doc.new_page().show_pdf_page(fitz.Rect(0, 0, 595, 842), source, i)
+    return doc.tobytes()
+
+
+def test_xobject_pages_hash_apart():
+    pdf = xobject_pdf(DOE, ROE)
+    contents = [page.read_contents() for page in fitz.open(stream=pdf, filetype="pdf")]
+    assert contents[0] == contents[1]
+
+    first, second = page_digests(pdf)
+    assert first != second
+
+
+def test_same_page_in_another_file_hashes_the_same():
+    assert page_digests(xobject_pdf(DOE, ROE))[1] == page_digests(xobject_pdf(ROE))[0]
+
+
+def test_warm_cache_serves_each_page_its_own_text(tmp_path):
+    pdf = xobject_pdf(DOE, ROE)
+    extractor = get_extractor("pymupdf")
+    cache = PageCache(cache_dir=str(tmp_path))
+
+    cold = PDFParser(pdf, page_cache=cache).extract_pages(extractor)
+    warm_parser = PDFParser(pdf, page_cache=cache)
+    warm = warm_parser.extract_pages(extractor)
+
+    assert warm_parser.cache_stats['hits'] == 2
+    assert warm == cold
+    assert DOE in " ".join(warm[0]) and ROE in " ".join(warm[1])
@@ -0,0 +1,127 @@
+"""
+Monthly partitioning (PostgreSQL only): range queries on the partition key
+must only scan the matching <table>_yYYYYmMM partitions, and archived months
+can be detached. Skipped unless TEST_DATABASE_URL points at PostgreSQL.
+"""
+
+import json
+import os
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel
+
+from conftest import days, ingest, make_record
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("TEST_DATABASE_URL", "").startswith("postgresql"),
+    reason="partitioning needs PostgreSQL (set TEST_DATABASE_URL)",
+)
+
+MONTHS = [date(2025, 1, 1), date(2025, 2, 1), date(2025, 3, 1)]
+
+
+def _drop_detached(engine):
+    from services.partition_service import PARTITIONED_TABLES, partition_name
+
+    with engine.begin() as conn:
+        for table in PARTITIONED_TABLES:
+            for month in MONTHS:
+                conn.execute(text(f"DROP TABLE IF EXISTS {partition_name(table, month)}"))
+
+
+@pytest.fixture
+def partitioned(monkeypatch):
+    """A fresh schema created with DB_PARTITIONING=monthly."""
+    import shutil
+    import models  # noqa: F401
+    from db import engine, init_db
+    from services import partition_service
+
+    monkeypatch.setattr(partition_service, "PARTITIONING_ENABLED", True)
+    partition_service._known_partitions.clear()
+    shutil.rmtree(os.environ["ARCHIVE_DIR"], ignore_errors=True)
+    # Detached partitions still use their parent's id sequence; drop them first
+    _drop_detached(engine)
+    SQLModel.metadata.drop_all(engine)
+    init_db()
+    yield engine
+    # Leave no partitioned tables behind for the other tests
+    _drop_detached(engine)
+    SQLModel.metadata.drop_all(engine)
+    partition_service._known_partitions.clear()
+
+
+def scanned(engine, sql: str, **params) -> set:
+    from services.partition_service import _scanned_relations
+
+    with engine.connect() as conn:
+        plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return _scanned_relations(plan[0]["Plan"])
+
+
+def attached(engine, table: str) -> set:
+    from services.partition_service import list_partitions
+
+    with engine.connect() as conn:
+        return {name for name, _ in list_partitions(conn, table)}
+
+
+def test_range_queries_prune_to_matching_months(partitioned):
+    from services.partition_service import PARTITIONED_TABLES, check_pruning, ensure_month_partitions
+
+    ensure_month_partitions(partitioned, MONTHS[0], MONTHS[-1])
+    for table in PARTITIONED_TABLES:
+        assert {f"{table}_y2025m01", f"{table}_y2025m02", f"{table}_y2025m03"} <= attached(partitioned, table)
+
+    assert scanned(
+        partitioned,
+        "SELECT * FROM shift_summary WHERE business_date >= :start AND business_date < :end",
+        start=date(2025, 2, 1), end=date(2025, 3, 1),
+    ) == {"shift_summary_y2025m02"}
+    assert scanned(
+        partitioned,
+        "SELECT * FROM shift_summary WHERE business_date BETWEEN :start AND :end",
+        start=date(2025, 1, 20), end=date(2025, 2, 10),
+    ) == {"shift_summary_y2025m01", "shift_summary_y2025m02"}
+
+    results = check_pruning(partitioned, MONTHS[1], MONTHS[2])
+    assert all(result["pruned"] for result in results.values()), results
+
+
+def test_ingest_creates_partitions_on_demand(partitioned):
+    stats = ingest([make_record("1234", "John", "Doe", day) for day in days(date(2025, 2, 27), 4)])
+    assert stats["summaries_inserted"] == 4
+    assert {"shift_summary_y2025m02", "shift_summary_y2025m03"} <= attached(partitioned, "shift_summary")
+    with partitioned.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM shift_summary_y2025m03")).scalar() == 2
+
+
+def test_archive_then_detach_month(partitioned):
+    from services.archive_service import PYARROW_AVAILABLE, archive_before, archived_summaries
+    from services.partition_service import PARTITIONED_TABLES, detach_month
+
+    if not PYARROW_AVAILABLE:
+        pytest.skip("pyarrow not installed")
+    ingest([make_record("1234", "John", "Doe", day) for day in days(date(2025, 1, 30), 4)])
+
+    with Session(partitioned) as session:
+        results = archive_before(session, date(2025, 2, 1))
+    assert results["2025-01"]["shift_summary"] == 2
+    assert [row["business_date"] for row in archived_summaries(date(2025, 1, 1), date(2025, 1, 31))] == [
+        date(2025, 1, 30), date(2025, 1, 31),
+    ]
+
+    detached = detach_month(partitioned, date(2025, 1, 1))
+    assert sorted(detached) == sorted(f"{table}_y2025m01" for table in PARTITIONED_TABLES)
+    assert "shift_summary_y2025m01" not in attached(partitioned, "shift_summary")
+    # February is untouched and still pruned to its own partition
+    assert scanned(
+        partitioned,
+        "SELECT * FROM shift_summary WHERE business_date >= :start AND business_date < :end",
+        start=date(2025, 2, 1), end=date(2025, 3, 1),
+    ) == {"shift_summary_y2025m02"}
+    with partitioned.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM shift_summary")).scalar() == 2
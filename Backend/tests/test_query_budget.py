@@ -0,0 +1,93 @@
+"""
+Every budgeted route stays within its @query_budget under
+QUERY_BUDGET_STRICT, and a route over budget fails the request.
+"""
+
+from datetime import date
+
+import pytest
+from sqlmodel import Session, select
+
+from conftest import at, days, ingest, make_record
+
+START = date(2025, 3, 3)
+RANGE = {"start_date": "2025-03-03", "end_date": "2025-03-09"}
+
+
+@pytest.fixture
+def stocked(client):
+    """A week of shifts for a few employees at two stores, with one overtime day."""
+    ingest([
+        make_record(store, first, last, day, punches=[(8 * 60, 18 * 60)] if day == START else [(9 * 60, 17 * 60)])
+        for store in ("1234", "5678")
+        for first, last in (("John", "Doe"), ("Jane", "Roe"), ("Ann", "Poe"))
+        for day in days(START, 7)
+    ])
+    return client
+
+
+def budgeted_routes():
+    from main import app
+
+    return {
+        (method, route.path): route.endpoint.query_budget
+        for route in app.routes
+        if hasattr(getattr(route, "endpoint", None), "query_budget")
+        for method in route.methods
+    }
+
+
+def test_budgeted_routes_stay_within_budget(stocked):
+    from models import ShiftSummary
+    from db import engine
+
+    with Session(engine) as session:
+        shift_id = session.exec(select(ShiftSummary.id)).first()
+    requests = {
+        ("GET", "/alerts/"): RANGE,
+        ("GET", "/attendance/"): RANGE,
+        ("GET", "/attendance/summary"): RANGE,
+        ("GET", "/dashboard"): RANGE,
+        ("GET", "/employees/"): {},
+        ("GET", "/employees/search"): {"q": "doe"},
+        ("GET", "/employees/stats"): RANGE,
+        ("GET", "/employees/overtime"): RANGE,
+        ("GET", "/employees/{last_name}/trend"): RANGE,
+        ("GET", "/shifts/"): RANGE,
+        ("GET", "/shifts/analytics"): RANGE,
+        ("GET", "/shifts/coverage"): {**RANGE, "include_scheduled": "true"},
+        ("GET", "/shifts/on-shift"): [("at", at(START, minute)) for minute in (540, 720, 900, 1020)],
+        ("GET", "/shifts/overlaps"): RANGE,
+        ("GET", "/shifts/variance-intervals"): RANGE,
+        ("GET", "/shifts/{shift_id}"): {},
+        ("GET", "/shifts/{shift_id}/punches"): {},
+        ("GET", "/shifts/stats/summary"): RANGE,
+        ("GET", "/shifts/stats/daily"): RANGE,
+        ("GET", "/stores/"): {},
+        ("POST", "/employees/trends"): None,
+    }
+    budgets = budgeted_routes()
+    assert set(budgets) == set(requests), "add new budgeted routes to this test"
+
+    for (method, path), params in requests.items():
+        url = path.format(last_name="Doe", shift_id=shift_id)
+        if method == "POST":
+            response = stocked.post(url, json={**RANGE, "employees": [{"last_name": "Doe"}]})
+        else:
+            response = stocked.get(url, params=params)
+        assert response.status_code == 200, (path, response.text)
+        # Server-Timing: db;dur=..;desc="N queries", app;dur=..
+        queries = int(response.headers["server-timing"].split('desc="')[1].split(" ")[0])
+        assert queries <= budgets[(method, path)], (path, queries)
+
+
+def test_route_over_budget_fails(stocked, monkeypatch):
+    from main import app
+    from utils.query_stats import QueryBudgetExceeded
+
+    # Alerts reads summaries and pay-period totals: two statements. The
+    # budget is read from the endpoint the route wraps, not routes.alerts'.
+    route = next(route for route in app.routes if getattr(route, "path", None) == "/alerts/")
+    monkeypatch.setattr(route.endpoint, "query_budget", 1)
+    with pytest.raises(QueryBudgetExceeded, match="budget 1"):
+        stocked.get("/alerts/", params=RANGE)
@@ -0,0 +1,117 @@
+"""
+The store is part of an employee's identity: the same name at two stores is
+two people, whose shifts, overlaps and totals never merge.
+"""
+
+from datetime import date
+
+from sqlmodel import Session, func, select
+
+from conftest import at, days, ingest, make_record
+
+DAY = date(2025, 3, 3)
+NAMES = [("John", "Doe"), ("Jane", "Roe")]
+
+
+def ingest_both_stores():
+    """Two days of identical shifts for the same names at stores 1234 and 5678."""
+    records = [
+        make_record(store, first, last, day)
+        for store in ("1234", "5678")
+        for first, last in NAMES
+        for day in days(DAY, 2)
+    ]
+    return ingest(records)
+
+
+def summary_stores(engine):
+    from models import ShiftSummary
+
+    with Session(engine) as session:
+        return dict(session.exec(
+            select(ShiftSummary.store_id, func.count(ShiftSummary.id)).group_by(ShiftSummary.store_id)
+        ).all())
+
+
+def test_detect_store_id():
+    from parsers.shift_parser import PDFParser
+
+    parser = PDFParser(b"", page_cache=None)
+    assert parser.detect_store_id(["Scheduled vs Actual Hours", "JS Foods - BURGER KING #1234"]) == "1234"
+    assert parser.detect_store_id(["Scheduled vs Actual Hours", "Doe, John"]) is None
+
+
+def test_same_names_at_two_stores_are_stored_apart(db):
+    stats = ingest_both_stores()
+    assert stats["summaries_inserted"] == 8
+    assert summary_stores(db) == {"1234": 4, "5678": 4}
+
+    # Re-ingesting one store's report is recognised as the same shifts
+    again = ingest([make_record("1234", first, last, day) for first, last in NAMES for day in days(DAY, 2)])
+    assert again["summaries_inserted"] == 0
+    assert summary_stores(db) == {"1234": 4, "5678": 4}
+
+
+def test_overlaps_stay_within_a_store(client):
+    ingest_both_stores()
+    assert client.get("/shifts/overlaps", params={"start_date": "2025-03-03", "end_date": "2025-03-04"}).json() == []
+
+    # A real double punch at one store is still reported, with its store
+    ingest([make_record("5678", "John", "Doe", date(2025, 3, 5), punches=[(540, 720), (600, 780)])])
+    overlaps = client.get("/shifts/overlaps", params={"start_date": "2025-03-05"}).json()
+    assert len(overlaps) == 1
+    assert overlaps[0]["store_id"] == "5678"
+    assert client.get("/shifts/overlaps", params={"start_date": "2025-03-05", "store_id": "1234"}).json() == []
+
+
+def test_employee_stats_per_store(client):
+    ingest_both_stores()
+    rows = client.get("/employees/stats", params={"start_date": "2025-03-03", "end_date": "2025-03-04"}).json()
+    assert sorted((row["store_id"], row["last_name"], row["shift_count"]) for row in rows) == [
+        ("1234", "Doe", 2), ("1234", "Roe", 2), ("5678", "Doe", 2), ("5678", "Roe", 2),
+    ]
+
+    only = client.get("/employees/stats", params={"store_id": "5678"}).json()
+    assert {row["store_id"] for row in only} == {"5678"}
+    assert len(only) == 2
+
+
+def test_coverage_store_filter(client):
+    ingest_both_stores()
+    params = {"date": "2025-03-03", "bucket": "1h"}
+    everyone = client.get("/shifts/coverage", params=params).json()
+    one_store = client.get("/shifts/coverage", params={**params, "store_id": "1234"}).json()
+    assert everyone["punch_count"] == 4
+    assert one_store["punch_count"] == 2
+    assert max(bucket["headcount"] for bucket in one_store["buckets"]) == 2
+
+
+def test_on_shift_lists_both_stores(client):
+    ingest_both_stores()
+    result = client.get("/shifts/on-shift", params={"at": at(DAY, 10 * 60)}).json()
+    assert result[0]["count"] == 4
+    assert {punch["store_id"] for punch in result[0]["punches"]} == {"1234", "5678"}
+
+
+def test_ingest_claims_storeless_rows(db):
+    ingest([make_record(None, "John", "Doe", DAY)])
+    stats = ingest([make_record("1234", "John", "Doe", DAY)])
+    assert stats["summaries_inserted"] == 0
+    assert summary_stores(db) == {"1234": 1}
+
+
+def test_assign_store_merges_storeless_duplicates(db):
+    from models import ShiftSummary
+    from services.shift_service import ShiftDataService
+
+    ingest([make_record("1234", "John", "Doe", DAY)])
+    # A store-less copy of the same shift, as stored before ingest claimed such rows
+    with Session(db) as session:
+        session.add(ShiftSummary(employee_first_name="John", employee_last_name="Doe", business_date=DAY))
+        session.add(ShiftSummary(employee_first_name="Jane", employee_last_name="Roe", business_date=DAY))
+        session.commit()
+
+    with ShiftDataService() as service:
+        counts = service.assign_store("1234")
+    assert counts["duplicates_merged"] == 1
+    assert summary_stores(db) == {"1234": 2}
@@ -2,7 +2,7 @@ import os
 import json
 from datetime import datetime, date
 from decimal import Decimal
-from dataclasses import asdict
+from dataclasses import asdict, is_dataclass
 from pathlib import Path
 
 def save_pipeline_artifact(artifact_dir: str, pdf_path: str, stage_name: str, data: any):
@@ -39,7 +39,9 @@ def save_pipeline_artifact(artifact_dir: str, pdf_path: str, stage_name: str, da
                         return obj.isoformat()
                     if isinstance(obj, Decimal):
                         return float(obj)
-                    if hasattr(obj, '__dict__'):
+                    if hasattr(obj, 'to_dict'):
+                        return obj.to_dict()
+                    if is_dataclass(obj):
                         return asdict(obj)
                     return str(obj)
                 
@@ -0,0 +1,222 @@
+"""
+Negotiated response compression.
+
+Responses of a compressible type and at least COMPRESSION_MIN_BYTES are
+encoded with the best codec the client accepts, in order of preference:
+
+    zstd   needs the optional `zstandard` package
+    br     needs the optional `brotli` package
+    gzip   always available
+
+Codecs whose package is missing are simply not offered. Server-sent events
+are never compressed (they must reach the client as they are written), nor
+are partial (Range) responses or ones that already carry a Content-Encoding.
+Every response of a compressible type carries Vary: Accept-Encoding, whether
+or not this request got it compressed.
+"""
+
+import os
+import zlib
+from typing import Dict, List, Optional
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+COMPRESSION_ENABLED = os.getenv("RESPONSE_COMPRESSION", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 5))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", 3))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+NEVER_COMPRESS_TYPES = ("text/event-stream",)
+
+
+# -----------------------------------------------------------------------------
+# Codecs
+# -----------------------------------------------------------------------------
+class _Gzip:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _Zstd:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+# Preference order; only codecs whose package is installed
+CODECS = {
+    name: codec
+    for name, codec, available in (
+        ("zstd", _Zstd, ZSTD_AVAILABLE),
+        ("br", _Brotli, BROTLI_AVAILABLE),
+        ("gzip", _Gzip, True),
+    )
+    if available
+}
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best available codec allowed by an Accept-Encoding header (q=0 excludes)."""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name:
+            weights[name.strip()] = weight
+    wildcard = weights.get("*", 0.0)
+    candidates = [
+        (weights.get(name, wildcard), -i, name)
+        for i, name in enumerate(CODECS)
+        if weights.get(name, wildcard) > 0
+    ]
+    return max(candidates)[2] if candidates else None
+
+
+# -----------------------------------------------------------------------------
+# Middleware
+# -----------------------------------------------------------------------------
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses eligible responses. Bodies sent in one
+    message below COMPRESSION_MIN_BYTES go out as they are; streamed bodies
+    are compressed chunk by chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            # Sent as is, but another Accept-Encoding would get it compressed
+            async def send_identity(message):
+                if message["type"] == "http.response.start" and _compressible(
+                    message["status"], message.get("headers", [])
+                ):
+                    message = {**message, "headers": _with_vary(message.get("headers", []))}
+                await send(message)
+
+            await self.app(scope, receive, send_identity)
+            return
+
+        start_message = None
+        codec = None
+
+        async def send_compressed(message):
+            nonlocal start_message, codec
+            if message["type"] == "http.response.start":
+                if _compressible(message["status"], message.get("headers", [])):
+                    # Hold the headers until the first body chunk shows the size
+                    start_message = message
+                    return
+                await send(message)
+                return
+
+            if message["type"] != "http.response.body" or (start_message is None and codec is None):
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start_message is not None:
+                start = start_message
+                start_message = None
+                if not more_body and len(body) < COMPRESSION_MIN_BYTES:
+                    start["headers"] = _with_vary(start.get("headers", []))
+                    await send(start)
+                    await send(message)
+                    return
+                codec = CODECS[encoding]()
+                start["headers"] = _encoded_headers(start.get("headers", []), encoding)
+                await send(start)
+
+            data = codec.compress(body)
+            if not more_body:
+                data += codec.finish()
+                codec = None
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def _compressible(status: int, headers: List) -> bool:
+    if status in (204, 206, 304):
+        return False
+    content_type = b""
+    for name, value in headers:
+        name = name.lower()
+        if name in (b"content-encoding", b"content-range"):
+            return False
+        if name == b"content-type":
+            content_type = value.lower()
+    content_type = content_type.decode("latin-1")
+    if content_type.startswith(NEVER_COMPRESS_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith("+json")
+
+
+def _with_vary(headers: List) -> List:
+    """Headers plus Vary: Accept-Encoding, so caches keep the encodings apart."""
+    headers = list(headers)
+    for i, (name, value) in enumerate(headers):
+        if name.lower() == b"vary":
+            if b"accept-encoding" not in value.lower():
+                headers[i] = (name, value + b", Accept-Encoding")
+            return headers
+    headers.append((b"vary", b"Accept-Encoding"))
+    return headers
+
+
+def _encoded_headers(headers: List, encoding: str) -> List:
+    """Response headers for an encoded body: no Content-Length, since the size changes."""
+    headers = [(name, value) for name, value in _with_vary(headers) if name.lower() != b"content-length"]
+    headers.append((b"content-encoding", encoding.encode()))
+    return headers
@@ -0,0 +1,70 @@
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+
+BUCKET_PATTERN = re.compile(r'^(\d+)\s*([mh]?)$')
+
+
+def parse_bucket(bucket: str) -> int:
+    """
+    Parse a bucket size into minutes.
+    Examples: "15m" -> 15, "1h" -> 60, "30" -> 30
+    """
+    match = BUCKET_PATTERN.match(bucket.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid bucket '{bucket}'. Use minutes or hours, e.g. 15m or 1h")
+    value, unit = int(match.group(1)), match.group(2)
+    return value * 60 if unit == 'h' else value
+
+
+def headcount_timeline(
+    start_minutes: np.ndarray,
+    end_minutes: np.ndarray,
+    total_minutes: int,
+    bucket_minutes: int,
+) -> Dict[str, np.ndarray]:
+    """
+    Headcount per bucket from a set of [start, end) intervals, given as whole
+    minutes from the start of a window total_minutes long.
+
+    Builds a per-minute difference array (+1 at each start, -1 at each end),
+    takes its cumulative sum to get the headcount at every minute, then folds
+    minutes into buckets. Intervals are clipped to the window, so shifts that
+    cross midnight into or out of the window count only for the part inside.
+
+    Returns:
+        dict with "peak" (max headcount in each bucket) and "average"
+        (mean headcount across the bucket's minutes; a last bucket cut short
+        by the window is averaged over the minutes it has)
+    """
+    buckets = -(-total_minutes // bucket_minutes)
+    padded = buckets * bucket_minutes
+
+    if len(start_minutes):
+        start_min = np.clip(np.asarray(start_minutes, dtype=np.int64), 0, total_minutes)
+        end_min = np.clip(np.asarray(end_minutes, dtype=np.int64), 0, total_minutes)
+        valid = end_min > start_min
+
+        diff = (
+            np.bincount(start_min[valid], minlength=padded + 1)
+            - np.bincount(end_min[valid], minlength=padded + 1)
+        )
+        per_minute = np.cumsum(diff[:padded])
+    else:
+        per_minute = np.zeros(padded, dtype=np.int64)
+
+    minutes = np.full(buckets, bucket_minutes)
+    minutes[-1] = total_minutes - (buckets - 1) * bucket_minutes
+    by_bucket = per_minute.reshape(buckets, bucket_minutes)
+    return {
+        'peak': by_bucket.max(axis=1),
+        'average': by_bucket.sum(axis=1) / minutes,
+    }
+
+
+def bucket_times(window_start: datetime, buckets: int, bucket_minutes: int) -> List[str]:
+    """ISO timestamps for the start of each bucket."""
+    step = timedelta(minutes=bucket_minutes)
+    return [(window_start + step * i).isoformat() for i in range(buckets)]
@@ -0,0 +1,34 @@
+import glob
+import hashlib
+import os
+from pathlib import Path
+from typing import List, Iterable
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash a file's contents so re-copied or renamed reports are recognised."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def expand_pdf_paths(inputs: Iterable[str]) -> List[str]:
+    """
+    Resolve CLI inputs into a sorted, de-duplicated list of PDF files.
+    Accepts plain files, directories (searched recursively) and glob patterns.
+    """
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            found.extend(str(p) for p in Path(item).rglob('*') if p.suffix.lower() == '.pdf')
+        elif glob.has_magic(item):
+            found.extend(p for p in glob.glob(item, recursive=True) if p.lower().endswith('.pdf'))
+        elif os.path.isfile(item):
+            found.append(item)
+        else:
+            print(f"⚠️  No such file or directory: {item}")
+    
+    unique = {}
+    for path in found:
+        unique.setdefault(os.path.realpath(path), path)
+    return sorted(unique.values())
@@ -0,0 +1,101 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Any, Hashable, Iterable, List, Tuple
+
+# (group key, start, end, payload)
+Interval = Tuple[Hashable, datetime, datetime, Any]
+
+
+class IntervalIndex:
+    """
+    Sorted-interval index for point-in-time ("stabbing") lookups.
+    Intervals are kept sorted by start; since no interval is longer than
+    the widest one seen, only starts within that span before the point
+    have to be checked.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[datetime, datetime, Any]]):
+        self._intervals = sorted(intervals, key=lambda i: i[0])
+        self._starts = [start for start, _, _ in self._intervals]
+        self._max_span = max(
+            (end - start for start, end, _ in self._intervals),
+            default=timedelta(0),
+        )
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def at(self, point: datetime) -> List[Any]:
+        """Payloads of every [start, end) interval containing the point."""
+        lo = bisect_left(self._starts, point - self._max_span)
+        hi = bisect_right(self._starts, point)
+        return [
+            payload
+            for start, end, payload in self._intervals[lo:hi]
+            if end > point
+        ]
+
+
+def find_overlaps(intervals: Iterable[Interval]) -> List[Tuple[Any, Any]]:
+    """
+    Every pair of [start, end) intervals with the same group key that overlap.
+    Sweeps each group in start order, keeping the still-open intervals in a
+    heap by end time, so the cost is O(n log n) plus the number of pairs.
+    """
+    pairs = []
+    active: List[Tuple[datetime, int, Any]] = []
+    current_key = object()
+    ordered = sorted(intervals, key=lambda i: (i[0], i[1]))
+    for seq, (key, start, end, payload) in enumerate(ordered):
+        if key != current_key:
+            active = []
+            current_key = key
+        # Drop intervals that ended before this one starts
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        pairs.extend((other, payload) for _, _, other in active)
+        heapq.heappush(active, (end, seq, payload))
+    return pairs
+
+
+# -----------------------------------------------------------------------------
+# Interval Sets
+# -----------------------------------------------------------------------------
+def merge_intervals(intervals: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Sort [start, end) intervals and coalesce the ones that touch or overlap."""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(a: List[Tuple[int, int]], b: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    The parts of `a` not covered by `b`, both sorted and disjoint (see
+    merge_intervals). A single linear merge: each interval of `b` is passed
+    over once, so the cost is O(len(a) + len(b)).
+    """
+    result: List[Tuple[int, int]] = []
+    j = 0
+    for start, end in a:
+        # Skip subtrahends that end before this interval starts
+        while j < len(b) and b[j][1] <= start:
+            j += 1
+        k = j
+        while k < len(b) and b[k][0] < end:
+            if b[k][0] > start:
+                result.append((start, b[k][0]))
+            start = max(start, b[k][1])
+            if start >= end:
+                break
+            k += 1
+        if start < end:
+            result.append((start, end))
+    return result
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+from utils.pdf_utils import PDFSource, as_buffer, is_path
+
+# Cache location and size budget; set PAGE_CACHE_DIR to an empty string to disable
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", os.path.join("pipeline_artifacts", "page_cache"))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Eviction trims the cache down to this fraction of the budget
+EVICTION_TARGET = 0.9
+
+
+# Indirect references, and the parts of an object definition that differ
+# between files holding the same page: per-file font subset tags ("ABCDEF+")
+# and the lengths of differently compressed streams
+_REFERENCE = re.compile(r'(\d+) 0 R')
+_SUBSET_TAG = re.compile(r'/[A-Z]{6}\+')
+_LENGTH = re.compile(r'/Length \d+( 0 R)?')
+
+
+def _definition_digest(doc, text: str, memo: Dict[int, str], active: set) -> str:
+    """Hash of an object definition with every reference replaced by the referenced object's hash."""
+    text = _LENGTH.sub('', _SUBSET_TAG.sub('/', text))
+    text = _REFERENCE.sub(lambda m: f"<{_object_digest(doc, int(m.group(1)), memo, active)}>", text)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _object_digest(doc, xref: int, memo: Dict[int, str], active: set) -> str:
+    """
+    Hash of an object and everything it references (form XObjects, images,
+    font programs, ToUnicode maps), by content rather than object number.
+    """
+    if xref in memo:
+        return memo[xref]
+    if xref in active:
+        # Reference cycle; the object is already being hashed further up
+        return "cycle"
+    active.add(xref)
+    digest = hashlib.sha256(_definition_digest(doc, doc.xref_object(xref, compressed=True), memo, active).encode())
+    if doc.xref_is_stream(xref):
+        digest.update(doc.xref_stream(xref) or b'')
+    active.discard(xref)
+    memo[xref] = digest.hexdigest()
+    return memo[xref]
+
+
+def _resources_digest(doc, page, memo: Dict[int, str]) -> str:
+    """Hash of a page's resources, inherited from the page tree when the page has none."""
+    xref = page.xref
+    while xref:
+        kind, value = doc.xref_get_key(xref, "Resources")
+        if kind == "xref":
+            return _object_digest(doc, int(value.split()[0]), memo, set())
+        if kind == "dict":
+            return _definition_digest(doc, value, memo, set())
+        kind, value = doc.xref_get_key(xref, "Parent")
+        xref = int(value.split()[0]) if kind == "xref" else 0
+    return ""
+
+
+def page_digests(source: PDFSource) -> Optional[List[str]]:
+    """
+    Hash every page's content stream together with the resources it draws
+    with, followed recursively: form XObjects (whose streams hold the text of
+    pages drawn as "q /fzFrm0 Do Q"), fonts with their programs and ToUnicode
+    maps. Identical pages of different files hash the same; pages that only
+    look alike do not.
+    Returns None when PyMuPDF is unavailable, in which case callers skip the cache.
+    """
+    try:
+        import fitz  # PyMuPDF
+    except ImportError:
+        return None
+
+    if is_path(source):
+        doc = fitz.open(os.fspath(source))
+    else:
+        doc = fitz.open(stream=as_buffer(source), filetype="pdf")
+
+    digests = []
+    # Shared objects (fonts, mostly) are hashed once per document
+    memo: Dict[int, str] = {}
+    with doc:
+        for page in doc:
+            digest = hashlib.sha256(page.read_contents())
+            digest.update(_resources_digest(doc, page, memo).encode())
+            digests.append(digest.hexdigest())
+    return digests
+
+
+class PageCache:
+    """
+    On-disk, content-addressed cache of extracted page lines.
+    Entries are keyed by page content hash and backend, and evicted least
+    recently used first once the cache grows past its byte budget.
+    """
+
+    def __init__(self, cache_dir: str = PAGE_CACHE_DIR, max_bytes: int = PAGE_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.cache_dir)
+
+    @staticmethod
+    def key(backend: str, page_digest: str) -> str:
+        """Cache key for one page as extracted by one backend."""
+        return hashlib.sha256(f"{backend}:{page_digest}".encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Cached lines for a page, refreshing its LRU position on a hit."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return lines
+
+    def put(self, key: str, lines: List[str]):
+        """Store a page's lines, evicting old entries if over budget."""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write-then-rename so concurrent workers never read a partial entry
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(lines, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️  Failed to write page cache entry: {e}")
+            return
+
+        if self._size is None:
+            self._size = self.size_bytes()
+        else:
+            self._size += os.path.getsize(path)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def size_bytes(self) -> int:
+        """Total size of all cache entries on disk."""
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self):
+        """(mtime, path, size) for every cache entry."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield st.st_mtime, path, st.st_size
+
+    def evict(self):
+        """Delete least recently used entries until under the eviction target."""
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        target = self.max_bytes * EVICTION_TARGET
+        removed = 0
+        for _, path, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self._size = total
+        if removed:
+            print(f"🧹 Page cache evicted {removed} entries ({total / 1024 / 1024:.1f} MiB kept)")
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters since this cache object was created."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
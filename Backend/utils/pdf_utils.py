@@ -1,4 +1,6 @@
-from typing import List
+import io
+import os
+from typing import BinaryIO, Dict, List, Optional, Sequence, Union
 
 try:
     import pdfplumber
@@ -6,35 +8,269 @@ try:
 except ImportError:
     PDFPLUMBER_AVAILABLE = False
 
-def extract_text_with_pdfplumber(pdf_path: str) -> List[str]:
-    """Extract text lines using pdfplumber."""
-    if not PDFPLUMBER_AVAILABLE:
-        raise ImportError("pdfplumber is not installed.")
-    
-    all_lines = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for page_num, page in enumerate(pdf.pages, 1):
-            text = page.extract_text()
-            if text:
-                lines = text.split('\n')
+# A PDF given as a filesystem path, raw bytes, or an open binary file
+PDFSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+# Words whose tops are within this many points are treated as one line.
+# Matches pdfplumber's default y_tolerance so backends agree on line breaks.
+LINE_Y_TOLERANCE = 3.0
+
+
+# -----------------------------------------------------------------------------
+# Source Handling
+# -----------------------------------------------------------------------------
+class MemoryReader(io.RawIOBase):
+    """
+    Read-only, seekable file over a bytes-like object.
+    Lets stream-based backends read uploads held in memory without the
+    full copy that io.BytesIO(memoryview) would make.
+    """
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview]):
+        self._view = memoryview(data).cast('B')
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), len(self._view) - self._pos)
+        if size <= 0:
+            return 0
+        buffer[:size] = self._view[self._pos:self._pos + size]
+        self._pos += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+def is_path(source: PDFSource) -> bool:
+    """Whether the source names a file on disk."""
+    return isinstance(source, (str, os.PathLike))
+
+
+def source_name(source: PDFSource, default: str = "upload.pdf") -> str:
+    """Human-readable name for logs and artifact files."""
+    if is_path(source):
+        return os.fspath(source)
+    name = getattr(source, "name", None)
+    return name if isinstance(name, str) else default
+
+
+def as_stream(source: PDFSource) -> Union[str, BinaryIO]:
+    """Path or rewound binary stream, for backends that read files incrementally."""
+    if is_path(source):
+        return os.fspath(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return MemoryReader(source)
+    source.seek(0)
+    return source
+
+
+def as_buffer(source: PDFSource) -> Union[bytes, bytearray, memoryview]:
+    """
+    The whole document as a bytes-like object, for backends that need one.
+    In-memory streams are exposed through their buffer rather than copied.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return source
+    if hasattr(source, "getbuffer"):
+        return source.getbuffer()
+    # SpooledTemporaryFile that has not spilled to disk yet wraps a BytesIO
+    inner = getattr(source, "_file", None)
+    if hasattr(inner, "getbuffer"):
+        return inner.getbuffer()
+    source.seek(0)
+    return source.read()
+
+
+# -----------------------------------------------------------------------------
+# Extractor Interface
+# -----------------------------------------------------------------------------
+class TextExtractor:
+    """
+    Base class for PDF text extraction backends.
+    Backends return one list of text lines per page, in reading order.
+    """
+    name = "base"
+
+    def is_available(self) -> bool:
+        """Whether the backing library can be imported."""
+        raise NotImplementedError
+
+    def extract_pages(self, source: PDFSource, page_numbers: Optional[Sequence[int]] = None) -> List[List[str]]:
+        """
+        Extract text lines per page.
+
+        Args:
+            source: PDF path, bytes-like object or binary file
+            page_numbers: Zero-based pages to extract (default: all)
+        """
+        raise NotImplementedError
+
+    def extract(self, source: PDFSource) -> List[str]:
+        """Extract text lines for the whole document."""
+        all_lines = []
+        for page_num, lines in enumerate(self.extract_pages(source), 1):
+            if lines:
                 all_lines.extend(lines)
                 print(f"Extracted {len(lines)} lines from page {page_num}")
-    return all_lines
+        return all_lines
 
-def extract_text_with_pymupdf(pdf_path: str) -> List[str]:
-    """Extract text lines using PyMuPDF (fitz)."""
+
+class PdfplumberExtractor(TextExtractor):
+    """pdfplumber backend. Slowest, but the layout the parser was written against."""
+    name = "pdfplumber"
+
+    def is_available(self) -> bool:
+        return PDFPLUMBER_AVAILABLE
+
+    def extract_pages(self, source: PDFSource, page_numbers: Optional[Sequence[int]] = None) -> List[List[str]]:
+        if not PDFPLUMBER_AVAILABLE:
+            raise ImportError("pdfplumber is not installed.")
+
+        pages = []
+        with pdfplumber.open(as_stream(source)) as pdf:
+            indexes = range(len(pdf.pages)) if page_numbers is None else page_numbers
+            for index in indexes:
+                page = pdf.pages[index]
+                text = page.extract_text()
+                pages.append(text.split('\n') if text else [])
+                # Drop the cached layout objects; long reports otherwise keep every page alive
+                page.close()
+        return pages
+
+
+class PyMuPDFExtractor(TextExtractor):
+    """
+    PyMuPDF (fitz) backend.
+    Rebuilds lines from word boxes instead of using get_text()'s block order,
+    so table rows come out as single lines the way pdfplumber emits them.
+    """
+    name = "pymupdf"
+
+    def is_available(self) -> bool:
+        try:
+            import fitz  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def extract_pages(self, source: PDFSource, page_numbers: Optional[Sequence[int]] = None) -> List[List[str]]:
+        try:
+            import fitz  # PyMuPDF
+        except ImportError:
+            raise ImportError("PyMuPDF not installed. Run: pip install pymupdf")
+
+        pages = []
+        if is_path(source):
+            doc = fitz.open(os.fspath(source))
+        else:
+            doc = fitz.open(stream=as_buffer(source), filetype="pdf")
+        with doc:
+            indexes = range(doc.page_count) if page_numbers is None else page_numbers
+            for index in indexes:
+                words = doc[index].get_text("words")
+                pages.append(group_words_into_lines(
+                    (w[0], w[1], w[4]) for w in words
+                ))
+        return pages
+
+
+class PdfiumExtractor(TextExtractor):
+    """pypdfium2 backend. Uses PDFium's own line reconstruction."""
+    name = "pdfium"
+
+    def is_available(self) -> bool:
+        try:
+            import pypdfium2  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def extract_pages(self, source: PDFSource, page_numbers: Optional[Sequence[int]] = None) -> List[List[str]]:
+        try:
+            import pypdfium2 as pdfium
+        except ImportError:
+            raise ImportError("pypdfium2 not installed. Run: pip install pypdfium2")
+
+        pages = []
+        doc = pdfium.PdfDocument(as_stream(source))
+        try:
+            indexes = range(len(doc)) if page_numbers is None else page_numbers
+            for index in indexes:
+                page = doc[index]
+                textpage = page.get_textpage()
+                text = textpage.get_text_range()
+                pages.append([line for line in text.splitlines() if line.strip()])
+                textpage.close()
+                page.close()
+        finally:
+            doc.close()
+        return pages
+
+
+def group_words_into_lines(words) -> List[str]:
+    """
+    Join (x0, top, text) word boxes into lines.
+    Words are clustered by top coordinate, then ordered left to right.
+    """
+    lines = []
+    current = []
+    current_top = None
+    for x0, top, text in sorted(words, key=lambda w: (w[1], w[0])):
+        if current and abs(top - current_top) > LINE_Y_TOLERANCE:
+            lines.append(' '.join(t for _, t in sorted(current)))
+            current = []
+        if not current:
+            current_top = top
+        current.append((x0, text))
+    if current:
+        lines.append(' '.join(t for _, t in sorted(current)))
+    return lines
+
+
+# Registered backends, fastest first. "auto" selection walks this order.
+# Re-check the order with `python -m benchmarks.bench_extractors <pdf>`.
+EXTRACTORS: Dict[str, TextExtractor] = {
+    extractor.name: extractor
+    for extractor in (PdfiumExtractor(), PyMuPDFExtractor(), PdfplumberExtractor())
+}
+REFERENCE_EXTRACTOR = "pdfplumber"
+
+
+def get_extractor(name: str) -> TextExtractor:
+    """Look up a registered extractor by name."""
     try:
-        import fitz  # PyMuPDF
-    except ImportError:
-        raise ImportError("PyMuPDF not installed. Run: pip install pymupdf")
-    
-    all_lines = []
-    doc = fitz.open(pdf_path)
-    for page_num, page in enumerate(doc, 1):
-        text = page.get_text()
-        if text:
-            lines = text.split('\n')
-            all_lines.extend(lines)
-            print(f"Extracted {len(lines)} lines from page {page_num}")
-    doc.close()
-    return all_lines
+        return EXTRACTORS[name]
+    except KeyError:
+        raise ValueError(f"Unknown PDF backend '{name}'. Choose from: {', '.join(EXTRACTORS)}")
+
+
+def available_extractors() -> List[TextExtractor]:
+    """Installed extractors in preference (fastest first) order."""
+    return [e for e in EXTRACTORS.values() if e.is_available()]
+
+
+# -----------------------------------------------------------------------------
+# Backwards-compatible helpers
+# -----------------------------------------------------------------------------
+def extract_text_with_pdfplumber(source: PDFSource) -> List[str]:
+    """Extract text lines using pdfplumber."""
+    return EXTRACTORS["pdfplumber"].extract(source)
+
+def extract_text_with_pymupdf(source: PDFSource) -> List[str]:
+    """Extract text lines using PyMuPDF (fitz)."""
+    return EXTRACTORS["pymupdf"].extract(source)
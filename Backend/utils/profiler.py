@@ -0,0 +1,296 @@
+"""
+On-demand sampling profiler for requests.
+
+A profiled request gets a sampler thread that reads sys._current_frames()
+every PROFILE_INTERVAL_MS and counts the stacks of the threads working on
+that request. Threads join a profile through ProfiledRoute (the endpoint)
+or @profiled (parse and insert, which run in the threadpool); the active
+profile is found through a context variable. Nothing is sampled unless a
+profile is running.
+
+Output is one folded-stack file per request (flamegraph.pl, speedscope,
+inferno) plus a JSON sidecar, under PROFILE_DIR:
+
+    <PROFILE_DIR>/<profile id>.folded
+    <PROFILE_DIR>/<profile id>.json
+
+PROFILING selects which requests are profiled:
+    off     never (default)
+    header  requests sent with "X-Profile: 1"
+    sample  a PROFILE_SAMPLE_RATE fraction of requests, plus header requests
+Every mode is capped at PROFILE_MAX_PER_MINUTE profiles.
+"""
+
+import functools
+import inspect
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from fastapi.routing import APIRoute
+
+PROFILING = os.getenv("PROFILING", "off").lower()
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0.01))
+PROFILE_MAX_PER_MINUTE = int(os.getenv("PROFILE_MAX_PER_MINUTE", 6))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("pipeline_artifacts", "profiles"))
+
+# Deepest stack kept per sample; deeper frames are cut from the root side
+MAX_STACK_DEPTH = 128
+
+PROFILE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_\-]{1,100}$")
+
+
+class Profile:
+    """Stack samples for one request."""
+
+    def __init__(self, profile_id: str, name: str):
+        self.id = profile_id
+        self.name = name
+        self.started = time.time()
+        self.duration = 0.0
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self._threads: Dict[int, int] = {}  # thread ident -> nesting depth
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    # -------------------------------------------------------------------------
+    # Threads
+    # -------------------------------------------------------------------------
+    def enter(self):
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] = self._threads.get(ident, 0) + 1
+
+    def exit(self):
+        ident = threading.get_ident()
+        with self._lock:
+            depth = self._threads.get(ident, 0) - 1
+            if depth > 0:
+                self._threads[ident] = depth
+            else:
+                self._threads.pop(ident, None)
+
+    # -------------------------------------------------------------------------
+    # Sampling
+    # -------------------------------------------------------------------------
+    def start(self):
+        self._sampler = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.duration = time.time() - self.started
+
+    def _run(self):
+        interval = PROFILE_INTERVAL_MS / 1000
+        while not self._stop.wait(interval):
+            with self._lock:
+                idents = list(self._threads)
+            if not idents:
+                continue
+            frames = sys._current_frames()
+            for ident in idents:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[self._fold(frame)] += 1
+            self.samples += 1
+
+    def _fold(self, frame) -> str:
+        names: List[str] = []
+        while frame is not None and len(names) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        names.append(self.name)
+        return ";".join(reversed(names))
+
+    # -------------------------------------------------------------------------
+    # Output
+    # -------------------------------------------------------------------------
+    def save(self) -> Optional[str]:
+        """Write the folded stacks and metadata; returns the .folded path (None if nothing was sampled)."""
+        if not self.stacks:
+            return None
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{self.id}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(os.path.join(PROFILE_DIR, f"{self.id}.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "id": self.id,
+                "name": self.name,
+                "started": self.started,
+                "duration_ms": round(self.duration * 1000, 1),
+                "interval_ms": PROFILE_INTERVAL_MS,
+                "samples": self.samples,
+            }, f)
+        return path
+
+
+_current_profile: ContextVar[Optional[Profile]] = ContextVar("profile", default=None)
+
+
+# -----------------------------------------------------------------------------
+# Joining a Profile
+# -----------------------------------------------------------------------------
+@contextmanager
+def profile_section():
+    """Sample the calling thread while it works for the active profile, if any."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    profile.enter()
+    try:
+        yield
+    finally:
+        profile.exit()
+
+
+def profiled(func):
+    """Decorator: sample the calling thread during func when its request is profiled."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current_profile.get() is None:
+            return func(*args, **kwargs)
+        with profile_section():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def _profiled_endpoint(endpoint):
+    """Wrap a route endpoint, keeping its signature and sync/async kind for FastAPI."""
+    if getattr(endpoint, "__profiled__", False):
+        return endpoint
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            with profile_section():
+                return await endpoint(*args, **kwargs)
+    else:
+        wrapper = profiled(endpoint)
+    wrapper.__profiled__ = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute whose endpoint joins the request's profile; use as a router's route_class."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _profiled_endpoint(endpoint), **kwargs)
+
+
+# -----------------------------------------------------------------------------
+# Rate Limiting
+# -----------------------------------------------------------------------------
+_recent_profiles: deque = deque()
+_recent_lock = threading.Lock()
+
+
+def _take_slot() -> bool:
+    """True if another profile fits in the last minute's budget."""
+    now = time.monotonic()
+    with _recent_lock:
+        while _recent_profiles and now - _recent_profiles[0] > 60:
+            _recent_profiles.popleft()
+        if len(_recent_profiles) >= PROFILE_MAX_PER_MINUTE:
+            return False
+        _recent_profiles.append(now)
+        return True
+
+
+def _wants_profile(headers: Dict[bytes, bytes]) -> bool:
+    if PROFILING == "off":
+        return False
+    if headers.get(b"x-profile", b"").lower() in (b"1", b"true", b"yes"):
+        return True
+    return PROFILING == "sample" and random.random() < PROFILE_SAMPLE_RATE
+
+
+# -----------------------------------------------------------------------------
+# Middleware
+# -----------------------------------------------------------------------------
+class ProfilingMiddleware:
+    """
+    ASGI middleware that starts a profile for selected requests and saves it
+    when the response is finished. The profile id (X-Request-ID when the
+    client sent a usable one) is returned in the X-Profile-Id header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or PROFILING == "off":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        if not _wants_profile(headers) or not _take_slot():
+            await self.app(scope, receive, send)
+            return
+
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")
+        if not PROFILE_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex[:16]
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{request_id}"
+        profile = Profile(profile_id, f"{scope['method']} {scope['path']}")
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        token = _current_profile.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _current_profile.reset(token)
+            profile.stop()
+            path = profile.save()
+            if path:
+                print(f"🔥 Profile {profile.name}: {profile.samples} samples -> {path}")
+
+
+# -----------------------------------------------------------------------------
+# Retrieval
+# -----------------------------------------------------------------------------
+def list_profiles(limit: int = 50) -> List[dict]:
+    """Metadata of saved profiles, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name), encoding="utf-8") as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    profiles.sort(key=lambda profile: profile.get("started", 0), reverse=True)
+    return profiles[:limit]
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    """Path of a saved .folded file, or None for unknown or malformed ids."""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.folded")
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,230 @@
+"""
+Per-request SQL statistics.
+
+SQLAlchemy cursor hooks count every statement and its time against the
+request currently being served (tracked in a context variable, which
+survives the hop into FastAPI's threadpool). QueryStatsMiddleware reports
+the numbers as a Server-Timing header and keeps per-route aggregates for
+/debug/perf.
+
+Routes can declare how many statements they are expected to issue with
+@query_budget(n). Over budget logs a warning, or raises QueryBudgetExceeded
+when QUERY_BUDGET_STRICT is set, so tests running through TestClient fail.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS", "true").lower() in ("1", "true", "yes")
+
+# Routes without @query_budget fall back to this (0 = no budget)
+QUERY_BUDGET_DEFAULT = int(os.getenv("QUERY_BUDGET_DEFAULT", 0))
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "").lower() in ("1", "true", "yes")
+
+# Statements are truncated to this many characters when reported
+STATEMENT_PREVIEW_CHARS = 300
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A route issued more SQL statements than its budget allows (strict mode)."""
+
+
+class RequestQueryStats:
+    """Statements issued while serving one request."""
+
+    __slots__ = ("count", "db_seconds", "slowest_seconds", "slowest_statement", "_lock")
+
+    def __init__(self):
+        self.count = 0
+        self.db_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+        # Fan-out routes record from several worker threads at once
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.db_seconds += seconds
+            if seconds > self.slowest_seconds:
+                self.slowest_seconds = seconds
+                self.slowest_statement = statement
+
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("query_stats", default=None)
+
+
+# -----------------------------------------------------------------------------
+# SQLAlchemy Hooks
+# -----------------------------------------------------------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    starts = conn.info.get("query_start")
+    if starts:
+        stats.record(statement, time.perf_counter() - starts.pop())
+
+
+@contextmanager
+def untracked():
+    """Statements issued inside the block are not counted against the current request."""
+    token = _current_stats.set(None)
+    try:
+        yield
+    finally:
+        _current_stats.reset(token)
+
+
+def install_query_hooks():
+    """Listen on every Engine (primary and replicas). Safe to call more than once."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# -----------------------------------------------------------------------------
+# Budgets
+# -----------------------------------------------------------------------------
+def query_budget(max_queries: int):
+    """Declare the most SQL statements a route should issue per request."""
+    def decorator(endpoint):
+        endpoint.query_budget = max_queries
+        return endpoint
+    return decorator
+
+
+# -----------------------------------------------------------------------------
+# Per-Route Aggregates
+# -----------------------------------------------------------------------------
+class RouteStats:
+    __slots__ = ("requests", "queries", "max_queries", "db_seconds", "max_db_seconds",
+                 "wall_seconds", "slowest_seconds", "slowest_statement", "over_budget", "budget")
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.db_seconds = 0.0
+        self.max_db_seconds = 0.0
+        self.wall_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.over_budget = 0
+        self.budget: Optional[int] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "avg_queries": round(self.queries / self.requests, 1) if self.requests else 0,
+            "max_queries": self.max_queries,
+            "budget": self.budget,
+            "over_budget": self.over_budget,
+            "avg_db_ms": round(self.db_seconds / self.requests * 1000, 2) if self.requests else 0,
+            "max_db_ms": round(self.max_db_seconds * 1000, 2),
+            "avg_wall_ms": round(self.wall_seconds / self.requests * 1000, 2) if self.requests else 0,
+            "slowest_ms": round(self.slowest_seconds * 1000, 2),
+            "slowest_statement": self.slowest_statement,
+        }
+
+
+_route_stats: Dict[str, RouteStats] = {}
+_route_stats_lock = threading.Lock()
+
+
+def _record_route(key: str, stats: RequestQueryStats, wall: float, budget: Optional[int]):
+    with _route_stats_lock:
+        route = _route_stats.get(key)
+        if route is None:
+            route = _route_stats[key] = RouteStats()
+        route.requests += 1
+        route.queries += stats.count
+        route.max_queries = max(route.max_queries, stats.count)
+        route.db_seconds += stats.db_seconds
+        route.max_db_seconds = max(route.max_db_seconds, stats.db_seconds)
+        route.wall_seconds += wall
+        route.budget = budget
+        if budget and stats.count > budget:
+            route.over_budget += 1
+        if stats.slowest_seconds > route.slowest_seconds:
+            route.slowest_seconds = stats.slowest_seconds
+            route.slowest_statement = (stats.slowest_statement or "")[:STATEMENT_PREVIEW_CHARS]
+
+
+def route_stats_snapshot() -> Dict[str, dict]:
+    """Per-route aggregates, busiest database time first."""
+    with _route_stats_lock:
+        items = [(key, route.as_dict(), route.db_seconds) for key, route in _route_stats.items()]
+    items.sort(key=lambda item: item[2], reverse=True)
+    return {key: stats for key, stats, _ in items}
+
+
+def reset_route_stats():
+    with _route_stats_lock:
+        _route_stats.clear()
+
+
+# -----------------------------------------------------------------------------
+# Middleware
+# -----------------------------------------------------------------------------
+class QueryStatsMiddleware:
+    """
+    ASGI middleware that collects statement counts and DB time per request.
+    Written against raw ASGI (not BaseHTTPMiddleware) so streaming responses
+    pass through untouched; the header goes out with the response start.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        install_query_hooks()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not QUERY_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - started
+                timing = (
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.count} queries", '
+                    f'app;dur={elapsed * 1000:.1f}'
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+
+        # Set by the router once the request matched a route
+        route = scope.get("route")
+        if route is None:
+            return
+        endpoint = scope.get("endpoint")
+        budget = getattr(endpoint, "query_budget", None) or QUERY_BUDGET_DEFAULT or None
+        key = f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+        _record_route(key, stats, time.perf_counter() - started, budget)
+
+        if budget and stats.count > budget:
+            message = f"{key} issued {stats.count} SQL statements (budget {budget})"
+            if QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            print(f"⚠️  {message}")
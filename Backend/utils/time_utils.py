@@ -22,3 +22,24 @@ def parse_time_12h(time_str: str) -> Optional[time]:
     except Exception as e:
         print(f"⚠️  Error parsing time '{time_str}': {e}")
         return None
+
+def parse_minutes_12h(time_str: str) -> Optional[int]:
+    """
+    Parse 12-hour time format to minutes after midnight.
+    Examples: "11:08a" -> 668, "1:02p" -> 782, "12:15a" -> 15
+    """
+    try:
+        time_str = time_str.lower().strip()
+        meridiem = time_str[-1]
+        if meridiem not in ('a', 'p'):
+            raise ValueError("missing a/p suffix")
+        
+        hour_str, minute_str = time_str[:-1].split(':')
+        hour, minute = int(hour_str), int(minute_str)
+        if not 1 <= hour <= 12 or not 0 <= minute <= 59:
+            raise ValueError("out of range")
+        
+        return (hour % 12 + (12 if meridiem == 'p' else 0)) * 60 + minute
+    except Exception as e:
+        print(f"⚠️  Error parsing time '{time_str}': {e}")
+        return None
@@ -2,7 +2,7 @@ import { useGetShiftsQuery } from "@/store/api/apiSlice";
 import { Wifi, WifiOff, Loader2 } from "lucide-react";
 
 export function ApiStatus() {
-    const { isLoading, isError, isSuccess } = useGetShiftsQuery({});
+    const { isLoading, isError, isSuccess } = useGetShiftsQuery({ fields: ["id"] });
 
     if (isLoading) return <Loader2 className="h-4 w-4 text-muted-foreground animate-spin" />;
 
@@ -2,12 +2,15 @@ import type { ReactNode } from "react";
 import { AppSidebar } from "./AppSidebar";
 import { SidebarProvider, SidebarTrigger } from "@/components/ui/sidebar";
 import { ApiStatus } from "./ApiStatus";
+import { useLiveUpdates } from "@/hooks/use-live-updates";
 
 interface DashboardLayoutProps {
   children: ReactNode;
 }
 
 export function DashboardLayout({ children }: DashboardLayoutProps) {
+  // Refetch cached queries when the backend reports new data
+  useLiveUpdates();
 
   return (
     <SidebarProvider>
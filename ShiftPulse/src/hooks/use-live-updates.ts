@@ -0,0 +1,43 @@
+import * as React from "react";
+import { apiSlice } from "@/store/api/apiSlice";
+import { useAppDispatch } from "@/store/hooks";
+
+type CacheTag = "Shift" | "Employee" | "Alert" | "Attendance";
+
+interface ServerEvent {
+  id: number;
+  type: string;
+  start_date: string | null;
+  end_date: string | null;
+  data: { tags?: CacheTag[]; [key: string]: unknown };
+}
+
+/**
+ * Subscribes to the backend event stream and invalidates the RTK Query
+ * tags an event names, so dashboards refetch only when data changed.
+ * EventSource reconnects (and resumes via Last-Event-ID) on its own.
+ */
+export function useLiveUpdates(startDate?: string, endDate?: string) {
+  const dispatch = useAppDispatch();
+
+  React.useEffect(() => {
+    if (typeof EventSource === "undefined") return;
+
+    const params = new URLSearchParams();
+    if (startDate) params.set("start_date", startDate);
+    if (endDate) params.set("end_date", endDate);
+    const source = new EventSource(`${import.meta.env.VITE_API_BASE_URL}/events/stream?${params}`);
+
+    const onDataChanged = (message: MessageEvent) => {
+      const event: ServerEvent = JSON.parse(message.data);
+      dispatch(apiSlice.util.invalidateTags(event.data.tags ?? ["Shift", "Employee", "Alert", "Attendance"]));
+    };
+    const onAlerts = () => {
+      dispatch(apiSlice.util.invalidateTags(["Alert"]));
+    };
+
+    source.addEventListener("data.changed", onDataChanged);
+    source.addEventListener("alerts.new", onAlerts);
+    return () => source.close();
+  }, [dispatch, startDate, endDate]);
+}
@@ -61,7 +61,11 @@ export default function EmployeeDetail() {
   } = useGetShiftsQuery({
     employee_last_name: lastName || "",
     start_date: tableRange.start,
-    end_date: tableRange.end
+    end_date: tableRange.end,
+    fields: [
+      "id", "business_date", "employee_first_name", "start_time",
+      "actual_working_hours", "scheduled_working_hours", "break_hours"
+    ]
   }, { skip: !lastName });
 
   const stats = useMemo(() => {
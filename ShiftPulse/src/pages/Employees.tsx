@@ -123,7 +123,7 @@ export default function Employees() {
 
                 return (
                   <tr
-                    key={`${emp.first_name}-${emp.last_name}`}
+                    key={`${emp.store_id ?? ''}-${emp.first_name}-${emp.last_name}`}
                     className="border-b border-border/30 hover:bg-secondary/50 cursor-pointer transition-colors group"
                     onClick={() => navigate(`/employees/${emp.last_name}`)}
                   >
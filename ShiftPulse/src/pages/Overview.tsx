@@ -1,11 +1,7 @@
 import { useState, useMemo } from "react";
 import { KPICard } from "@/components/KPICard";
 import { RangeFilter } from "@/components/RangeFilter";
-import {
-  useGetOverviewSummaryQuery,
-  useGetOverviewDailyQuery,
-  useGetEmployeeStatsQuery
-} from "@/store/api/apiSlice";
+import { useGetDashboardQuery } from "@/store/api/apiSlice";
 import {
   Users, Clock, CalendarCheck, Coffee, AlertTriangle, Timer,
   Loader2, AlertCircle, TrendingUp, TrendingDown, Info, CheckCircle,
@@ -41,11 +37,14 @@ export default function Overview() {
 
   const apiParams = { start_date: range.start, end_date: range.end };
 
-  const { data: summary, isLoading: isSummaryLoading } = useGetOverviewSummaryQuery(apiParams);
-  const { data: dailyTrend, isLoading: isTrendLoading } = useGetOverviewDailyQuery(apiParams);
-  const { data: laborByEmp, isLoading: isLaborLoading } = useGetEmployeeStatsQuery(apiParams);
-
-  const isLoading = isSummaryLoading || isTrendLoading || isLaborLoading;
+  // One request for all three sections, queried concurrently on the server
+  const { data: dashboard, isLoading } = useGetDashboardQuery({
+    ...apiParams,
+    sections: ["summary", "daily", "employees"],
+  });
+  const summary = dashboard?.summary;
+  const dailyTrend = dashboard?.daily;
+  const laborByEmp = dashboard?.employees;
 
   const trendData = useMemo(() => {
     if (!dailyTrend) return [];
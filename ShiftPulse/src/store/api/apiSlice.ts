@@ -1,15 +1,39 @@
 import { createApi, fetchBaseQuery } from '@reduxjs/toolkit/query/react';
-import type { ShiftSummary, Employee, ShiftPunch, EmployeeStats, EmployeeTrend, Alert, AttendanceRecord } from '../../types/api';
+import type { BaseQueryFn, FetchArgs, FetchBaseQueryError, FetchBaseQueryMeta } from '@reduxjs/toolkit/query/react';
+import type { ShiftSummary, Employee, EmployeeSearchResult, ShiftPunch, EmployeeStats, EmployeeTrend, EmployeeTrendsRequest, EmployeeTrendsResponse, Alert, AttendanceRecord, DashboardResponse, DashboardSection } from '../../types/api';
+
+// Read-your-writes: the backend stamps write responses with X-Last-Write and
+// routes requests that echo a recent stamp to the primary instead of a
+// lagging read replica. Kept per tab, so a reload right after an upload
+// still sees it.
+const LAST_WRITE_KEY = 'shifttrack_last_write';
+
+const rawBaseQuery = fetchBaseQuery({
+    baseUrl: import.meta.env.VITE_API_BASE_URL,
+    prepareHeaders: (headers) => {
+        const lastWrite = sessionStorage.getItem(LAST_WRITE_KEY);
+        if (lastWrite) headers.set('X-Last-Write', lastWrite);
+        return headers;
+    },
+});
+
+const baseQuery: BaseQueryFn<string | FetchArgs, unknown, FetchBaseQueryError, {}, FetchBaseQueryMeta> = async (args, api, extraOptions) => {
+    const result = await rawBaseQuery(args, api, extraOptions);
+    const lastWrite = result.meta?.response?.headers.get('X-Last-Write');
+    if (lastWrite) sessionStorage.setItem(LAST_WRITE_KEY, lastWrite);
+    return result;
+};
 
 export const apiSlice = createApi({
     reducerPath: 'api',
-    baseQuery: fetchBaseQuery({ baseUrl: import.meta.env.VITE_API_BASE_URL }),
+    baseQuery,
     tagTypes: ['Shift', 'Employee', 'Alert', 'Attendance'],
     endpoints: (builder) => ({
-        getShifts: builder.query<ShiftSummary[], { employee_last_name?: string; start_date?: string; end_date?: string }>({
-            query: (params) => ({
+        getShifts: builder.query<ShiftSummary[], { employee_last_name?: string; start_date?: string; end_date?: string; fields?: (keyof ShiftSummary)[] }>({
+            // fields limits the columns the backend selects and sends
+            query: ({ fields, ...params }) => ({
                 url: '/shifts/',
-                params,
+                params: fields ? { ...params, fields: fields.join(',') } : params,
             }),
             providesTags: ['Shift'],
         }),
@@ -25,6 +49,13 @@ export const apiSlice = createApi({
             query: () => '/employees/',
             providesTags: ['Employee'],
         }),
+        searchEmployees: builder.query<EmployeeSearchResult[], { q: string; limit?: number; store_id?: string }>({
+            query: (params) => ({
+                url: '/employees/search',
+                params,
+            }),
+            providesTags: ['Employee'],
+        }),
         getEmployeeStats: builder.query<EmployeeStats[], { start_date?: string; end_date?: string }>({
             query: (params) => ({
                 url: '/employees/stats',
@@ -39,6 +70,21 @@ export const apiSlice = createApi({
             }),
             providesTags: (_result, _error, { last_name }) => [{ type: 'Employee' as const, id: last_name }],
         }),
+        getEmployeeTrends: builder.query<EmployeeTrendsResponse, EmployeeTrendsRequest>({
+            query: (body) => ({
+                url: '/employees/trends',
+                method: 'POST',
+                body,
+            }),
+            providesTags: ['Employee'],
+        }),
+        getDashboard: builder.query<DashboardResponse, { start_date?: string; end_date?: string; sections?: DashboardSection[] }>({
+            query: ({ sections, ...params }) => ({
+                url: '/dashboard',
+                params: sections ? { ...params, sections: sections.join(',') } : params,
+            }),
+            providesTags: ['Shift', 'Employee', 'Alert', 'Attendance'],
+        }),
         getOverviewSummary: builder.query<any, { start_date?: string; end_date?: string }>({
             query: (params) => ({
                 url: '/shifts/stats/summary',
@@ -105,8 +151,11 @@ export const {
     useGetShiftDetailQuery,
     useGetShiftPunchesQuery,
     useGetEmployeesQuery,
+    useSearchEmployeesQuery,
     useGetEmployeeStatsQuery,
     useGetEmployeeTrendQuery,
+    useGetEmployeeTrendsQuery,
+    useGetDashboardQuery,
     useGetOverviewSummaryQuery,
     useGetOverviewDailyQuery,
     useGetShiftAnalyticsQuery,
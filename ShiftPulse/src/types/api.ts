@@ -29,7 +29,14 @@ export interface Employee {
     full_name: string;
 }
 
+export interface EmployeeSearchResult extends Employee {
+    store_ids: (string | null)[];
+    score: number;
+    match: 'prefix' | 'fuzzy';
+}
+
 export interface EmployeeStats extends Employee {
+    store_id: string | null;
     total_scheduled: number;
     total_actual: number;
     total_break: number;
@@ -44,6 +51,41 @@ export interface EmployeeTrend {
     break: number;
 }
 
+export interface EmployeeTrendSeries {
+    store_id: string | null;
+    first_name: string;
+    last_name: string;
+    full_name: string;
+    points: EmployeeTrend[];
+}
+
+export interface EmployeeTrendsRequest {
+    employees: 'all' | { last_name: string; first_name?: string }[];
+    start_date?: string;
+    end_date?: string;
+    bucket?: 'day' | 'week' | 'auto';
+    store_id?: string;
+}
+
+export interface EmployeeTrendsResponse {
+    bucket: 'day' | 'week';
+    series: EmployeeTrendSeries[];
+}
+
+export type DashboardSection = 'summary' | 'daily' | 'employees' | 'alerts' | 'attendance';
+
+export interface DashboardResponse {
+    start_date: string | null;
+    end_date: string | null;
+    summary?: any;
+    daily?: any[];
+    employees?: EmployeeStats[];
+    alerts?: Alert[];
+    attendance?: any;
+    timings_ms: Partial<Record<DashboardSection, number>>;
+    query_ms: number;
+}
+
 export interface Alert {
     id: string;
     type: string;